@@ -0,0 +1,52 @@
+"""
+Delayed ACKs: ACKs the sender has to parse per data segment, and the transfer time, for a few
+ack_interval / ack_delay settings.
+
+Run from the project root:
+    python -m Benchmarks.ack_bench --size 2000000 --interval 1 2 4 8 --delay 5
+"""
+import argparse
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+
+
+def run_case(tmp: str, message: str, interval: int, args) -> dict:
+    config = write_config(tmp, f"config_{interval}.txt", message, maximum_msg_size=args.msg,
+                          window_size=args.window, ack_interval=interval, ack_delay=args.delay)
+    srv, service = start_collector(config)
+    start = time.perf_counter()
+    node = run_emitter(config, srv.srv_sock.getsockname()[1])
+    elapsed = time.perf_counter() - start
+    stop_collector(srv, service)
+    framer = node.transfer_agent
+    return {
+        "elapsed": elapsed,
+        "acks": framer.acks_received,
+        "acks_per_segment": framer.acks_received / max(framer.segments_sent, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interval", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--delay", type=int, default=5, help="ack_delay in ms")
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for interval in args.interval:
+            with quiet():
+                r = run_case(tmp, message, interval, args)
+            report(f"[AckBench] ack_interval={interval:<3} ack_delay={args.delay}ms {r['elapsed']:6.2f}s "
+                   f"{args.size / r['elapsed'] / 1024:10.1f} KiB/s  acks={r['acks']:>6,} "
+                   f"({r['acks_per_segment']:.2f} per segment)")
+
+
+if __name__ == "__main__":
+    main()
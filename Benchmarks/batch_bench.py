@@ -0,0 +1,65 @@
+"""
+Many small files: one connection (connect, handshake and teardown) per file against a single batch transfer
+over one connection, on plain loopback and with added RTT.
+
+Run from the project root:
+    python -m Benchmarks.batch_bench --files 200 --file-size 2000 --rtt 0 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter, DelayProxy
+
+
+def send_each(tmp: str, paths: list, port: int, params: dict) -> float:
+    start = time.perf_counter()
+    for index, path in enumerate(paths):
+        run_emitter(write_config(tmp, f"config_{index}.txt", path, **params), port)
+    return time.perf_counter() - start
+
+
+def send_batch(tmp: str, config: str, port: int, params: dict) -> float:
+    start = time.perf_counter()
+    run_emitter(config, port)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=2000)
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0, 10], help="added round trip time in ms")
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "files")
+        os.makedirs(source_dir)
+        paths = [write_message(source_dir, f"file_{index:05d}.txt", args.file_size) for index in range(args.files)]
+        for rtt in args.rtt:
+            params = {"maximum_msg_size": args.msg, "window_size": args.window, "timeout": max(200, int(rtt * 4)),
+                      "sack": True, "log_level": "warning"}
+            batch_config = write_config(tmp, "config_batch.txt", source_dir, **params)
+            results = {}
+            for mode, send, target in (("per-file", send_each, paths), ("batch", send_batch, batch_config)):
+                with quiet():
+                    srv, service = start_collector(batch_config, output_dir=os.path.join(tmp, f"out_{mode}"))
+                    port = srv.srv_sock.getsockname()[1]
+                    proxy = DelayProxy(port, rtt / 2000.0) if rtt else None
+                    results[mode] = send(tmp, target, proxy.port if proxy else port, params)
+                    if proxy:
+                        proxy.close()
+                    stop_collector(srv, service)
+            speedup = results["per-file"] / results["batch"]
+            report(f"[BatchBench] rtt={rtt:>5}ms {args.files} files of {args.file_size} bytes: "
+                   f"per-file {results['per-file']:6.2f}s ({args.files / results['per-file']:7.1f} files/s) | "
+                   f"batch {results['batch']:6.2f}s ({args.files / results['batch']:7.1f} files/s) | "
+                   f"{speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Shared helpers for the benchmark scripts: temp configs, an in-process collector and quiet emitters."""
+import contextlib
+import io
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from server import DataCollector
+from client import DataEmitter
+
+
+def write_config(directory: str, name: str, message_path: str, **params) -> str:
+    settings = {
+        "message": message_path,
+        "maximum_msg_size": 1024,
+        "window_size": 16,
+        "timeout": 200,
+        "wire_format": "binary",
+    }
+    # dynamic_message_size stays off unless asked for
+    settings.update(params)
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write("\n".join(f"{k}: {v}" for k, v in settings.items()))
+    return path
+
+
+def write_message(directory: str, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    line = b"the quick brown fox jumps over the lazy dog 0123456789\n"
+    with open(path, "wb") as f:
+        f.write((line * (size // len(line) + 1))[:size])
+    return path
+
+
+def report(line: str):
+    """Prints to the real console even while quiet() is active."""
+    print(line, file=sys.__stdout__, flush=True)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallows the per-packet console logging so it doesn't dominate the measurement."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def start_collector(config_path: str, **kwargs):
+    """Runs a DataCollector on a free local port, returns it with its service thread."""
+    srv = DataCollector("127.0.0.1", 0, config_path, **kwargs)
+    service = threading.Thread(target=srv.start_service, daemon=True)
+    service.start()
+    while not srv.running:
+        time.sleep(0.01)
+    return srv, service
+
+
+def stop_collector(srv: DataCollector, service: threading.Thread):
+    srv.stop()
+    service.join()
+
+
+def run_emitter(config_path: str, port: int) -> DataEmitter:
+    node = DataEmitter(config_path, "127.0.0.1", port)
+    node.initiate_link()
+    node.execute_transfer()
+    node.terminate_link()
+    return node
+
+
+class DelayProxy:
+    """
+    Local TCP relay that holds every chunk for a fixed one-way delay in both directions,
+    so the protocol can be measured with a realistic RTT on loopback.
+    """
+    def __init__(self, target_port: int, one_way_delay: float):
+        self.target_port = target_port
+        self.delay = one_way_delay
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                downstream, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(("127.0.0.1", self.target_port))
+            for conn in (downstream, upstream):
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._pipe(downstream, upstream)
+            self._pipe(upstream, downstream)
+
+    def _pipe(self, src, dst):
+        pending = queue.Queue()
+
+        def reader():
+            while True:
+                try:
+                    data = src.recv(65536)
+                except OSError:
+                    data = b""
+                pending.put((time.monotonic() + self.delay, data))
+                if not data:
+                    return
+
+        def writer():
+            while True:
+                deliver_at, data = pending.get()
+                wait = deliver_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                if not data:
+                    try:
+                        dst.shutdown(socket.SHUT_WR)
+                    except OSError:
+                        pass
+                    return
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=reader, daemon=True).start()
+        threading.Thread(target=writer, daemon=True).start()
+
+    def close(self):
+        self.listener.close()
@@ -0,0 +1,82 @@
+"""
+Per-segment compression: CPU time against bytes saved for each codec, block size and kind of data,
+plus an end-to-end transfer with each codec.
+
+Run from the project root:
+    python -m Benchmarks.compression_bench --size 2000000 --blocks 1024 8192 65536
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+from Network_Packets.compression import CODECS, BlockCompressor, make_codec
+
+
+def sample_data(kind: str, size: int, tmp: str) -> bytes:
+    if kind == "text":
+        with open(write_message(tmp, "sample.txt", size), "rb") as f_obj:
+            return f_obj.read()
+    if kind == "random":
+        return os.urandom(size)
+    # half text, half already compressed data, in big runs
+    half = size // 2
+    return sample_data("text", half, tmp)[:half] + os.urandom(size - half)
+
+
+def run_offline(data: bytes, codec_name: str, block: int, adaptive: bool) -> dict:
+    compressor = BlockCompressor(make_codec(codec_name), adaptive)
+    view = memoryview(data)
+    start = time.process_time()
+    for offset in range(0, len(data), block):
+        compressor.compress(view[offset:offset + block])
+    cpu = time.process_time() - start
+    return {
+        "ratio": compressor.ratio(),
+        "cpu_per_mib": cpu / (len(data) / 2 ** 20),
+        "skipped": compressor.blocks_skipped,
+    }
+
+
+def run_transfer(tmp: str, message: str, codec_name: str, msg: int) -> dict:
+    config = write_config(tmp, f"config_{codec_name}.txt", message, maximum_msg_size=msg, window_size=32,
+                          compression=codec_name)
+    srv, service = start_collector(config)
+    start = time.perf_counter()
+    node = run_emitter(config, srv.srv_sock.getsockname()[1])
+    elapsed = time.perf_counter() - start
+    stop_collector(srv, service)
+    compressor = node.transfer_agent.compressor
+    return {"elapsed": elapsed, "ratio": compressor.ratio() if compressor else 1.0}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[1024, 8192, 65536])
+    parser.add_argument("--kinds", nargs="+", default=["text", "random", "mixed"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in args.kinds:
+            data = sample_data(kind, args.size, tmp)
+            for block in args.blocks:
+                for codec_name in CODECS:
+                    for adaptive in (False, True):
+                        r = run_offline(data, codec_name, block, adaptive)
+                        report(f"[CompressionBench] {kind:>6} block={block:>6} {codec_name:>4} "
+                               f"adaptive={str(adaptive):<5} wire/raw={r['ratio']:6.1%} "
+                               f"cpu={r['cpu_per_mib'] * 1000:8.2f} ms/MiB skipped={r['skipped']}")
+
+        message = write_message(tmp, "message.txt", args.size)
+        for codec_name in ["none", *CODECS]:
+            with quiet():
+                r = run_transfer(tmp, message, codec_name, args.blocks[0])
+            report(f"[CompressionBench] transfer text msg={args.blocks[0]} {codec_name:>4}: {r['elapsed']:6.2f}s "
+                   f"wire/raw={r['ratio']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compares the congestion control strategies (none / reno / delay) under injected loss.
+Each run leaves its cwnd / throughput time series in --trace_dir as <strategy>_<loss>.jsonl.
+
+Run from the project root:
+    python -m Benchmarks.congestion_bench --loss 0 0.02 0.05 --trace_dir traces
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+from Network_Packets.congestion_control import CONTROLLERS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.02, 0.05])
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=64)
+    parser.add_argument("--trace_dir", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_dir = args.trace_dir or tmp
+        os.makedirs(trace_dir, exist_ok=True)
+        message = write_message(tmp, "message.txt", args.size)
+        for loss in args.loss:
+            for name in CONTROLLERS:
+                trace = os.path.join(trace_dir, f"{name}_{loss}.jsonl")
+                config = write_config(tmp, "config.txt", message, maximum_msg_size=args.msg, window_size=args.window,
+                                      sack=True, simulated_loss=loss, congestion_control=name,
+                                      congestion_trace=trace)
+                with quiet():
+                    srv, service = start_collector(config)
+                    start = time.perf_counter()
+                    node = run_emitter(config, srv.srv_sock.getsockname()[1])
+                    elapsed = time.perf_counter() - start
+                    stop_collector(srv, service)
+                framer = node.transfer_agent
+                samples = framer.cc_trace.samples
+                mean_cwnd = sum(s["cwnd"] for s in samples) / max(len(samples), 1)
+                report(f"[CongestionBench] loss={loss:<5} {name:>5}: {elapsed:6.2f}s "
+                       f"{args.size / elapsed / 1024:9.1f} KiB/s, retransmitted {framer.retransmitted_bytes:>9,} bytes, "
+                       f"mean cwnd {mean_cwnd:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Per-message latency of the ways to send one small file, against a collector in this process:
+  cli     a new `python client.py -config ... -port ...` process per message (interpreter start, imports,
+          config parsing, connect, handshake and teardown every time; the interactive flow minus the prompt)
+  daemon  a SenderDaemon started once in its own process, each message is one request on its Unix socket
+  pool    an EmitterPool in this process, each message is one send() over a kept-open link
+plus how long the daemon takes to come up (the cold start the other two pay once).
+
+Run from the project root:
+    python -m Benchmarks.daemon_bench --messages 50 --size 4000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, stop_collector
+from client import EmitterPool
+from sender_daemon import daemon_send
+
+
+def summary(name: str, latencies: list):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    report(f"[DaemonBench] {name:>6}: mean {statistics.mean(ordered) * 1000:8.2f} ms | "
+           f"p50 {statistics.median(ordered) * 1000:8.2f} ms | p99 {p99 * 1000:8.2f} ms | "
+           f"{len(ordered) / sum(ordered):7.1f} msg/s")
+
+
+def run_cli(config: str, port: int, count: int) -> list:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "client.py", "-config", config, "-port", str(port)],
+                       stdout=subprocess.DEVNULL, check=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_daemon(config: str, message: str, port: int, count: int, socket_path: str) -> tuple:
+    start = time.perf_counter()
+    daemon = subprocess.Popen([sys.executable, "sender_daemon.py", "-socket", socket_path, "-config", config,
+                               "-log_level", "warning"], stdout=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.005)
+        startup = time.perf_counter() - start
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            reply = daemon_send(socket_path, message, "127.0.0.1", port)
+            latencies.append(time.perf_counter() - start)
+            if not reply["ok"]:
+                raise RuntimeError(reply["error"])
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    return startup, latencies
+
+
+def run_pool(config: str, message: str, port: int, count: int) -> list:
+    pool = EmitterPool(config)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        pool.send(message, "127.0.0.1", port)
+        latencies.append(time.perf_counter() - start)
+    pool.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--size", type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        config = write_config(tmp, "config.txt", message, log_level="warning")
+        # the collector logs from this process, quiet() keeps that off the console for the whole run
+        with quiet():
+            srv, service = start_collector(config, output_dir=os.path.join(tmp, "out"))
+            port = srv.srv_sock.getsockname()[1]
+            try:
+                summary("cli", run_cli(config, port, args.messages))
+                startup, latencies = run_daemon(config, message, port, args.messages, os.path.join(tmp, "d.sock"))
+                report(f"[DaemonBench] daemon start-up {startup * 1000:.1f} ms, once")
+                summary("daemon", latencies)
+                summary("pool", run_pool(config, message, port, args.messages))
+            finally:
+                stop_collector(srv, service)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+A local lossy link: a TCP relay that understands the protocol's framing and impairs whole frames,
+since the connection underneath is TCP and can't lose bytes on its own.
+
+Data segments (client -> server) and ACKs (server -> client) can be delayed with jitter, lost, reordered
+and duplicated; the handshake and teardown frames only see the base delay and never overtake anything,
+the protocol has no recovery for those. A bandwidth cap applies to every byte in each direction.
+Everything random comes from one seeded generator per direction, so a run can be repeated.
+"""
+import heapq
+import json
+import random
+import socket
+import threading
+import time
+
+from Network_Packets.packet_type import PacketType, CODE_FLAGS
+from Network_Packets.wire_format import FRAME_HEADER, FLAG_BITS, JSON_START
+
+# frames that get the random impairments, per direction
+UPLINK_IMPAIRED = frozenset([PacketType.PUSH])
+DOWNLINK_IMPAIRED = frozenset([PacketType.ACK])
+
+
+class LinkProfile:
+    """
+    delay_ms / jitter_ms: one-way delay, each impaired frame gets a uniform +-jitter on top
+    loss / duplicate / reorder: per-frame probabilities, a reordered frame is held reorder_ms longer
+    bandwidth: bytes per second each way, 0 for no cap
+    """
+    def __init__(self, delay_ms: float = 0.0, jitter_ms: float = 0.0, loss: float = 0.0, reorder: float = 0.0,
+                 reorder_ms: float = None, duplicate: float = 0.0, bandwidth: int = 0, seed: int = None):
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.reorder = reorder
+        self.reorder_ms = reorder_ms if reorder_ms is not None else max(1.0, 2 * delay_ms)
+        self.duplicate = duplicate
+        self.bandwidth = bandwidth
+        self.seed = seed
+
+    def describe(self) -> dict:
+        return dict(vars(self))
+
+
+def split_raw_frames(buffer: bytearray) -> tuple:
+    """
+    Cuts the complete frames at the front of buffer without decoding them.
+    Returns ([(frame bytes, PacketType or None)], consumed), the flag is None for anything unrecognised.
+    """
+    frames = []
+    pos = 0
+    end = len(buffer)
+    while pos < end:
+        if buffer[pos] == JSON_START:
+            line_end = buffer.find(b"\n", pos)
+            if line_end == -1:
+                break
+            raw = bytes(buffer[pos:line_end + 1])
+            try:
+                flag = PacketType(json.loads(raw).get("flag"))
+            except (ValueError, AttributeError):
+                flag = None
+            frames.append((raw, flag))
+            pos = line_end + 1
+        elif buffer[pos] in b"\r\n":
+            frames.append((bytes(buffer[pos:pos + 1]), None))
+            pos += 1
+        else:
+            if end - pos < FRAME_HEADER.size:
+                break
+            code, body_len = FRAME_HEADER.unpack_from(buffer, pos)
+            frame_end = pos + FRAME_HEADER.size + body_len
+            if frame_end > end:
+                break
+            frames.append((bytes(buffer[pos:frame_end]), CODE_FLAGS.get(code & ~FLAG_BITS)))
+            pos = frame_end
+    return frames, pos
+
+
+class _Direction:
+    """One way of the link: a reader cutting frames and scheduling them, a writer delivering them when due."""
+    def __init__(self, src, dst, profile: LinkProfile, impaired: frozenset, seed):
+        self.src = src
+        self.dst = dst
+        self.profile = profile
+        self.impaired = impaired
+        self.rng = random.Random(seed)
+        self.queue = []
+        self.cond = threading.Condition()
+        self._order = 0
+        self._link_free_at = 0.0
+        self._last_in_order = 0.0
+
+        self.frames = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.reordered = 0
+        self.bytes = 0
+
+    def start(self):
+        threading.Thread(target=self._reader, daemon=True).start()
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def _push(self, deliver_at: float, data: bytes):
+        with self.cond:
+            heapq.heappush(self.queue, (deliver_at, self._order, data))
+            self._order += 1
+            self.cond.notify()
+
+    def _schedule(self, frame: bytes, flag):
+        p = self.profile
+        now = time.monotonic()
+        if flag in self.impaired and p.loss and self.rng.random() < p.loss:
+            self.dropped += 1
+            return
+        # the frame occupies the link for len / bandwidth, frames queue up behind each other
+        if p.bandwidth:
+            self._link_free_at = max(now, self._link_free_at) + len(frame) / p.bandwidth
+            sent_at = self._link_free_at
+        else:
+            sent_at = now
+        deliver_at = sent_at + p.delay_ms / 1000
+        if flag in self.impaired:
+            if p.jitter_ms:
+                deliver_at = max(sent_at, deliver_at + self.rng.uniform(-p.jitter_ms, p.jitter_ms) / 1000)
+            if p.reorder and self.rng.random() < p.reorder:
+                deliver_at += p.reorder_ms / 1000
+                self.reordered += 1
+            copies = 2 if p.duplicate and self.rng.random() < p.duplicate else 1
+        else:
+            # control frames keep their place behind everything scheduled before them
+            deliver_at = max(deliver_at, self._last_in_order)
+            copies = 1
+        self._last_in_order = max(self._last_in_order, deliver_at)
+        self.frames += 1
+        self.bytes += len(frame)
+        for copy in range(copies):
+            self._push(deliver_at + copy * 0.0005, frame)
+        self.duplicated += copies - 1
+
+    def _reader(self):
+        buffer = bytearray()
+        while True:
+            try:
+                data = self.src.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                # EOF goes out after everything already scheduled
+                self._push(max(time.monotonic(), self._last_in_order) + 0.001, b"")
+                return
+            buffer += data
+            frames, consumed = split_raw_frames(buffer)
+            del buffer[:consumed]
+            for frame, flag in frames:
+                self._schedule(frame, flag)
+
+    def _writer(self):
+        while True:
+            with self.cond:
+                while not self.queue or self.queue[0][0] > time.monotonic():
+                    self.cond.wait(self.queue[0][0] - time.monotonic() if self.queue else None)
+                _, _, data = heapq.heappop(self.queue)
+            if not data:
+                try:
+                    self.dst.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                return
+            try:
+                self.dst.sendall(data)
+            except OSError:
+                return
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "dropped": self.dropped, "duplicated": self.duplicated,
+                "reordered": self.reordered, "bytes": self.bytes}
+
+
+class LinkEmulator:
+    """Listens on a free local port and relays every connection to target_port through the profile."""
+    def __init__(self, target_port: int, profile: LinkProfile):
+        self.target_port = target_port
+        self.profile = profile
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        self.directions = []
+        self._links = 0
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                downstream, _ = self.listener.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(("127.0.0.1", self.target_port))
+            for conn in (downstream, upstream):
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            seed = self.profile.seed
+            link = self._links
+            self._links += 1
+            # every link and direction gets its own stream of random numbers, derived from the one seed
+            up_seed = None if seed is None else f"{seed}/{link}/up"
+            down_seed = None if seed is None else f"{seed}/{link}/down"
+            for direction in (_Direction(downstream, upstream, self.profile, UPLINK_IMPAIRED, up_seed),
+                              _Direction(upstream, downstream, self.profile, DOWNLINK_IMPAIRED, down_seed)):
+                self.directions.append(direction)
+                direction.start()
+
+    def stats(self) -> dict:
+        """Frame counts summed over every link, per direction."""
+        totals = {"uplink": {}, "downlink": {}}
+        for index, direction in enumerate(self.directions):
+            side = totals["uplink" if index % 2 == 0 else "downlink"]
+            for key, value in direction.stats().items():
+                side[key] = side.get(key, 0) + value
+        return totals
+
+    def close(self):
+        self.listener.close()
@@ -0,0 +1,49 @@
+"""
+Drives N concurrent DataEmitters against one DataCollector and reports aggregate throughput.
+
+Run from the project root:
+    python -m Benchmarks.load_test --clients 1 2 4 8 --size 200000
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+
+
+def run_round(config_path: str, port: int, clients: int) -> float:
+    workers = [threading.Thread(target=run_emitter, args=(config_path, port)) for _ in range(clients)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--size", type=int, default=100000, help="bytes sent by each client")
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        config = write_config(tmp, "config.txt", message, maximum_msg_size=args.msg, window_size=args.window)
+        with quiet():
+            srv, service = start_collector(config)
+            port = srv.srv_sock.getsockname()[1]
+
+            for n in args.clients:
+                elapsed = run_round(config, port, n)
+                total = n * args.size
+                report(f"[LoadTest] {n:>3} clients: {elapsed:6.2f}s, {total / elapsed / 1024:10.1f} KiB/s aggregate")
+            stop_collector(srv, service)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Sweeps window size, message size and timeout over an emulated link (delay, jitter, loss, reordering,
+duplication, bandwidth cap; see Benchmarks/link_emulator.py) and writes one JSON line per case:
+throughput, RTT percentiles, retransmit ratio, the link's frame counts and whether the sha256 check passed.
+With --baseline a previous results file is compared case by case and the run fails on a throughput drop.
+
+The collector and emitter run in this process by default, or each in its own Python process with --subprocess.
+
+Run from the project root:
+    python -m Benchmarks.netem_bench --windows 16 64 --msgs 1024 8192 --timeouts 200 \\
+        --delay 5 --jitter 2 --loss 0.01 --reorder 0.01 --seed 1 --out results.jsonl
+    python -m Benchmarks.netem_bench ... --baseline results.jsonl --tolerance 0.2
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+from Benchmarks.link_emulator import LinkEmulator, LinkProfile
+
+
+def emitter_result(node) -> dict:
+    framer = node.transfer_agent.metrics.snapshot()
+    return {
+        "segments_sent": framer["segments_sent_total"],
+        "bytes_sent": framer["bytes_sent_total"],
+        "retransmit_ratio": framer["retransmitted_bytes_total"] / max(framer["bytes_sent_total"], 1),
+        "timeouts": framer["timeouts_total"],
+        "fast_retransmits": framer["fast_retransmits_total"],
+        "rtt_p50_ms": framer["rtt_ms"]["p50"],
+        "rtt_p99_ms": framer["rtt_ms"]["p99"],
+        "integrity_ok": node.integrity_ok,
+    }
+
+
+def run_inprocess(config: str, profile: LinkProfile, output_dir: str) -> tuple:
+    with quiet():
+        srv, service = start_collector(config, output_dir=output_dir)
+        link = LinkEmulator(srv.srv_sock.getsockname()[1], profile)
+        start = time.perf_counter()
+        node = run_emitter(config, link.port)
+        elapsed = time.perf_counter() - start
+        link.close()
+        stop_collector(srv, service)
+    return elapsed, emitter_result(node), link.stats()
+
+
+def run_subprocess(config: str, profile: LinkProfile, output_dir: str) -> tuple:
+    module = [sys.executable, "-m", "Benchmarks.netem_bench"]
+    collector = subprocess.Popen(module + ["--child-collector", config, output_dir],
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(collector.stdout.readline().split()[1])
+        link = LinkEmulator(port, profile)
+        start = time.perf_counter()
+        emitter = subprocess.run(module + ["--child-emitter", config, str(link.port)],
+                                 stdout=subprocess.PIPE, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        link.close()
+    finally:
+        # closing its stdin tells the collector to shut down
+        collector.stdin.close()
+        collector.wait()
+    return elapsed, json.loads(emitter.stdout.strip().splitlines()[-1]), link.stats()
+
+
+def child_collector(config: str, output_dir: str):
+    with quiet():
+        srv, service = start_collector(config, output_dir=output_dir)
+    print(f"PORT {srv.srv_sock.getsockname()[1]}", flush=True)
+    sys.stdin.read()
+    with quiet():
+        stop_collector(srv, service)
+
+
+def child_emitter(config: str, port: int):
+    with quiet():
+        node = run_emitter(config, port)
+    print(json.dumps(emitter_result(node)), flush=True)
+
+
+def case_key(case: dict) -> tuple:
+    return tuple(sorted((k, json.dumps(v)) for k, v in case.items()))
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f_obj:
+        rows = [json.loads(line) for line in f_obj if line.strip()]
+    return {case_key(row["case"]): row for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--msgs", type=int, nargs="+", default=[1024, 8192])
+    parser.add_argument("--timeouts", type=int, nargs="+", default=[200])
+    parser.add_argument("--format", default="binary", choices=["json", "binary"])
+    parser.add_argument("--no-sack", action="store_true")
+    parser.add_argument("--delay", type=float, default=5.0, help="one-way delay in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+- ms on data segments and ACKs")
+    parser.add_argument("--loss", type=float, default=0.0, help="per-frame loss probability")
+    parser.add_argument("--reorder", type=float, default=0.0, help="per-frame probability of being held back")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="per-frame duplication probability")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes per second each way, 0 = unlimited")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the median throughput is kept")
+    parser.add_argument("--subprocess", action="store_true", help="collector and emitter in their own processes")
+    parser.add_argument("--out", help="JSON lines file for the results")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative throughput drop")
+    parser.add_argument("--child-collector", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--child-emitter", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_collector:
+        return child_collector(*args.child_collector)
+    if args.child_emitter:
+        return child_emitter(args.child_emitter[0], int(args.child_emitter[1]))
+
+    profile = LinkProfile(args.delay, args.jitter, args.loss, args.reorder, duplicate=args.duplicate,
+                          bandwidth=args.bandwidth, seed=args.seed)
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    runner = run_subprocess if args.subprocess else run_inprocess
+    regressions = 0
+    out = open(args.out, "w") if args.out else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for window, msg, timeout in itertools.product(args.windows, args.msgs, args.timeouts):
+            case = {"window": window, "msg": msg, "timeout": timeout, "format": args.format,
+                    "sack": not args.no_sack, "size": args.size, "link": profile.describe()}
+            config = write_config(tmp, f"config_{window}_{msg}_{timeout}.txt", message, maximum_msg_size=msg,
+                                  window_size=window, timeout=timeout, wire_format=args.format,
+                                  sack=not args.no_sack, integrity=True, log_level="warning")
+            runs = []
+            for attempt in range(args.repeat):
+                elapsed, result, link_stats = runner(config, profile, os.path.join(tmp, f"out_{attempt}"))
+                runs.append({"elapsed": elapsed, "throughput_bps": args.size * 8 / elapsed, **result,
+                             "link": link_stats})
+            row = {"case": case, **sorted(runs, key=lambda r: r["throughput_bps"])[len(runs) // 2]}
+
+            verdict = ""
+            previous = baseline.get(case_key(case))
+            if previous is not None:
+                change = row["throughput_bps"] / previous["throughput_bps"] - 1
+                row["baseline_change"] = round(change, 4)
+                if change < -args.tolerance:
+                    regressions += 1
+                    verdict = "  REGRESSION"
+                verdict = f"  vs baseline {change:+.1%}{verdict}"
+            report(f"[NetemBench] window={window:<4} msg={msg:<6} timeout={timeout:<5} "
+                   f"{row['throughput_bps'] / 8 / 1024:9.1f} KiB/s  rtt p50/p99={row['rtt_p50_ms']}/"
+                   f"{row['rtt_p99_ms']}ms  retransmit={row['retransmit_ratio']:.2%}  "
+                   f"digest_ok={row['integrity_ok']}{verdict}")
+            if out:
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+    if out:
+        out.close()
+    if regressions:
+        report(f"[NetemBench] {regressions} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Decode cost per packet of the path every link uses (frames decoded straight to slotted packet objects through
+the flag tables in Network_Packets/packet.py): one scan over a whole buffer, and a FrameDecoder fed in recv
+sized chunks the way a socket delivers them. Also ACK encoding with a new AckPacket per ACK against one reused
+object, the way a collector session sends them (packets/sec only, both allocate the same short-lived frame).
+
+Packets/sec is the best of --repeat runs without tracing; memory with tracemalloc on a separate run: the peak bytes allocated
+per packet while decoding a batch, and the bytes per packet still held by the decoded list afterwards.
+
+Run from the project root:
+    python -m Benchmarks.packet_bench --count 100000 --payload 256
+"""
+import argparse
+import time
+import tracemalloc
+
+from Network_Packets.packet import DataPacket, AckPacket, PacketType, decode_json, decode_binary
+from Network_Packets.wire_format import WireFormat, scan_frames
+from Network_Packets.frame_decoder import FrameDecoder, DEFAULT_RECV_SIZE
+
+
+def scan_path(buffer) -> list:
+    return scan_frames(buffer, decode_json, decode_binary)[0]
+
+
+def decoder_path(buffer) -> list:
+    decoder = FrameDecoder(DEFAULT_RECV_SIZE)
+    packets = []
+    for i in range(0, len(buffer), DEFAULT_RECV_SIZE):
+        decoder.feed(buffer[i:i + DEFAULT_RECV_SIZE])
+        packets.extend(decoder.packets())
+    return packets
+
+
+def build_stream(wire_format: WireFormat, count: int, payload_size: int) -> bytes:
+    payload = b"x" * payload_size
+    wire = []
+    for seq in range(count):
+        wire.append(DataPacket(PacketType.PUSH, seq, payload, offset=seq * payload_size).encode(wire_format))
+        wire.append(AckPacket(PacketType.ACK, seq, sack_blocks=[[seq + 2, seq + 3]]).encode(wire_format))
+    return b"".join(wire)
+
+
+def best_time(run, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure_decode(decode, stream: bytes, total: int, repeat: int) -> dict:
+    elapsed = best_time(lambda: decode(stream), repeat)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    packets = decode(stream)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del packets
+    return {
+        "pps": total / elapsed,
+        "peak_per_packet": (peak - baseline) / total,
+        "held_per_packet": (held - baseline) / total,
+    }
+
+
+def measure_ack_encode(wire_format: WireFormat, count: int, reuse: bool, repeat: int) -> dict:
+    def encode_all():
+        ack = AckPacket(PacketType.ACK, -1)
+        for seq in range(count):
+            if reuse:
+                ack.ack = seq
+                ack.sack_blocks = [[seq + 2, seq + 3]]
+            else:
+                ack = AckPacket(PacketType.ACK, seq, sack_blocks=[[seq + 2, seq + 3]])
+            ack.encode(wire_format)
+
+    return {"pps": count / best_time(encode_all, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000, help="data segments, each followed by one ACK")
+    parser.add_argument("--payload", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the fastest one counts")
+    args = parser.parse_args()
+
+    for wire_format in WireFormat:
+        stream = build_stream(wire_format, args.count, args.payload)
+        for name, decode in (("scan", scan_path), ("chunks", decoder_path)):
+            r = measure_decode(decode, stream, args.count * 2, args.repeat)
+            print(f"[PacketBench] {wire_format.value:>6} decode {name:>6}: {r['pps']:>12,.0f} pkt/s | "
+                  f"peak {r['peak_per_packet']:7.1f} B/pkt | held {r['held_per_packet']:7.1f} B/pkt")
+        for reuse in (False, True):
+            r = measure_ack_encode(wire_format, args.count, reuse, args.repeat)
+            print(f"[PacketBench] {wire_format.value:>6} ACK encode {'reused' if reuse else 'new':>6}: "
+                  f"{r['pps']:>12,.0f} pkt/s")
+
+
+if __name__ == "__main__":
+    main()
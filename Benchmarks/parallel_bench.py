@@ -0,0 +1,49 @@
+"""
+Throughput of one file sent over 1..N parallel streams, on plain loopback and with added RTT.
+
+Run from the project root:
+    python -m Benchmarks.parallel_bench --streams 1 2 4 8 --rtt 0 20 --size 4000000
+"""
+import argparse
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, DelayProxy
+from client import ParallelEmitter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0, 20], help="added round trip time in ms")
+    parser.add_argument("--size", type=int, default=4000000)
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for rtt in args.rtt:
+            baseline = None
+            for streams in args.streams:
+                config = write_config(tmp, "config.txt", message, maximum_msg_size=args.msg,
+                                      window_size=args.window, timeout=max(200, int(rtt * 4)), sack=True,
+                                      parallel_streams=streams)
+                with quiet():
+                    srv, service = start_collector(config, output_dir=tmp + "/out")
+                    proxy = DelayProxy(srv.srv_sock.getsockname()[1], rtt / 2000.0) if rtt else None
+                    start = time.perf_counter()
+                    ParallelEmitter(config, "127.0.0.1", proxy.port if proxy else srv.srv_sock.getsockname()[1]).run()
+                    elapsed = time.perf_counter() - start
+                    if proxy:
+                        proxy.close()
+                    stop_collector(srv, service)
+                throughput = args.size / elapsed / 1024
+                baseline = baseline or throughput
+                report(f"[ParallelBench] rtt={rtt:>5}ms streams={streams:>2}: {elapsed:6.2f}s "
+                       f"{throughput:9.1f} KiB/s ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
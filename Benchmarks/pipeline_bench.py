@@ -0,0 +1,45 @@
+"""
+Single loop Framer against the PipelinedFramer over a link with added RTT.
+
+Run from the project root:
+    python -m Benchmarks.pipeline_bench --rtt 0 10 50 --size 1000000
+"""
+import argparse
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter, DelayProxy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0, 10, 50], help="added round trip time in ms")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=64)
+    # fixed window by default so the comparison isn't dominated by cwnd growth
+    parser.add_argument("--congestion", type=str, default="none")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for rtt in args.rtt:
+            for pipelined in (False, True):
+                config = write_config(tmp, "config.txt", message, maximum_msg_size=args.msg,
+                                      window_size=args.window, timeout=max(200, int(rtt * 4)), sack=True,
+                                      pipelined=pipelined, congestion_control=args.congestion)
+                with quiet():
+                    srv, service = start_collector(config)
+                    proxy = DelayProxy(srv.srv_sock.getsockname()[1], rtt / 2000.0)
+                    start = time.perf_counter()
+                    run_emitter(config, proxy.port)
+                    elapsed = time.perf_counter() - start
+                    proxy.close()
+                    stop_collector(srv, service)
+                mode = "pipelined" if pipelined else "loop"
+                report(f"[PipelineBench] rtt={rtt:>5}ms {mode:>9}: {elapsed:6.2f}s {args.size / elapsed / 1024:9.1f} KiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Loss injection: retransmitted bytes and transfer time with and without SACK.
+
+Run from the project root:
+    python -m Benchmarks.sack_bench --loss 0.01 0.05 0.1 --size 500000
+"""
+import argparse
+import tempfile
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, run_emitter
+
+
+def run_case(tmp: str, message: str, loss: float, sack: bool, args) -> dict:
+    config = write_config(tmp, f"config_{loss}_{sack}.txt", message, maximum_msg_size=args.msg,
+                          window_size=args.window, timeout=args.timeout, sack=sack, simulated_loss=loss)
+    srv, service = start_collector(config)
+    start = time.perf_counter()
+    node = run_emitter(config, srv.srv_sock.getsockname()[1])
+    elapsed = time.perf_counter() - start
+    stop_collector(srv, service)
+    framer = node.transfer_agent
+    return {
+        "elapsed": elapsed,
+        "retransmitted_bytes": framer.retransmitted_bytes,
+        "retransmit_ratio": framer.retransmitted_bytes / max(framer.total_bytes, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.01, 0.05, 0.1])
+    parser.add_argument("--size", type=int, default=300000)
+    parser.add_argument("--msg", type=int, default=1024)
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--timeout", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for loss in args.loss:
+            for sack in (False, True):
+                with quiet():
+                    r = run_case(tmp, message, loss, sack, args)
+                report(f"[SackBench] loss={loss:<5} sack={str(sack):<5} {r['elapsed']:6.2f}s "
+                       f"retransmitted={r['retransmitted_bytes']:>9,} bytes ({r['retransmit_ratio']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
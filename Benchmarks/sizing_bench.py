@@ -0,0 +1,121 @@
+"""
+Dynamic segment sizing: goodput of fixed small segments, fixed maximum-size segments, the random resizes
+and the adaptive sizer, over a range of loss rates and round trip times. Loss is drawn per
+simulated_loss_unit bytes (one packet), so a big segment is lost more often than a small one, like on a real link.
+
+A case that doesn't finish within --time-limit seconds is reported as stalled: maximum-size segments under
+heavy loss get lost again on every retransmission and the RTO backs off towards a minute.
+The random mode (5-20 byte segments) takes minutes per case, it only runs when asked for with --modes.
+
+Run from the project root:
+    python -m Benchmarks.sizing_bench
+    python -m Benchmarks.sizing_bench --size 8000000 --loss 0.005 --rtt 10 --repeat 3
+"""
+import argparse
+import socket
+import tempfile
+import threading
+import time
+
+from Benchmarks.bench_utils import write_config, write_message, quiet, report, start_collector, \
+    stop_collector, DelayProxy
+from client import DataEmitter
+
+MODES = ["fixed-small", "fixed-max", "random", "adaptive"]
+DEFAULT_MODES = ["fixed-small", "fixed-max", "adaptive"]
+
+
+def mode_params(mode: str, args) -> dict:
+    if mode == "fixed-small":
+        return {"maximum_msg_size": args.min_msg}
+    if mode == "fixed-max":
+        return {"maximum_msg_size": args.max_msg}
+    # dynamic_message_size is only set for the dynamic modes
+    return {"maximum_msg_size": args.max_msg, "dynamic_message_size": True, "dynamic_sizing": mode,
+            "min_msg_size": args.min_msg}
+
+
+def transfer(node: DataEmitter, errors: list):
+    try:
+        node.initiate_link()
+        node.execute_transfer()
+        node.terminate_link()
+    except (OSError, ValueError) as e:
+        # ValueError: a stalled run's socket closed under its select
+        errors.append(e)
+
+
+def run_case(tmp: str, message: str, mode: str, loss: float, rtt: float, args) -> dict:
+    config = write_config(tmp, f"config_{mode}_{loss}_{rtt}.txt", message, window_size=args.window,
+                          timeout=args.timeout, sack=True, integrity=True, simulated_loss=loss,
+                          simulated_loss_unit=args.loss_unit, **mode_params(mode, args))
+    srv, service = start_collector(config)
+    proxy = DelayProxy(srv.srv_sock.getsockname()[1], rtt / 2000.0) if rtt else None
+    node = DataEmitter(config, "127.0.0.1", proxy.port if proxy else srv.srv_sock.getsockname()[1])
+    errors = []
+    worker = threading.Thread(target=transfer, args=(node, errors), daemon=True)
+    start = time.perf_counter()
+    worker.start()
+    worker.join(args.time_limit)
+    elapsed = time.perf_counter() - start
+    stalled = worker.is_alive()
+    if stalled:
+        # the emitter may sit out a backed off RTO of up to a minute, its next select or send fails instead
+        node.link_socket.shutdown(socket.SHUT_RDWR)
+        node.link_socket.close()
+        worker.join()
+    if proxy:
+        proxy.close()
+    stop_collector(srv, service)
+    if errors and not stalled:
+        raise errors[0]
+    framer = node.transfer_agent
+    return {
+        "elapsed": elapsed,
+        "stalled": stalled,
+        "segments": framer.segments_sent,
+        "retransmitted": framer.retransmitted_bytes,
+        "timeouts": framer.timeouts,
+        "final_size": framer.msg_size,
+        "ok": node.integrity_ok,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4000000)
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.005, 0.02],
+                        help="loss probability per --loss-unit bytes")
+    parser.add_argument("--loss-unit", type=int, default=1500)
+    parser.add_argument("--min-msg", type=int, default=1024)
+    parser.add_argument("--max-msg", type=int, default=65536)
+    parser.add_argument("--window", type=int, default=32)
+    parser.add_argument("--timeout", type=int, default=200)
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0, 10],
+                        help="round trip time added by a local proxy, in ms")
+    parser.add_argument("--modes", nargs="+", default=DEFAULT_MODES, choices=MODES)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the median time is kept")
+    parser.add_argument("--time-limit", type=float, default=20.0, help="seconds before a run counts as stalled")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message = write_message(tmp, "message.txt", args.size)
+        for rtt in args.rtt:
+            for loss in args.loss:
+                for mode in args.modes:
+                    with quiet():
+                        runs = sorted((run_case(tmp, message, mode, loss, rtt, args) for _ in range(args.repeat)),
+                                      key=lambda run: run["elapsed"])
+                    r = runs[len(runs) // 2]
+                    label = f"[SizingBench] rtt={rtt:<4g} loss={loss:<6} {mode:>11}:"
+                    if r["stalled"]:
+                        report(f"{label} stalled, not done after {args.time_limit:g}s "
+                               f"({sum(run['stalled'] for run in runs)}/{len(runs)} runs)")
+                        continue
+                    report(f"{label} {r['elapsed']:6.2f}s {args.size / r['elapsed'] / 1024:9.1f} KiB/s  "
+                           f"segments={r['segments']:>6,} retransmitted={r['retransmitted']:>9,}B "
+                           f"timeouts={r['timeouts']:>3} final_size={r['final_size']:>6} digest_ok={r['ok']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Packets/sec for the JSON and binary wire formats.
+
+Run from the project root:
+    python -m Benchmarks.wire_format_bench --count 200000 --payload 512
+"""
+import argparse
+import time
+
+from Network_Packets.packet import DataPacket, AckPacket, PacketType
+from Network_Packets.wire_format import WireFormat
+from Network_Packets.frame_decoder import FrameDecoder
+
+
+def run_format(wire_format: WireFormat, count: int, payload_size: int, recv_size: int) -> dict:
+    payload = b"x" * payload_size
+
+    start = time.perf_counter()
+    wire = []
+    for seq in range(count):
+        wire.append(DataPacket(PacketType.PUSH, seq, payload, offset=seq * payload_size).encode(wire_format))
+        wire.append(AckPacket(PacketType.ACK, seq).encode(wire_format))
+    encode_time = time.perf_counter() - start
+
+    # decode in recv sized chunks, the way the receivers see the stream (frames cut across reads included)
+    stream = b"".join(wire)
+    decoder = FrameDecoder(recv_size)
+    start = time.perf_counter()
+    decoded = 0
+    for i in range(0, len(stream), recv_size):
+        decoder.feed(stream[i:i + recv_size])
+        decoded += len(decoder.packets())
+    decode_time = time.perf_counter() - start
+
+    total = count * 2
+    return {
+        "format": wire_format.value,
+        "packets": decoded,
+        "bytes": sum(len(w) for w in wire),
+        "encode_pps": total / encode_time,
+        "decode_pps": total / decode_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--payload", type=int, default=256)
+    parser.add_argument("--recv-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    for wire_format in WireFormat:
+        r = run_format(wire_format, args.count, args.payload, args.recv_size)
+        print(f"[Bench] {r['format']:>6}: encode {r['encode_pps']:>12,.0f} pkt/s | "
+              f"decode {r['decode_pps']:>12,.0f} pkt/s | {r['bytes']:,} bytes on the wire")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import lzma
+import time
+import zlib
+
+# Every data segment is compressed on its own, so a retransmitted, reordered or re-sliced segment
+# decodes without any shared state. Raw deflate / raw LZMA2 streams keep the per-block overhead small.
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+
+class ZlibCodec:
+    name = "zlib"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data, max_length: int) -> bytes:
+        decompressor = zlib.decompressobj(-15)
+        out = decompressor.decompress(data, max_length)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError("compressed block is corrupt or larger than the maximum message size")
+        return out
+
+
+class LzmaCodec:
+    name = "lzma"
+
+    def compress(self, data) -> bytes:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+    def decompress(self, data, max_length: int) -> bytes:
+        decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+        try:
+            out = decompressor.decompress(bytes(data), max_length)
+        except lzma.LZMAError as e:
+            raise ValueError(f"compressed block is corrupt: {e}")
+        if not decompressor.eof:
+            raise ValueError("compressed block is corrupt or larger than the maximum message size")
+        return out
+
+
+CODECS = {codec.name: codec for codec in (ZlibCodec, LzmaCodec)}
+NO_COMPRESSION = "none"
+
+
+def parse_codecs(value) -> list:
+    """'zlib,lzma' / ['lzma'] / 'none' -> the known codec names, in preference order."""
+    if not value:
+        return []
+    names = value.split(",") if isinstance(value, str) else value
+    return [name.strip().lower() for name in names if name.strip().lower() in CODECS]
+
+
+def negotiate_compression(client_codecs, server_codecs) -> str:
+    """The client's most preferred codec that the server also allows, 'none' when there is no overlap."""
+    allowed = set(parse_codecs(server_codecs))
+    for name in parse_codecs(client_codecs):
+        if name in allowed:
+            return name
+    return NO_COMPRESSION
+
+
+def make_codec(name: str):
+    return CODECS[name]() if name in CODECS else None
+
+
+class BlockCompressor:
+    """
+    Sender side: compresses one segment at a time and sends it raw when that doesn't make it smaller.
+    In adaptive mode a run of blocks that didn't shrink (already compressed or random data) makes it stop
+    trying for a while; the pause doubles on every further miss and resets on the first block that shrinks.
+    """
+    MISSES_BEFORE_SKIP = 8
+    MAX_SKIP = 1024
+
+    def __init__(self, codec, adaptive: bool = True):
+        self.codec = codec
+        self.adaptive = adaptive
+        self._misses = 0
+        self._skip_next = 0
+        self._skip_length = 16
+
+        self.blocks_compressed = 0
+        self.blocks_raw = 0
+        self.blocks_skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def compress(self, block):
+        """Returns (payload, compressed) for one segment, payload is the block itself when sent raw."""
+        size = len(block)
+        self.bytes_in += size
+        if self._skip_next:
+            self._skip_next -= 1
+            self.blocks_skipped += 1
+            self.bytes_out += size
+            return block, False
+
+        start = time.process_time()
+        packed = self.codec.compress(block)
+        self.cpu_seconds += time.process_time() - start
+
+        if len(packed) < size:
+            self.blocks_compressed += 1
+            self.bytes_out += len(packed)
+            self._misses = 0
+            self._skip_length = 16
+            return packed, True
+
+        self.blocks_raw += 1
+        self.bytes_out += size
+        self._misses += 1
+        if self.adaptive and self._misses >= self.MISSES_BEFORE_SKIP:
+            self._skip_next = self._skip_length
+            self._skip_length = min(self._skip_length * 2, self.MAX_SKIP)
+            # after the pause a single miss is enough to pause again
+            self._misses = self.MISSES_BEFORE_SKIP - 1
+        return block, False
+
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
@@ -0,0 +1,153 @@
+import json
+import time
+from abc import ABC, abstractmethod
+
+
+class CongestionController(ABC):
+    """
+    Keeps the congestion window (in segments). The Framer sends at most min(cwnd, negotiated window)
+    and reports every ACK advance, triple duplicate ACK and timeout here.
+    """
+    name = "base"
+
+    def __init__(self, max_cwnd: int, initial_cwnd: float = 4.0):
+        self.max_cwnd = max(1, max_cwnd)
+        self.cwnd = min(float(initial_cwnd), self.max_cwnd)
+        self.ssthresh = float(self.max_cwnd)
+
+    def window(self) -> int:
+        return max(1, int(self.cwnd))
+
+    def _clamp(self):
+        self.cwnd = max(1.0, min(self.cwnd, float(self.max_cwnd)))
+
+    @abstractmethod
+    def on_ack(self, newly_acked: int, rtt_ms: float = None):
+        pass
+
+    def on_triple_dup_ack(self):
+        # multiplicative decrease, shared by every strategy here
+        self.ssthresh = max(self.cwnd / 2, 2.0)
+        self.cwnd = self.ssthresh
+        self._clamp()
+
+    def on_timeout(self):
+        self.ssthresh = max(self.cwnd / 2, 2.0)
+        self.cwnd = 1.0
+
+
+class FixedWindow(CongestionController):
+    """No congestion control, always the full negotiated window (the old behaviour)."""
+    name = "none"
+
+    def __init__(self, max_cwnd: int, initial_cwnd: float = 4.0):
+        super().__init__(max_cwnd, max_cwnd)
+
+    def on_ack(self, newly_acked: int, rtt_ms: float = None):
+        pass
+
+    def on_triple_dup_ack(self):
+        pass
+
+    def on_timeout(self):
+        pass
+
+
+class RenoController(CongestionController):
+    """Slow start up to ssthresh, then additive increase of one segment per window of ACKs."""
+    name = "reno"
+
+    def on_ack(self, newly_acked: int, rtt_ms: float = None):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += newly_acked
+        else:
+            self.cwnd += newly_acked / self.cwnd
+        self._clamp()
+
+
+class DelayBasedController(CongestionController):
+    """
+    Vegas style: compares the RTT against the lowest one seen. The estimated number of segments sitting
+    in queues (cwnd * (1 - base_rtt / rtt)) is kept between alpha and beta, loss still halves the window.
+    """
+    name = "delay"
+    ALPHA = 2.0
+    BETA = 4.0
+    GAMMA = 1.0
+
+    def __init__(self, max_cwnd: int, initial_cwnd: float = 4.0):
+        super().__init__(max_cwnd, initial_cwnd)
+        self.base_rtt = None
+        self.last_rtt = None
+
+    def on_ack(self, newly_acked: int, rtt_ms: float = None):
+        if rtt_ms is not None and rtt_ms > 0:
+            self.base_rtt = rtt_ms if self.base_rtt is None else min(self.base_rtt, rtt_ms)
+            self.last_rtt = rtt_ms
+        if self.base_rtt is None or self.last_rtt is None:
+            self.cwnd += newly_acked if self.cwnd < self.ssthresh else newly_acked / self.cwnd
+            self._clamp()
+            return
+
+        queued = self.cwnd * (1 - self.base_rtt / self.last_rtt)
+        if self.cwnd < self.ssthresh:
+            if queued > self.GAMMA:
+                # queues are building up, leave slow start
+                self.ssthresh = self.cwnd
+            else:
+                self.cwnd += newly_acked
+        elif queued < self.ALPHA:
+            self.cwnd += newly_acked / self.cwnd
+        elif queued > self.BETA:
+            self.cwnd -= newly_acked / self.cwnd
+        self._clamp()
+
+
+CONTROLLERS = {cls.name: cls for cls in (FixedWindow, RenoController, DelayBasedController)}
+
+
+def make_controller(name: str, max_cwnd: int) -> CongestionController:
+    try:
+        return CONTROLLERS[str(name).lower()](max_cwnd)
+    except KeyError:
+        raise ValueError(f"Unknown congestion control '{name}', expected one of {sorted(CONTROLLERS)}")
+
+
+class CongestionTrace:
+    """
+    Time series of cwnd and throughput for one transfer, sampled at most every interval seconds.
+    Samples stay in memory and are also written as JSON lines when a path is given.
+    """
+    def __init__(self, path: str = None, interval: float = 0.01):
+        self.path = path
+        self.interval = interval
+        self.samples = []
+        self.started = time.monotonic()
+        self._last_time = self.started
+        self._last_bytes = 0
+        self._file = open(path, 'w') if path else None
+
+    def record(self, controller: CongestionController, acked_bytes: int, event: str = None):
+        now = time.monotonic()
+        if event is None and now - self._last_time < self.interval:
+            return
+        elapsed = now - self._last_time
+        sample = {
+            "t": round(now - self.started, 6),
+            "cwnd": round(controller.cwnd, 3),
+            "ssthresh": round(controller.ssthresh, 3),
+            "acked_bytes": acked_bytes,
+            "throughput_bps": round((acked_bytes - self._last_bytes) * 8 / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        if event is not None:
+            sample["event"] = event
+        self._last_time = now
+        self._last_bytes = acked_bytes
+        self.samples.append(sample)
+        if self._file:
+            self._file.write(json.dumps(sample) + "\n")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,49 @@
+from collections import deque
+
+from Network_Packets.packet import decode_json, decode_binary
+from Network_Packets.wire_format import scan_frames
+
+DEFAULT_RECV_SIZE = 64 * 1024
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for one side of a link, shared by the collector sessions, the Framer and the emitter.
+    Reads land in a reusable scratch buffer (recv_into) and are appended to a single bytearray; complete
+    frames are cut off its front once per read, a partial frame (or half a UTF-8 character) simply waits
+    for the next read. Frames are decoded straight to Packet objects with a PacketType flag. Packets a caller
+    decoded but did not consume can be pushed back for the next reader.
+    """
+    def __init__(self, recv_size: int = DEFAULT_RECV_SIZE):
+        self.recv_size = max(1, int(recv_size))
+        self.buffer = bytearray()
+        self._scratch = bytearray(self.recv_size)
+        self._scratch_view = memoryview(self._scratch)
+        self.pending = deque()
+
+    def recv_from(self, sock) -> int:
+        """One recv_into on sock. Returns the number of bytes read, 0 means the peer closed the link."""
+        received = sock.recv_into(self._scratch_view, self.recv_size)
+        if received:
+            self.buffer += self._scratch_view[:received]
+        return received
+
+    def feed(self, data: bytes):
+        self.buffer += data
+
+    def packets(self) -> list:
+        """Every complete packet so far in arrival order, pushed back ones first. Partial frames stay buffered."""
+        found, consumed = scan_frames(self.buffer, decode_json, decode_binary)
+        if consumed:
+            del self.buffer[:consumed]
+        if self.pending:
+            found = list(self.pending) + found
+            self.pending.clear()
+        return found
+
+    def push_back(self, packets: list):
+        """Returns packets that were decoded but not handled, they come out first on the next packets() call."""
+        self.pending.extendleft(reversed(packets))
+
+    def buffered_bytes(self) -> int:
+        return len(self.buffer)
@@ -1,8 +1,20 @@
 from abc import ABC, abstractmethod
+import base64
 import json
-from Network_Packets.packet_type import PacketType
+import struct
+from Network_Packets.packet_type import PacketType, FLAG_CODES
+from Network_Packets.wire_format import WireFormat, FRAME_HEADER, SEGMENT_FIELDS, ACK_FIELDS, NO_BLOCK_SIZE, \
+    SACK_COUNT, SACK_BLOCK, COMPRESSED_BIT, CHECKSUM_BIT, CHECKSUM_FIELD, WINDOW_BIT, WINDOW_FIELD
+
+
+def _flag_value(flag) -> str:
+    return flag.value if isinstance(flag, PacketType) else flag
+
 
 class Packet(ABC):
+    # slotted, a transfer creates one object per segment and per ACK
+    __slots__ = ("flag",)
+
     def __init__(self, flag: PacketType):
         self.flag = flag
 
@@ -14,26 +26,103 @@ class Packet(ABC):
     def to_bytes(self) -> bytes:
         pass
 
+    def to_binary(self) -> bytes:
+        # Control packets carry no body in the binary format
+        return FRAME_HEADER.pack(FLAG_CODES[PacketType(self.flag)], 0)
+
+    def encode(self, wire_format: WireFormat = WireFormat.JSON) -> bytes:
+        if wire_format == WireFormat.BINARY:
+            return self.to_binary()
+        return self.to_bytes()
+
+    def encode_parts(self, wire_format: WireFormat = WireFormat.JSON) -> list:
+        """The encoded frame as a list of buffers, for scatter-gather writes (see write_frames)."""
+        return [self.encode(wire_format)]
+
 class HandshakePacket(Packet):
-    def __init__(self, flag: PacketType, window: int, maximum_message_size: int, timeout: int, dynamic_size: bool):
+    __slots__ = ("window", "maximum_message_size", "timeout", "dynamic", "wire_format", "file_name", "sack",
+                 "ack_interval", "ack_delay", "transfer_id", "range_offset", "total_size", "content_hash",
+                 "resume_offset", "compression", "integrity", "batch", "keep_alive", "flow_control")
+
+    def __init__(self, flag: PacketType, window: int, maximum_message_size: int, timeout: int, dynamic_size: bool,
+                 wire_format: str = WireFormat.JSON.value, file_name: str = None, sack: bool = False,
+                 ack_interval: int = 1, ack_delay: int = 0, transfer_id: str = None, range_offset: int = 0,
+                 total_size: int = None, content_hash: str = None, resume_offset: int = 0,
+                 compression=None, integrity: bool = False, batch: int = 0,
+                 keep_alive: bool = False, flow_control: bool = False):
         super().__init__(flag)
         self.window = int(window)
         self.maximum_message_size = int(maximum_message_size)
         self.timeout = int(timeout)
         self.dynamic = bool(dynamic_size)
+        self.wire_format = wire_format or WireFormat.JSON.value
+        # lets the receiver name its output file, only sent on SYN
+        self.file_name = file_name
+        self.sack = bool(sack)
+        # delayed ACKs: the receiver ACKs every ack_interval in-order segments, or after ack_delay ms at the latest
+        self.ack_interval = max(1, int(ack_interval or 1))
+        self.ack_delay = max(0, int(ack_delay or 0))
+        # parallel streams: every connection of one transfer carries the same id and the byte offset of its range
+        # inside the whole file (total_size), so the receiver can put the ranges back together. SYN only
+        self.transfer_id = transfer_id
+        self.range_offset = int(range_offset or 0)
+        self.total_size = None if total_size is None else int(total_size)
+        # resumable transfers: the SYN names the content (sha256), the SYN/ACK says how much of it the
+        # receiver already committed in an earlier session
+        self.content_hash = content_hash
+        self.resume_offset = int(resume_offset or 0)
+        # SYN: the codecs the client can use, most preferred first. SYN/ACK: the one picked (or "none")
+        self.compression = compression
+        # per-segment CRC32 plus a whole-transfer sha256 exchanged in FIN and FIN/ACK
+        self.integrity = bool(integrity)
+        # SYN: number of files in a batch transfer (see Utils/batch.py), the SYN/ACK echoes it when accepted
+        self.batch = int(batch or 0)
+        # the link stays open after FIN / FIN/ACK and the next SYN starts another transfer on it (sender pools)
+        self.keep_alive = bool(keep_alive)
+        # every ACK carries the receiver's free buffer space and the sender keeps what's in flight below it
+        self.flow_control = bool(flow_control)
 
     def return_dict(self) -> dict:
-        return {
+        data = {
             "flag": self.flag.value if isinstance(self.flag, PacketType) else self.flag,
             "window_size": self.window,
             "maximum_msg_size": self.maximum_message_size,
             "timeout": self.timeout,
-            "dynamic_size": self.dynamic
+            "dynamic_size": self.dynamic,
+            "wire_format": self.wire_format,
+            "sack": self.sack,
+            "ack_interval": self.ack_interval,
+            "ack_delay": self.ack_delay
         }
+        if self.file_name is not None:
+            data["file_name"] = self.file_name
+        if self.transfer_id is not None:
+            data["transfer_id"] = self.transfer_id
+            data["range_offset"] = self.range_offset
+            data["total_size"] = self.total_size
+        if self.content_hash is not None:
+            data["content_hash"] = self.content_hash
+        if self.resume_offset:
+            data["resume_offset"] = self.resume_offset
+        if self.compression is not None:
+            data["compression"] = self.compression
+        if self.integrity:
+            data["integrity"] = True
+        if self.batch:
+            data["batch"] = self.batch
+        if self.keep_alive:
+            data["keep_alive"] = True
+        if self.flow_control:
+            data["flow_control"] = True
+        return data
 
     def to_bytes(self) -> bytes:
         return (json.dumps(self.return_dict()) + "\n").encode('utf-8')
 
+    def to_binary(self) -> bytes:
+        # the handshake is where the wire format gets agreed, so it is always JSON
+        return self.to_bytes()
+
     @staticmethod
     def json_to_packet(json_dict: dict):
         return HandshakePacket(
@@ -41,10 +130,27 @@ class HandshakePacket(Packet):
             json_dict.get('window_size'),
             json_dict.get('maximum_msg_size'),
             json_dict.get('timeout'),
-            json_dict.get('dynamic_size')
+            json_dict.get('dynamic_size'),
+            json_dict.get('wire_format'),
+            json_dict.get('file_name'),
+            json_dict.get('sack'),
+            json_dict.get('ack_interval'),
+            json_dict.get('ack_delay'),
+            json_dict.get('transfer_id'),
+            json_dict.get('range_offset'),
+            json_dict.get('total_size'),
+            json_dict.get('content_hash'),
+            json_dict.get('resume_offset'),
+            json_dict.get('compression'),
+            json_dict.get('integrity'),
+            json_dict.get('batch'),
+            json_dict.get('keep_alive'),
+            json_dict.get('flow_control')
         )
 
 class HandshakeAckPacket(Packet):
+    __slots__ = ()
+
     def __init__(self, flag: PacketType):
         super().__init__(flag)
 
@@ -64,10 +170,20 @@ class HandshakeAckPacket(Packet):
         )
 
 class DataPacket(Packet):
-    def __init__(self, flag: PacketType, sequence: int, payload: str):
+    __slots__ = ("sequence", "offset", "payload", "compressed", "crc")
+
+    def __init__(self, flag: PacketType, sequence: int, payload: bytes, compressed: bool = False, crc: int = None,
+                 offset: int = 0):
         super().__init__(flag)
         self.sequence = sequence
+        # where the payload starts in the data of this connection, the receiver reassembles by offset
+        self.offset = offset
+        # bytes, or a memoryview slice of the sender's buffer (copied only when the frame is built)
         self.payload = payload
+        # payload went through the negotiated codec, the receiver has to decompress it
+        self.compressed = bool(compressed)
+        # CRC32 of the payload exactly as sent, when integrity checks were negotiated
+        self.crc = crc
 
     def __lt__(self, other):
         return self.sequence < other.sequence
@@ -79,24 +195,83 @@ class DataPacket(Packet):
         return self.sequence == other.sequence
 
     def return_dict(self) -> dict:
-        return {
+        data = {
             "flag": self.flag.value if isinstance(self.flag, PacketType) else self.flag,
             "sequence": self.sequence,
-            "payload": self.payload
+            "offset": self.offset,
+            **DataPacket._payload_fields(self.payload)
         }
+        if self.compressed:
+            data["compressed"] = True
+        if self.crc is not None:
+            data["crc"] = self.crc
+        return data
+
+    @staticmethod
+    def _payload_fields(payload) -> dict:
+        # JSON can only carry text: readable UTF-8 stays as is, anything else (binary files,
+        # a multi-byte character cut at a segment edge) goes out as base64
+        raw = bytes(payload)
+        try:
+            return {"payload": raw.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {"payload": base64.b64encode(raw).decode('ascii'), "encoding": "base64"}
 
     def to_bytes(self) -> bytes:
-        return (json.dumps(self.return_dict()) + "\n").encode('utf-8')
+        # same line as json.dumps(self.return_dict()), written out directly: no dict per segment,
+        # only the payload text needs escaping
+        raw = bytes(self.payload)
+        try:
+            text, encoding = raw.decode('utf-8'), ""
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(raw).decode('ascii'), ', "encoding": "base64"'
+        line = '{"flag": "%s", "sequence": %d, "offset": %d, "payload": %s%s' % (
+            _flag_value(self.flag), self.sequence, self.offset, json.dumps(text), encoding)
+        if self.compressed:
+            line += ', "compressed": true'
+        if self.crc is not None:
+            line += ', "crc": %d' % self.crc
+        return (line + "}\n").encode('utf-8')
+
+    def to_binary(self) -> bytes:
+        return b"".join(self.encode_parts(WireFormat.BINARY))
+
+    def encode_parts(self, wire_format: WireFormat = WireFormat.JSON) -> list:
+        if wire_format != WireFormat.BINARY:
+            return [self.to_bytes()]
+        # header and payload stay separate buffers, the payload view goes to the socket without a copy
+        code = FLAG_CODES[PacketType(self.flag)] | (COMPRESSED_BIT if self.compressed else 0)
+        fields = SEGMENT_FIELDS.pack(self.sequence, self.offset)
+        if self.crc is not None:
+            code |= CHECKSUM_BIT
+            fields += CHECKSUM_FIELD.pack(self.crc)
+        header = FRAME_HEADER.pack(code, len(fields) + len(self.payload))
+        return [header + fields, self.payload]
 
     @staticmethod
     def json_to_packet(json_dict: dict):
-        return DataPacket(json_dict.get('flag'), json_dict.get('sequence'), json_dict.get('payload'))
+        payload = json_dict.get('payload', b"")
+        if isinstance(payload, str):
+            if json_dict.get('encoding') == "base64":
+                payload = base64.b64decode(payload)
+            else:
+                payload = payload.encode('utf-8')
+        # a segment without a sequence can't be placed or ACKed, KeyError / TypeError drop it in decode_json
+        return DataPacket(json_dict.get('flag'), int(json_dict['sequence']), payload,
+                          json_dict.get('compressed', False), json_dict.get('crc'), int(json_dict.get('offset', 0)))
 
 class AckPacket(Packet):
-    def __init__(self, flag: PacketType, ack: int, new_block_size: int = None):
+    __slots__ = ("ack", "new_block_size", "sack_blocks", "window")
+
+    def __init__(self, flag: PacketType, ack: int, new_block_size: int = None, sack_blocks: list = None,
+                 window: int = None):
         super().__init__(flag)
         self.ack = ack
         self.new_block_size = new_block_size
+        # [start, end] sequence ranges (inclusive) the receiver holds above the cumulative ack
+        self.sack_blocks = sack_blocks or []
+        # bytes past the cumulative ack the receiver has room for, None when flow control wasn't negotiated
+        self.window = window
 
     def return_dict(self) -> dict:
         data = {
@@ -105,25 +280,161 @@ class AckPacket(Packet):
         }
         if self.new_block_size is not None:
             data["new_block_size"] = self.new_block_size
+        if self.sack_blocks:
+            data["sack"] = [list(block) for block in self.sack_blocks]
+        if self.window is not None:
+            data["window"] = self.window
         return data
 
     def to_bytes(self) -> bytes:
-        return (json.dumps(self.return_dict()) + "\n").encode('utf-8')
+        # written out directly like DataPacket.to_bytes, the receiver sends one of these per read
+        line = '{"flag": "%s", "ack": %s' % (_flag_value(self.flag), "null" if self.ack is None else int(self.ack))
+        if self.new_block_size is not None:
+            line += ', "new_block_size": %d' % self.new_block_size
+        if self.sack_blocks:
+            line += ', "sack": [%s]' % ", ".join("[%d, %d]" % (start, end) for start, end in self.sack_blocks)
+        if self.window is not None:
+            line += ', "window": %d' % self.window
+        return (line + "}\n").encode('ascii')
+
+    def to_binary(self) -> bytes:
+        block_size = NO_BLOCK_SIZE if self.new_block_size is None else self.new_block_size
+        body = ACK_FIELDS.pack(self.ack, block_size)
+        code = FLAG_CODES[PacketType(self.flag)]
+        if self.window is not None:
+            body += WINDOW_FIELD.pack(self.window)
+            code |= WINDOW_BIT
+        if self.sack_blocks:
+            body += SACK_COUNT.pack(len(self.sack_blocks))
+            body += b"".join(SACK_BLOCK.pack(start, end) for start, end in self.sack_blocks)
+        return FRAME_HEADER.pack(code, len(body)) + body
 
     @staticmethod
     def json_to_packet(json_dict: dict):
         return AckPacket(
             json_dict.get('flag'),
             json_dict.get('ack'),
-            json_dict.get('new_block_size') # Changed key
+            json_dict.get('new_block_size'), # Changed key
+            json_dict.get('sack'),
+            json_dict.get('window')
         )
 
 class FinPacket(Packet):
-    def __init__(self, flag: PacketType):
+    __slots__ = ("digest",)
+
+    def __init__(self, flag: PacketType, digest: str = None):
         super().__init__(flag)
+        # hex sha256 of every byte the connection delivered, when integrity checks were negotiated
+        self.digest = digest
 
     def return_dict(self) -> dict:
-        return {"flag": self.flag.value if isinstance(self.flag, PacketType) else self.flag}
+        data = {"flag": self.flag.value if isinstance(self.flag, PacketType) else self.flag}
+        if self.digest is not None:
+            data["digest"] = self.digest
+        return data
+
+    def to_binary(self) -> bytes:
+        body = bytes.fromhex(self.digest) if self.digest is not None else b""
+        return FRAME_HEADER.pack(FLAG_CODES[PacketType(self.flag)], len(body)) + body
+
+    @staticmethod
+    def json_to_packet(json_dict: dict):
+        return FinPacket(json_dict.get('flag'), json_dict.get('digest'))
 
     def to_bytes(self) -> bytes:
-        return (json.dumps(self.return_dict()) + "\n").encode('utf-8')
\ No newline at end of file
+        return (json.dumps(self.return_dict()) + "\n").encode('utf-8')
+
+
+# Decoding straight to packet objects, one table lookup on the flag instead of a chain of comparisons.
+# FrameDecoder hands these to scan_frames, so the dict of a frame never outlives its own decode.
+# A frame the per-flag decoder can't make sense of (missing or mistyped fields, a binary body too short for its
+# fields) raises one of these and is dropped like a malformed line, it never reaches the session.
+_DECODE_ERRORS = (ValueError, TypeError, KeyError, AttributeError, struct.error)
+_FLAGS_BY_VALUE = {flag.value: flag for flag in PacketType}
+
+
+def _ack_from_json(json_dict: dict) -> Packet:
+    # the emitter's handshake and closing ACKs carry nothing but the flag
+    if "ack" not in json_dict:
+        return HandshakeAckPacket(PacketType.ACK)
+    return AckPacket.json_to_packet(json_dict)
+
+
+_JSON_DECODERS = {
+    PacketType.SYN: HandshakePacket.json_to_packet,
+    PacketType.SYNACK: HandshakePacket.json_to_packet,
+    PacketType.PUSH: DataPacket.json_to_packet,
+    PacketType.ACK: _ack_from_json,
+    PacketType.FIN: FinPacket.json_to_packet,
+    PacketType.FINACK: FinPacket.json_to_packet,
+}
+
+
+def decode_json(raw: bytes):
+    """The packet in one JSON line, with its flag as a PacketType. None for a malformed line or an unknown flag."""
+    try:
+        json_dict = json.loads(raw)
+        flag = _FLAGS_BY_VALUE.get(json_dict.get("flag"))
+    except (ValueError, AttributeError, TypeError):
+        return None
+    if flag is None:
+        return None
+    try:
+        pkt = _JSON_DECODERS[flag](json_dict)
+    except _DECODE_ERRORS:
+        return None
+    pkt.flag = flag
+    return pkt
+
+
+def _push_from_binary(flag: PacketType, body, bits: int) -> Packet:
+    sequence, offset = SEGMENT_FIELDS.unpack_from(body)
+    payload_start = SEGMENT_FIELDS.size
+    crc = None
+    if bits & CHECKSUM_BIT:
+        crc = CHECKSUM_FIELD.unpack_from(body, payload_start)[0]
+        payload_start += CHECKSUM_FIELD.size
+    return DataPacket(flag, sequence, bytes(body[payload_start:]), bits & COMPRESSED_BIT, crc, offset)
+
+
+def _ack_from_binary(flag: PacketType, body, bits: int) -> Packet:
+    if not body:
+        return HandshakeAckPacket(flag)
+    ack, block_size = ACK_FIELDS.unpack_from(body)
+    sack_start = ACK_FIELDS.size
+    window = None
+    if bits & WINDOW_BIT:
+        window = WINDOW_FIELD.unpack_from(body, sack_start)[0]
+        sack_start += WINDOW_FIELD.size
+    sack_blocks = None
+    if len(body) > sack_start:
+        start = sack_start + SACK_COUNT.size
+        count = SACK_COUNT.unpack_from(body, sack_start)[0]
+        sack_blocks = list(SACK_BLOCK.iter_unpack(body[start:start + count * SACK_BLOCK.size]))
+    return AckPacket(flag, ack, None if block_size == NO_BLOCK_SIZE else block_size, sack_blocks, window)
+
+
+def _fin_from_binary(flag: PacketType, body, bits: int) -> Packet:
+    return FinPacket(flag, bytes(body).hex() if body else None)
+
+
+_BINARY_DECODERS = {
+    PacketType.PUSH: _push_from_binary,
+    PacketType.ACK: _ack_from_binary,
+    PacketType.FIN: _fin_from_binary,
+    PacketType.FINACK: _fin_from_binary,
+}
+
+
+def decode_binary(flag: PacketType, body, bits: int = 0):
+    """
+    The packet in one binary frame body (see wire_format). None for a flag that never travels as binary
+    and for a body that doesn't hold the fields its flag needs.
+    """
+    decoder = _BINARY_DECODERS.get(flag)
+    if decoder is None:
+        return None
+    try:
+        return decoder(flag, body, bits)
+    except _DECODE_ERRORS:
+        return None
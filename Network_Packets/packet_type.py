@@ -6,4 +6,16 @@ class PacketType(Enum):
     FIN = "FIN"
     SYN = "SYN"
     SYNACK = "SYN/ACK"
-    FINACK = "FIN/ACK"
\ No newline at end of file
+    FINACK = "FIN/ACK"
+
+
+# One byte flag codes used by the binary wire format (JSON keeps the string values above)
+FLAG_CODES = {
+    PacketType.PUSH: 1,
+    PacketType.ACK: 2,
+    PacketType.FIN: 3,
+    PacketType.SYN: 4,
+    PacketType.SYNACK: 5,
+    PacketType.FINACK: 6,
+}
+CODE_FLAGS = {code: flag for flag, code in FLAG_CODES.items()}
@@ -0,0 +1,94 @@
+import select
+import threading
+
+from Network_Packets.window_framer import Framer
+from Network_Packets.wire_format import write_frames
+from Utils.log import get_logger
+
+log = get_logger("framer")
+
+
+class PipelinedFramer(Framer):
+    """
+    Same protocol as Framer, but sending and ACK processing run on separate threads.
+    The calling thread keeps the window full while an ACK thread reads and decodes ACKs, so segments keep
+    going out while ACKs are being parsed. Window state is shared under state_lock; socket writes from
+    both threads (new segments, fast retransmits) go through send_lock so frames never interleave.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state_lock = threading.Condition()
+        self.send_lock = threading.Lock()
+        self.done = False
+        self.ack_error = None
+
+    def _finished(self) -> bool:
+        return self.frame_cursor >= self._segment_count()
+
+    def run_transfer_loop(self):
+        log.info("[Framer] Starting pipelined transfer of %d segments...", self._segment_count())
+        ack_thread = threading.Thread(target=self._ack_loop, name="framer-acks", daemon=True)
+        ack_thread.start()
+        try:
+            self._send_loop()
+        finally:
+            with self.state_lock:
+                self.done = True
+                self.state_lock.notify_all()
+            ack_thread.join()
+        if self.ack_error is not None:
+            raise self.ack_error
+        self._finish_trace()
+
+    def _send_loop(self):
+        with self.state_lock:
+            while not self._finished() and self.ack_error is None:
+                # bookkeeping happens under the lock, the actual encode + send does not
+                packets = [pkt for pkt in (self._prepare_segment(idx) for idx in self._claim_window())
+                           if pkt is not None]
+                if packets:
+                    self.state_lock.release()
+                    try:
+                        self.send_packets(packets)
+                    finally:
+                        self.state_lock.acquire()
+                    continue
+
+                # window is full: sleep until an ACK moves it or the earliest retransmission deadline
+                self.state_lock.wait(self._time_to_deadline())
+                self._check_timeout()
+                self._check_probe()
+
+    def _ack_loop(self):
+        try:
+            while True:
+                with self.state_lock:
+                    if self.done or self._finished():
+                        return
+                # short select so the thread notices the end of the transfer
+                readable, _, _ = select.select([self.socket], [], [], 0.05)
+                if not readable:
+                    continue
+                if not self.decoder.recv_from(self.socket):
+                    raise ConnectionError("link closed during transfer")
+                acks = self._parse_acks()
+                if not acks:
+                    continue
+                with self.state_lock:
+                    for ack_obj in acks:
+                        self._handle_ack(ack_obj)
+                    self.state_lock.notify_all()
+        except (OSError, ConnectionError) as e:
+            with self.state_lock:
+                self.ack_error = e
+                self.state_lock.notify_all()
+
+    def send_packet(self, packet_obj):
+        data = packet_obj.encode(self.wire_format)
+        with self.send_lock:
+            self.socket.sendall(data)
+
+    def send_packets(self, packets: list):
+        parts = [part for pkt in packets for part in pkt.encode_parts(self.wire_format)]
+        with self.send_lock:
+            write_frames(self.socket, parts)
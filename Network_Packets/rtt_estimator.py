@@ -0,0 +1,39 @@
+class RttEstimator:
+    """
+    Smoothed RTT / RTT variance and the retransmission timeout that follows from them (RFC 6298 style).
+    All values are in milliseconds, same as the timeout in the config file.
+    """
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial_rto: float, min_rto: float = 20.0, max_rto: float = 60000.0, ack_delay: float = 0.0):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        # the longest the receiver may hold an ACK back (delayed ACKs), always added on top so it can't cause an RTO
+        self.ack_delay = ack_delay
+        self.srtt = None
+        self.rttvar = None
+        self.rto = self._clamp(initial_rto + ack_delay)
+        self.backoff_count = 0
+
+    def _clamp(self, value: float) -> float:
+        return max(self.min_rto, min(self.max_rto, value))
+
+    def sample(self, rtt: float):
+        """Feeds one RTT measurement. Callers must skip retransmitted segments (Karn's rule)."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        # min_rto also acts as the variance floor: on a steady link RTTVAR shrinks to ~0 and
+        # an RTO right at SRTT would fire on the first bit of jitter
+        self.rto = self._clamp(self.srtt + max(self.min_rto, self.K * self.rttvar) + self.ack_delay)
+        self.backoff_count = 0
+
+    def backoff(self):
+        """Doubles the RTO after a timeout, until a fresh sample arrives."""
+        self.rto = self._clamp(self.rto * 2)
+        self.backoff_count += 1
@@ -0,0 +1,122 @@
+import random
+
+# Receiver side policies for dynamic_message_size. The collector reports the data segments it gets (in order,
+# or the first one past a new hole), a policy answers with the segment size to ask the sender for, or None.
+# The sender only applies a new size to segments it hasn't sent yet (see Framer._reslice_payload).
+
+
+class RandomSegmentSizer:
+    """The original demo behaviour: a random 5-20 byte size on every 3rd sequence number."""
+    name = "random"
+
+    def __init__(self, current: int, min_size: int = 5, max_size: int = 20):
+        self.current = current
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def on_segment(self, seq: int, size: int, in_order: bool):
+        if seq % 3 != 0:
+            return None
+        self.current = random.randint(self.min_size, self.max_size)
+        return self.current
+
+
+class AdaptiveSegmentSizer:
+    """
+    Sizes segments from the loss the receiver sees, much like a congestion window but in bytes per segment.
+    Big segments cost fewer headers, ACKs and syscalls per byte and put more bytes in flight (the window counts
+    segments), so they win as long as few of them go missing. A segment is lost more often the bigger it is
+    though, and once a good share are lost retransmissions get lost as well and the sender sits out backed
+    off timeouts. So the size is kept where loss events (segments that open a new hole) stay rare:
+
+    - more than SHRINK_ABOVE loss events per segment sent halve the size, down to min_size
+    - fewer than GROW_BELOW over grow_after segments double it, up to max_size. Halving the size about halves
+      the loss rate, the gap between the two keeps it from flapping between two sizes
+    - segments are counted by sequence number, the collector only reports the in-order ones and the first
+      one past each new hole. The counts decay, old conditions fade out over a few hundred segments
+    - after a change nothing is counted until segments of the new size arrive: whatever was already in flight
+      was sized before the change and says nothing about it
+
+    make_sizer starts it well below max_size and it doubles every RAMP_AFTER segments until the first shrink,
+    so a lossy link never sees more than a few segments of the maximum size. max_size, the negotiated maximum,
+    is as far as it goes: without loss it ends up there a few hundred KB into the transfer.
+    """
+    name = "adaptive"
+    GROW_AFTER = 64
+    SHRINK_ABOVE = 0.1
+    GROW_BELOW = 0.025
+    # loss events at one size before a shrink: one or two early on mean little, under heavy loss these come quickly
+    MIN_LOSSES = 4
+    # until the first shrink the size doubles after this many segments, like slow start does for the window
+    RAMP_AFTER = 16
+    # where make_sizer starts it, as a fraction of the maximum
+    START_FRACTION = 16
+
+    def __init__(self, current: int, min_size: int, max_size: int, grow_after: int = GROW_AFTER):
+        self.max_size = max(1, max_size)
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.current = max(self.min_size, min(current, self.max_size))
+        self.grow_after = grow_after
+        self._ramping = True
+        self._asked = False
+        self._settled = False
+        self._first_seq = 0
+        self._last_seq = 0
+        self._losses = 0.0
+
+        self.grows = 0
+        self.shrinks = 0
+
+    def on_segment(self, seq: int, size: int, in_order: bool):
+        if not self._settled:
+            if size != self.current:
+                if self._asked:
+                    return None
+                # the sender starts out at the negotiated maximum, the first ACK tells it where to begin
+                self._asked = True
+                return self.current
+            # the first segment cut to the current size, counting starts here
+            self._settled = True
+            self._first_seq = self._last_seq = seq
+            self._losses = 0.0
+        self._last_seq = max(self._last_seq, seq)
+        if not in_order:
+            self._losses += 1
+
+        sent = self._last_seq - self._first_seq + 1
+        rate = self._losses / sent
+        if self._losses >= self.MIN_LOSSES and rate > self.SHRINK_ABOVE and self.current > self.min_size:
+            return self._resize(max(self.min_size, self.current // 2))
+        if self._ramping:
+            grow = sent >= self.RAMP_AFTER and rate <= self.SHRINK_ABOVE
+        else:
+            grow = sent >= self.grow_after and rate < self.GROW_BELOW
+        if grow and self.current < self.max_size:
+            return self._resize(min(self.max_size, self.current * 2))
+        if sent >= 4 * self.grow_after:
+            self._first_seq += sent // 2
+            self._losses /= 2
+        return None
+
+    def _resize(self, new_size: int):
+        if new_size < self.current:
+            self.shrinks += 1
+            self._ramping = False
+        else:
+            self.grows += 1
+        self.current = new_size
+        self._asked = True
+        self._settled = False
+        return new_size
+
+
+SIZERS = {sizer.name: sizer for sizer in (AdaptiveSegmentSizer, RandomSegmentSizer)}
+
+
+def make_sizer(name: str, msg_size: int, min_size: int):
+    """The sizer for one session, msg_size is the negotiated maximum message size."""
+    if name == RandomSegmentSizer.name:
+        return RandomSegmentSizer(msg_size)
+    if name != AdaptiveSegmentSizer.name:
+        raise ValueError(f"Unknown dynamic_sizing '{name}', expected one of {sorted(SIZERS)}")
+    return AdaptiveSegmentSizer(msg_size // AdaptiveSegmentSizer.START_FRACTION, min_size, msg_size)
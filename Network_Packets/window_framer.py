@@ -1,151 +1,458 @@
 import time
+import zlib
+import bisect
+import random
+import hashlib
 import select
-import json
 import socket
-from typing import List
 from Network_Packets.packet import DataPacket, AckPacket, PacketType
+from Network_Packets.wire_format import WireFormat, write_frames
+from Network_Packets.frame_decoder import FrameDecoder
+from Network_Packets.rtt_estimator import RttEstimator
+from Network_Packets.congestion_control import make_controller, CongestionTrace
+from Utils.payload_source import BufferSource
+from Utils.log import get_logger
+from Utils.metrics import MetricsRegistry, RTT_BUCKETS_MS, WINDOW_BUCKETS
+
+log = get_logger("framer")
+
+# zero window probes back off like retransmissions, up to this many seconds apart (TCP's persist timer cap)
+MAX_PROBE_INTERVAL = 60.0
 
 
 class Framer:
-    def __init__(self, socket_obj, raw_message: str, initial_payload: List[str], window_size: int, msg_size: int,
-                 timeout: int, is_dynamic: bool):
+    def __init__(self, socket_obj, source, window_size: int, msg_size: int,
+                 timeout: int, is_dynamic: bool, wire_format: WireFormat = WireFormat.JSON, sack: bool = False,
+                 loss_rate: float = 0.0, loss_seed: int = None, congestion: str = "reno", trace_path: str = None,
+                 decoder: FrameDecoder = None, ack_delay: int = 0, compressor=None, integrity: bool = False,
+                 loss_unit: int = 0, metrics_labels: dict = None, drop_seq: int = None):
         self.socket = socket_obj
-        self.raw_message = raw_message
-        self.payload = initial_payload
+        # a payload source (see Utils/payload_source.py); plain bytes / mmap get wrapped in a BufferSource.
+        # Segments are memoryview slices handed out by the source, so nothing gets copied here
+        self.source = source if hasattr(source, "view") else BufferSource(source)
+        self.total_bytes = len(self.source)
 
         self.window_size = window_size
         self.msg_size = msg_size
+        # resize requests from the receiver never go past the negotiated maximum
+        self.max_msg_size = msg_size
+        # the segments actually in flight are capped by min(cwnd, negotiated window)
+        self.cc = make_controller(congestion, window_size)
+        self.cc_trace = CongestionTrace(trace_path)
+        # highest sequence sent when the last loss was reacted to, later dup ACKs for the same loss are ignored
+        self.recovery_point = -1
+        # the negotiated timeout is only the starting RTO, after that it follows the measured RTT
         self.timeout = float(timeout)
+        self.rtt = RttEstimator(self.timeout, ack_delay=float(ack_delay))
+        # seq -> (send time, number of transmissions) for every segment still waiting for an ACK
+        self.send_times = {}
         self.is_dynamic = is_dynamic
+        self.wire_format = wire_format
+        # BlockCompressor when a codec was negotiated, segments are compressed one by one as they go out
+        self.compressor = compressor
+        # integrity checks: CRC32 on every segment, and a sha256 of the data fed as bytes go out for the first time
+        self.integrity = integrity
+        self.tx_digest = hashlib.sha256() if integrity else None
+        # takes over the emitter's decoder, so anything that arrived right behind the handshake isn't lost
+        self.decoder = decoder if decoder is not None else FrameDecoder()
 
         self.frame_cursor = 0
         self.sequence_tracker = 0
-        self.last_ack_time = time.time()
         self.last_ack_seq = None
         self.dup_ack_count = 0
+        # flow control: the free buffer space (bytes past the cumulative ACK) of the receiver's last ACK,
+        # None until one carried a window
+        self.peer_window = None
+        # while that window is closed, a zero-length segment at probe_deadline asks for it again
+        self.probe_deadline = None
+        self.probe_interval = 0.0
 
         self.byte_position = 0
 
-        self.drop_seq = 1
+        # Segments are computed from offsets instead of being stored. Each slicing run (base_seq, base_offset, size)
+        # covers the sequences from base_seq up to the next run: seq starts at base_offset + (seq - base_seq) * size.
+        # A resize appends a run at the first sequence never sent, so a sequence number always means the same
+        # bytes and the segments already in flight stay valid.
+        self.slice_runs = [(0, 0, msg_size)]
+        self._run_seqs = [0]
+        self._highest_seq_sent = -1
+
+        # SACK: acked_map[seq] == 1 means the receiver already holds that segment out of order,
+        # so timeouts and fast retransmits only fill the gaps
+        self.sack = sack
+        self.acked_map = bytearray()
+        # gaps already resent by fast retransmit, so the next round of dup ACKs doesn't resend them again
+        self._gaps_resent = set()
+
+        # demo: drop this one segment the first time it goes out, to show a retransmission (None = off)
+        self.drop_seq = drop_seq
         self._dropped_once = False
+        # random loss on top of the demo drop, for experiments (seeded so runs can be repeated)
+        self.loss_rate = loss_rate
+        # with a loss_unit every loss_unit bytes of a segment get their own draw, so big segments are lost more often
+        self.loss_unit = loss_unit
+        self._loss_rng = random.Random(loss_seed)
+
+        self.segments_sent = 0
+        self.bytes_sent = 0
+        self.retransmitted_segments = 0
+        self.retransmitted_bytes = 0
+        self._highest_offset_sent = 0
+        self.acks_received = 0
+        self.dup_acks = 0
+        self.fast_retransmits = 0
+        self.timeouts = 0
+        self.reslices = 0
+        self.window_probes = 0
+        self.metrics = self._build_metrics(metrics_labels)
+
+    def _build_metrics(self, labels: dict) -> MetricsRegistry:
+        """Counters the Framer keeps anyway are read when sampled, only the histograms cost anything per event."""
+        metrics = MetricsRegistry("framer", labels)
+        metrics.counter("segments_sent_total", "Data segments sent, retransmissions included",
+                        lambda: self.segments_sent)
+        metrics.counter("bytes_sent_total", "Payload bytes sent, retransmissions included", lambda: self.bytes_sent)
+        metrics.counter("retransmitted_segments_total", "Segments sent more than once",
+                        lambda: self.retransmitted_segments)
+        metrics.counter("retransmitted_bytes_total", "Payload bytes sent more than once",
+                        lambda: self.retransmitted_bytes)
+        metrics.counter("acks_received_total", "ACKs received", lambda: self.acks_received)
+        metrics.counter("dup_acks_total", "ACKs that didn't move the window", lambda: self.dup_acks)
+        metrics.counter("fast_retransmits_total", "Fast retransmit events", lambda: self.fast_retransmits)
+        metrics.counter("timeouts_total", "Retransmission timeouts", lambda: self.timeouts)
+        metrics.counter("reslices_total", "Segment size changes requested by the receiver", lambda: self.reslices)
+        metrics.counter("window_probes_total", "Zero window probes sent", lambda: self.window_probes)
+        metrics.gauge("acked_bytes", "Bytes the receiver has acknowledged in order", lambda: self.byte_position)
+        metrics.gauge("goodput_bytes_per_second", "Acknowledged bytes per second since the transfer started",
+                      self._goodput)
+        metrics.gauge("cwnd_segments", "Congestion window", lambda: self.cc.window())
+        metrics.gauge("peer_window_bytes", "Free buffer space the receiver advertised last (-1 = no flow control)",
+                      lambda: -1 if self.peer_window is None else self.peer_window)
+        metrics.gauge("rto_ms", "Current retransmission timeout", lambda: round(self.rtt.rto, 3))
+        metrics.gauge("segment_size_bytes", "Size new segments are cut to", lambda: self.msg_size)
+        self.rtt_hist = metrics.histogram("rtt_ms", "Round trip time samples (Karn's rule applies)", RTT_BUCKETS_MS)
+        self.window_hist = metrics.histogram("window_occupancy_segments",
+                                             "Segments in flight each time new ones are sent", WINDOW_BUCKETS)
+        return metrics
+
+    def _goodput(self) -> float:
+        elapsed = time.monotonic() - self.cc_trace.started
+        return round(self.byte_position / elapsed, 1) if elapsed > 0 else 0.0
+
+    def _run_for(self, seq: int) -> tuple:
+        return self.slice_runs[bisect.bisect_right(self._run_seqs, seq) - 1]
+
+    def _segment_count(self) -> int:
+        base_seq, base_offset, size = self.slice_runs[-1]
+        return base_seq + -(-(self.total_bytes - base_offset) // size)
+
+    def _segment_offset(self, seq: int) -> int:
+        base_seq, base_offset, size = self._run_for(seq)
+        return min(base_offset + (seq - base_seq) * size, self.total_bytes)
+
+    def _segment_view(self, seq: int) -> memoryview:
+        base_seq, base_offset, size = self._run_for(seq)
+        return self.source.view(min(base_offset + (seq - base_seq) * size, self.total_bytes), size)
 
     def run_transfer_loop(self):
-        print(f"[Framer] Starting transfer of {len(self.payload)} segments...")
+        log.info("[Framer] Starting transfer of %d segments...", self._segment_count())
 
-        while self.frame_cursor < len(self.payload):
+        while self.frame_cursor < self._segment_count():
             # 1. SEND
             self._send_available_frames()
 
-            # 2. LISTEN
-            readable, _, _ = select.select([self.socket], [], [], self.timeout)
+            # 2. LISTEN, but no longer than until the earliest retransmission deadline
+            readable, _, _ = select.select([self.socket], [], [], self._time_to_deadline())
             if readable:
                 self._process_incoming_acks()
 
             # 3. TIMEOUT
-            if time.time() - self.last_ack_time > (self.timeout / 1000.0):
-                print(f"[Framer] TIMEOUT! Retransmitting from base {self.frame_cursor}")
+            self._check_timeout()
+            self._check_probe()
+
+        self._finish_trace()
+
+    def _finish_trace(self):
+        self.cc_trace.record(self.cc, self.byte_position, "done")
+        self.cc_trace.close()
+
+    def _check_timeout(self):
+        if self.send_times and self._time_to_deadline() <= 0:
+            expired = self._expired_segments()
+            self.timeouts += 1
+            self.rtt.backoff()
+            self.cc.on_timeout()
+            self.recovery_point = self.sequence_tracker - 1
+            self.cc_trace.record(self.cc, self.byte_position, "timeout")
+            log.info("[Framer] RTO expired, backing off to %.1fms, cwnd -> %d", self.rtt.rto, self.cc.window())
+            if self.sack:
+                # only the segments whose own timer ran out, the rest may still be ACKed in time
+                log.info("[Framer] TIMEOUT! Retransmitting %d expired segment(s) from base %d",
+                         len(expired), self.frame_cursor)
+                self._push_segments(expired)
+            else:
+                log.info("[Framer] TIMEOUT! Retransmitting from base %d", self.frame_cursor)
                 # Reset tracker to base to re-send the whole window
                 self.sequence_tracker = self.frame_cursor
-                self.last_ack_time = time.time()
+
+    def _check_probe(self):
+        """
+        Zero window probing: a window update lost on the way would leave the transfer waiting for good,
+        so while the receiver's window is closed a zero-length segment goes out now and then.
+        The receiver stores nothing and answers with an ACK carrying its current window.
+        """
+        if self.peer_window != 0 or self.frame_cursor >= self._segment_count():
+            self.probe_deadline = None
+            return
+        now = time.monotonic()
+        if self.probe_deadline is None:
+            self.probe_interval = self.rtt.rto / 1000.0
+            self.probe_deadline = now + self.probe_interval
+        elif now >= self.probe_deadline:
+            self.window_probes += 1
+            log.debug("[Framer] Window closed, probing (next in %.2fs)", self.probe_interval)
+            self.send_packet(DataPacket(PacketType.PUSH, self.frame_cursor, b"", offset=self.byte_position))
+            self.probe_interval = min(self.probe_interval * 2, MAX_PROBE_INTERVAL)
+            self.probe_deadline = now + self.probe_interval
+
+    def _send_window(self) -> int:
+        window = min(self.cc.window(), self.window_size)
+        if self.peer_window is not None:
+            # any free space is worth a segment, so a window smaller than one segment doesn't stall the transfer;
+            # a closed one (0) waits for the receiver's window update, see _check_probe
+            window = min(window, -(-self.peer_window // self.msg_size))
+        return window
+
+    def _expired_segments(self) -> list:
+        cutoff = time.monotonic() - self.rtt.rto / 1000.0
+        return sorted(seq for seq, (sent_at, _) in self.send_times.items()
+                      if sent_at <= cutoff and not self._is_sacked(seq))
+
+    def _time_to_deadline(self) -> float:
+        """
+        Seconds until the oldest outstanding segment times out (a full RTO when nothing is in flight),
+        or until the next zero window probe if that comes first.
+        """
+        now = time.monotonic()
+        wait = self.rtt.rto / 1000.0
+        if self.send_times:
+            oldest = min(sent_at for sent_at, _ in self.send_times.values())
+            wait = max(0.0, oldest + wait - now)
+        if self.probe_deadline is not None:
+            wait = min(wait, max(0.0, self.probe_deadline - now))
+        return wait
 
     def _send_available_frames(self):
-        """Sends packets within the window that haven't been sent yet."""
-        upper_bound = min(self.frame_cursor + self.window_size, len(self.payload))
+        """Sends packets within the window that haven't been sent yet, all in one write."""
+        self._push_segments(self._claim_window())
+
+    def _claim_window(self) -> list:
+        """Moves sequence_tracker to the end of the usable window, returns the sequences that need sending."""
+        upper_bound = min(self.frame_cursor + self._send_window(), self._segment_count())
+        claimed = []
 
         while self.sequence_tracker < upper_bound:
             idx = self.sequence_tracker
 
-            # Demo Drop Logic (Drops packet #1 exactly once)
-            if (not self._dropped_once) and idx == self.drop_seq:
-                self._dropped_once = True
-                print(f"[Framer] *** SIMULATING DROP: Segment {idx} ***")
-                self.sequence_tracker += 1
-                continue
-
-            seg_pkt = DataPacket(PacketType.PUSH, idx, self.payload[idx])
-            self.send_packet(seg_pkt)
-            print(f"[Framer] Pushed Segment {idx} (Msg Size: {len(self.payload[idx])})")
+            if not self._is_sacked(idx):
+                claimed.append(idx)
             self.sequence_tracker += 1
+        if claimed:
+            self.window_hist.observe(self.sequence_tracker - self.frame_cursor)
+        return claimed
 
-    def _process_incoming_acks(self):
-        try:
-            chunk = self.socket.recv(4096).decode('utf-8')
-            if not chunk: return
+    def _push_segment(self, idx: int):
+        seg_pkt = self._prepare_segment(idx)
+        if seg_pkt is not None:
+            self.send_packet(seg_pkt)
 
-            # parsing multiple responses with the "\n" sign
-            messages = chunk.split('\n')
+    def _push_segments(self, seqs):
+        packets = [pkt for pkt in (self._prepare_segment(idx) for idx in seqs) if pkt is not None]
+        if packets:
+            self.send_packets(packets)
 
-            for msg in messages:
-                if not msg.strip(): continue
-                try:
-                    p_dict = json.loads(msg)
-                except json.JSONDecodeError:
-                    continue
+    def _prepare_segment(self, idx: int):
+        """
+        Does the bookkeeping for one data segment (counters, send time) and builds its packet.
+        Returns None when the loss simulation eats it.
+        """
+        segment = self._segment_view(idx)
+        start = self._segment_offset(idx)
+        end = start + len(segment)
+        self.segments_sent += 1
+        self.bytes_sent += len(segment)
+        if start < self._highest_offset_sent:
+            self.retransmitted_segments += 1
+            self.retransmitted_bytes += min(end, self._highest_offset_sent) - start
+        if self.tx_digest is not None and end > self._highest_offset_sent:
+            # first transmissions always extend the highest offset, so the digest sees every byte once, in order
+            self.tx_digest.update(segment[self._highest_offset_sent - start:])
+        self._highest_offset_sent = max(self._highest_offset_sent, end)
+        self._highest_seq_sent = max(self._highest_seq_sent, idx)
+        _, transmissions = self.send_times.get(idx, (None, 0))
+        self.send_times[idx] = (time.monotonic(), transmissions + 1)
+
+        # Demo Drop Logic (drops segment drop_seq exactly once)
+        if (not self._dropped_once) and idx == self.drop_seq:
+            self._dropped_once = True
+            log.info("[Framer] *** SIMULATING DROP: Segment %d ***", idx)
+            return None
+        if self.loss_rate and self._loss_rng.random() < self._loss_chance(len(segment)):
+            log.debug("[Framer] *** SIMULATING LOSS: Segment %d ***", idx)
+            return None
+
+        log.debug("[Framer] Pushed Segment %d (Msg Size: %d)", idx, len(segment))
+        payload, compressed = segment, False
+        if self.compressor is not None:
+            payload, compressed = self.compressor.compress(segment)
+        crc = zlib.crc32(payload) if self.integrity else None
+        return DataPacket(PacketType.PUSH, idx, payload, compressed, crc, start)
+
+    def _loss_chance(self, size: int) -> float:
+        if not self.loss_unit:
+            return self.loss_rate
+        units = max(1, -(-size // self.loss_unit))
+        return 1.0 - (1.0 - self.loss_rate) ** units
+
+    def _is_sacked(self, seq: int) -> bool:
+        return seq < len(self.acked_map) and self.acked_map[seq] == 1
+
+    def _record_sack(self, sack_blocks):
+        count = self._segment_count()
+        if len(self.acked_map) < count:
+            self.acked_map.extend(bytes(count - len(self.acked_map)))
+        for start, end in sack_blocks:
+            for seq in range(max(int(start), self.frame_cursor), min(int(end) + 1, count)):
+                self.acked_map[seq] = 1
+                # the receiver has it, no timer needed any more
+                self.send_times.pop(seq, None)
+
+    def _retransmit_gaps(self, upper: int):
+        """Resends every unacked segment below upper that the receiver has not SACKed."""
+        gaps = [seq for seq in range(self.frame_cursor, min(upper, self._segment_count()))
+                if not self._is_sacked(seq) and seq not in self._gaps_resent]
+        self._gaps_resent.update(gaps)
+        self._push_segments(gaps)
 
-                if p_dict.get('flag') == PacketType.ACK.value:
-                    ack_obj = AckPacket.json_to_packet(p_dict)
-                    self._handle_ack(ack_obj)
+    def _process_incoming_acks(self):
+        try:
+            if not self.decoder.recv_from(self.socket): return
 
+            for ack_obj in self._parse_acks():
+                self._handle_ack(ack_obj)
 
         except (BlockingIOError, socket.timeout):
             pass
 
+    def _parse_acks(self) -> list:
+        # a read may hold several ACKs, and the last one may be cut short (the decoder keeps it for the next read)
+        return [pkt for pkt in self.decoder.packets() if isinstance(pkt, AckPacket)]
+
     def _handle_ack(self, ack_obj):
         cum_ack = int(ack_obj.ack)
+        self.acks_received += 1
+        # no sign of loss: an ACK that only opens a closed window again, or one while nothing is outstanding
+        # (the answer to a zero window probe)
+        reopened = (ack_obj.window is not None and self.peer_window is not None
+                    and self.peer_window < self.msg_size <= ack_obj.window)
+        if ack_obj.window is not None:
+            self.peer_window = ack_obj.window
 
         if cum_ack >= self.frame_cursor:
-            # Update byte position for all newly ACKed packets
-            for i in range(self.frame_cursor, cum_ack + 1):
-                if i < len(self.payload):
-                    self.byte_position += len(self.payload[i])
-
+            rtt_ms = self._sample_rtt(cum_ack)
+            self.cc.on_ack(cum_ack + 1 - self.frame_cursor, rtt_ms)
+            for seq in range(self.frame_cursor, cum_ack + 1):
+                self.send_times.pop(seq, None)
             self.frame_cursor = cum_ack + 1
-            self.last_ack_time = time.time()
+            # after a go-back-N timeout the ACK can overtake the resend position, never resend what's ACKed
+            self.sequence_tracker = max(self.sequence_tracker, self.frame_cursor)
+            self.byte_position = self._segment_offset(self.frame_cursor)
+            # everything below the first unacked byte is never needed again
+            self.source.release(self.byte_position)
+            if self._gaps_resent:
+                self._gaps_resent = {seq for seq in self._gaps_resent if seq >= self.frame_cursor}
+            self.cc_trace.record(self.cc, self.byte_position)
+
+        if self.sack and ack_obj.sack_blocks:
+            self._record_sack(ack_obj.sack_blocks)
 
         # --- DYNAMIC RE-SLICING LOGIC
         if self.is_dynamic and ack_obj.new_block_size is not None:
-            new_size = int(ack_obj.new_block_size)
+            new_size = max(1, min(int(ack_obj.new_block_size), self.max_msg_size))
             if new_size != self.msg_size:
-                print(f"[Framer] Dynamic Update: Changing Message Size {self.msg_size} -> {new_size}")
+                log.debug("[Framer] Dynamic Update: Changing Message Size %d -> %d", self.msg_size, new_size)
                 self._reslice_payload(new_size)
         # --------------------------------
 
         # Fast Retransmit Logic
         if self.last_ack_seq == cum_ack:
-            self.dup_ack_count += 1
+            if not reopened and self.sequence_tracker > self.frame_cursor:
+                self.dup_ack_count += 1
+                self.dup_acks += 1
         else:
             self.last_ack_seq = cum_ack
             self.dup_ack_count = 1
 
         if self.dup_ack_count >= 3:
-            print(f"[Framer] Fast Retransmit Triggered for Segment {self.frame_cursor}")
+            log.info("[Framer] Fast Retransmit Triggered for Segment %d", self.frame_cursor)
+            self.fast_retransmits += 1
+            if self.frame_cursor > self.recovery_point:
+                # one window reduction per loss event
+                self.cc.on_triple_dup_ack()
+                self.recovery_point = self.sequence_tracker - 1
+                self.cc_trace.record(self.cc, self.byte_position, "dup_ack")
             missing = self.frame_cursor
-            if missing < len(self.payload):
-                pkt = DataPacket(PacketType.PUSH, missing, self.payload[missing])
-                self.send_packet(pkt)
+            if self.sack and ack_obj.sack_blocks:
+                # every hole below the highest SACKed segment is known to be missing
+                highest = max(int(end) for _, end in ack_obj.sack_blocks)
+                self._retransmit_gaps(highest + 1)
+                self.dup_ack_count = 0
+            elif missing < self._segment_count():
+                self._push_segment(missing)
                 self.dup_ack_count = 0
 
+    def _sample_rtt(self, acked_seq: int):
+        # Karn's rule: a segment that went out more than once gives an ambiguous sample, skip it
+        sent_at, transmissions = self.send_times.get(acked_seq, (None, 0))
+        if transmissions != 1:
+            return None
+        rtt_ms = (time.monotonic() - sent_at) * 1000.0
+        self.rtt.sample(rtt_ms)
+        self.rtt_hist.observe(rtt_ms)
+        return rtt_ms
+
     def _reslice_payload(self, new_chunk_size):
         """
-        Re-calculates the payload list based on the new chunk size.
-        Uses byte_position tracker which must be updated BEFORE this is called.
+        Switches to a new chunk size for everything that was never sent.
+        Segments already sent (ACKed, in flight or waiting for a retransmission) keep their boundaries,
+        so nothing gets thrown away and the receiver never sees one sequence number with two meanings.
+        No data is copied, the new segments are just a different offset calculation.
         """
-        # 1. Get remaining raw text using tracked byte position
-        remaining_text = self.raw_message[self.byte_position:]
-
-        # 2. Slice the remaining text with the NEW size
-        new_chunks = [remaining_text[i:i + new_chunk_size] for i in range(0, len(remaining_text), new_chunk_size)]
-
-        # 3. Construct new payload list: keep ACKed packets, replace rest
-        self.payload = self.payload[:self.frame_cursor] + new_chunks
-
-        # 4. Update state
         self.msg_size = new_chunk_size
+        self.reslices += 1
+        first_new = self._highest_seq_sent + 1
+        if first_new >= self._segment_count():
+            # everything is out already, nothing left to re-slice
+            return
+        run = (first_new, self._segment_offset(first_new), new_chunk_size)
+        if self._run_seqs[-1] == first_new:
+            # resized again before any segment of the last run went out
+            self.slice_runs[-1] = run
+        else:
+            self.slice_runs.append(run)
+            self._run_seqs.append(first_new)
 
-        # 5. Reset sequence_tracker to frame_cursor
-        self.sequence_tracker = self.frame_cursor
+        # runs that end below the window are never looked at again
+        while len(self._run_seqs) > 1 and self._run_seqs[1] <= self.frame_cursor:
+            self.slice_runs.pop(0)
+            self._run_seqs.pop(0)
 
-        print(f"[Framer] Re-sliced! Remaining segments count: {len(new_chunks)}, Byte position: {self.byte_position}")
+        log.debug("[Framer] Re-sliced! Remaining segments count: %d, new size from segment %d",
+                  self._segment_count() - self.frame_cursor, first_new)
 
     def send_packet(self, packet_obj):
-        self.socket.sendall(packet_obj.to_bytes())
\ No newline at end of file
+        self.socket.sendall(packet_obj.encode(self.wire_format))
+
+    def send_packets(self, packets: list):
+        """One scatter-gather write for the whole batch instead of one sendall per segment."""
+        write_frames(self.socket, [part for pkt in packets for part in pkt.encode_parts(self.wire_format)])
\ No newline at end of file
@@ -0,0 +1,108 @@
+import socket
+import struct
+from enum import Enum
+from typing import Tuple
+
+from Network_Packets.packet_type import CODE_FLAGS
+
+
+class WireFormat(Enum):
+    JSON = "json"
+    BINARY = "binary"
+
+
+# Binary frame layout (all integers big-endian):
+#   header: flag code (1 byte) + body length (4 bytes)
+#   PUSH body: sequence (4 bytes) + stream offset of the first payload byte (8 bytes) + raw payload. COMPRESSED_BIT set in the flag code marks a payload
+#              compressed with the codec agreed in the handshake. CHECKSUM_BIT means a CRC32 of the
+#              payload as sent (4 bytes) sits between the offset and the payload. An empty payload is a zero
+#              window probe, the receiver only answers it with an ACK
+#   ACK body:  ack (4 bytes, signed, -1 = nothing in order yet) + new_block_size (4 bytes, -1 when absent),
+#              then, with WINDOW_BIT set in the flag code, the receiver's free buffer space in bytes (4 bytes),
+#              optionally followed by a SACK block count (1 byte) and that many (start, end) sequence pairs.
+#              Empty for the handshake ACK
+#   FIN / FIN/ACK: empty body, or the sha256 digest (32 bytes) of the data carried by the connection
+# SYN and SYN/ACK always travel as JSON since the format is only agreed on during that exchange.
+FRAME_HEADER = struct.Struct("!BI")
+SEGMENT_FIELDS = struct.Struct("!IQ")
+ACK_FIELDS = struct.Struct("!ii")
+SACK_COUNT = struct.Struct("!B")
+SACK_BLOCK = struct.Struct("!ii")
+CHECKSUM_FIELD = struct.Struct("!I")
+WINDOW_FIELD = struct.Struct("!I")
+COMPRESSED_BIT = 0x80
+CHECKSUM_BIT = 0x40
+WINDOW_BIT = 0x20
+FLAG_BITS = COMPRESSED_BIT | CHECKSUM_BIT | WINDOW_BIT
+NO_BLOCK_SIZE = -1
+MAX_SACK_BLOCKS = 4
+
+JSON_START = ord("{")
+# iovec entries per sendmsg call, well below the usual IOV_MAX of 1024
+MAX_IOVECS = 512
+
+
+def negotiate_format(client_format: str, server_format: str) -> WireFormat:
+    """Binary is only used when both ends asked for it, JSON is the fallback."""
+    if client_format == WireFormat.BINARY.value and server_format == WireFormat.BINARY.value:
+        return WireFormat.BINARY
+    return WireFormat.JSON
+
+
+def scan_frames(buffer, decode_json, decode_binary) -> Tuple[list, int]:
+    """
+    Decodes every complete frame at the front of buffer (bytes or bytearray), whatever format it was sent in.
+    Returns the decoded packets and the offset where the first incomplete frame starts.
+    decode_json(line) and decode_binary(flag, body, flag bits) turn one frame into a packet, None drops it
+    (the decoders of Network_Packets.packet, passed in since that module builds on this one).
+    Payloads are copied out, so the caller is free to trim or reuse the buffer afterwards.
+    """
+    packets = []
+    pos = 0
+    end = len(buffer)
+    with memoryview(buffer) as view:
+        while pos < end:
+            if buffer[pos] == JSON_START:
+                line_end = buffer.find(b"\n", pos)
+                if line_end == -1:
+                    break
+                pkt = decode_json(view[pos:line_end].tobytes())
+                if pkt is not None:
+                    packets.append(pkt)
+                pos = line_end + 1
+            elif buffer[pos] in b"\r\n":
+                pos += 1
+            else:
+                if end - pos < FRAME_HEADER.size:
+                    break
+                code, body_len = FRAME_HEADER.unpack_from(buffer, pos)
+                body_start = pos + FRAME_HEADER.size
+                if end - body_start < body_len:
+                    break
+                flag = CODE_FLAGS.get(code & ~FLAG_BITS)
+                if flag is not None:
+                    pkt = decode_binary(flag, view[body_start:body_start + body_len], code & FLAG_BITS)
+                    if pkt is not None:
+                        packets.append(pkt)
+                pos = body_start + body_len
+    return packets, pos
+
+
+def write_frames(sock, parts: list):
+    """
+    Writes a batch of encoded frames (see Packet.encode_parts) with as few syscalls as possible:
+    one sendmsg over the whole iovec list where the platform has it, otherwise one sendall of the joined buffer.
+    """
+    if not hasattr(socket.socket, "sendmsg"):
+        sock.sendall(b"".join(parts))
+        return
+    views = [memoryview(part).cast("B") for part in parts if len(part)]
+    first = 0
+    while first < len(views):
+        sent = sock.sendmsg(views[first:first + MAX_IOVECS])
+        # a short write can stop anywhere, even in the middle of a buffer
+        while first < len(views) and sent >= views[first].nbytes:
+            sent -= views[first].nbytes
+            first += 1
+        if sent:
+            views[first] = views[first][sent:]
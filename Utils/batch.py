@@ -0,0 +1,222 @@
+import bisect
+import os
+import struct
+
+from Utils.log import get_logger
+
+log = get_logger("batch")
+
+# Batch transfers send many files over one connection as a single stream of bytes, each file preceded by
+#   file id (4 bytes) + name length (2 bytes) + content length (8 bytes) + the UTF-8 name
+# so windowing, SACK, compression and the sha256 check all work on the batch exactly as on a single file.
+BATCH_HEADER = struct.Struct("!IHQ")
+MAX_NAME_BYTES = 0xFFFF
+
+
+def encode_header(file_id: int, name: str, size: int) -> bytes:
+    raw_name = name.encode('utf-8')[:MAX_NAME_BYTES]
+    return BATCH_HEADER.pack(file_id, len(raw_name), size) + raw_name
+
+
+def is_batch(message: str) -> bool:
+    """
+    A directory or a comma separated list of paths in the message key is a batch, a single file is not,
+    even when its name contains a comma.
+    """
+    if os.path.isfile(message):
+        return False
+    return os.path.isdir(message) or "," in message
+
+
+def batch_entries(message: str) -> list:
+    """
+    (path, name) for every regular file the message names: a directory is walked (names relative to it,
+    '/' separated, sorted), a plain file keeps its base name. Missing paths are skipped with a warning,
+    a ValueError when that leaves nothing to send (an empty directory included).
+    """
+    entries = []
+    for item in (part.strip() for part in message.split(",")):
+        if not item:
+            continue
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for file_name in sorted(files):
+                    path = os.path.join(root, file_name)
+                    if os.path.isfile(path):
+                        entries.append((path, os.path.relpath(path, item).replace(os.sep, "/")))
+        elif os.path.isfile(item):
+            entries.append((item, os.path.basename(item)))
+        else:
+            log.warning("[Batch] Skipping %s, not a file or directory", item)
+    if not entries:
+        raise ValueError(f"no files to send in {message!r}")
+    return entries
+
+
+def safe_relative_path(name: str, fallback: str) -> str:
+    """The name as a path below the output directory: no absolute paths, no '..', nothing empty."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return os.path.join(*parts) if parts else fallback
+
+
+class BatchSource:
+    """
+    Payload source for a batch (see BufferSource): the headers and contents of every file as one stream.
+    Sizes are taken when the batch is built, files are read on demand with one of them open at a time.
+    A file that shrinks before it is sent is padded with zero bytes, the announced length can't change anymore.
+    """
+    def __init__(self, entries: list):
+        # (header, path, size) per file, and the stream offset each one starts at
+        self.parts = []
+        self._starts = []
+        offset = 0
+        for file_id, (path, name) in enumerate(entries):
+            size = os.path.getsize(path)
+            header = encode_header(file_id, name, size)
+            self._starts.append(offset)
+            self.parts.append((header, path, size))
+            offset += len(header) + size
+        self.total_size = offset
+        self._open_index = None
+        self._file_obj = None
+
+    def __len__(self):
+        return self.total_size
+
+    def _read(self, index: int, file_offset: int, length: int) -> bytes:
+        if self._open_index != index:
+            self._close_file()
+            self._file_obj = open(self.parts[index][1], 'rb')
+            self._open_index = index
+        self._file_obj.seek(file_offset)
+        data = self._file_obj.read(length)
+        if len(data) < length:
+            log.warning("[Batch] %s shrank while being sent, padding it", self.parts[index][1])
+            data += bytes(length - len(data))
+        return data
+
+    def view(self, start: int, length: int) -> memoryview:
+        end = min(start + length, self.total_size)
+        pieces = []
+        pos = start
+        index = bisect.bisect_right(self._starts, pos) - 1
+        while pos < end:
+            part_start = self._starts[index]
+            header, _, size = self.parts[index]
+            part_end = part_start + len(header) + size
+            rel = pos - part_start
+            if rel < len(header):
+                chunk = header[rel:min(part_end, end) - part_start]
+            else:
+                chunk = self._read(index, rel - len(header), min(part_end, end) - pos)
+            pieces.append(chunk)
+            pos += len(chunk)
+            if pos >= part_end:
+                index += 1
+        return memoryview(pieces[0] if len(pieces) == 1 else b"".join(pieces))
+
+    def release(self, upto: int):
+        # nothing is cached beyond the one open file
+        pass
+
+    def _close_file(self):
+        if self._file_obj is not None:
+            self._file_obj.close()
+            self._file_obj = None
+            self._open_index = None
+
+    def close(self):
+        self._close_file()
+
+
+class BatchSink:
+    """
+    Receiver side of a batch: splits the in-order stream back into files. Each file is written to
+    <name>.part below output_dir and renamed once its last byte arrived, so a file that shows up under its
+    own name is complete. Without an output directory every file is printed when it completes.
+    on_file(name, size) is called for every completed file.
+    """
+    def __init__(self, output_dir: str = None, on_file=None):
+        self.output_dir = output_dir
+        self.on_file = on_file
+        self.bytes_written = 0
+        self.files = 0
+        self._header = bytearray()
+        # the file being received: name, final path, bytes still to come, open .part file or in-memory chunks
+        self._name = None
+        self._path = None
+        self._remaining = 0
+        self._target = None
+
+    def write(self, data: bytes):
+        self.bytes_written += len(data)
+        view = memoryview(data)
+        while view:
+            view = self._read_header(view) if self._name is None else self._write_content(view)
+
+    def _read_header(self, view: memoryview) -> memoryview:
+        # a header can be cut anywhere by a segment edge, the pieces collect in self._header
+        if len(self._header) < BATCH_HEADER.size:
+            take = BATCH_HEADER.size - len(self._header)
+            self._header += view[:take]
+            view = view[take:]
+            if len(self._header) < BATCH_HEADER.size:
+                return view
+        file_id, name_len, size = BATCH_HEADER.unpack_from(self._header)
+        take = BATCH_HEADER.size + name_len - len(self._header)
+        self._header += view[:take]
+        view = view[take:]
+        if len(self._header) < BATCH_HEADER.size + name_len:
+            return view
+        name = bytes(self._header[BATCH_HEADER.size:]).decode('utf-8', errors='replace')
+        self._header.clear()
+        self._open(file_id, name, size)
+        return view
+
+    def _open(self, file_id: int, name: str, size: int):
+        self._name = name
+        self._remaining = size
+        if self.output_dir:
+            self._path = os.path.join(self.output_dir, safe_relative_path(name, f"file_{file_id}.bin"))
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            self._target = open(self._path + ".part", 'wb')
+        else:
+            self._target = []
+        log.debug("[Batch] Receiving file %d %s (%d bytes)", file_id, name, size)
+        if not size:
+            self._finish()
+
+    def _write_content(self, view: memoryview) -> memoryview:
+        chunk = view[:self._remaining]
+        if isinstance(self._target, list):
+            self._target.append(bytes(chunk))
+        else:
+            self._target.write(chunk)
+        self._remaining -= len(chunk)
+        if not self._remaining:
+            self._finish()
+        return view[len(chunk):]
+
+    def _finish(self):
+        if isinstance(self._target, list):
+            text = b"".join(self._target).decode('utf-8', errors='replace')
+            log.info("[OUTPUT] %s: %s", self._name, text)
+            size = sum(len(chunk) for chunk in self._target)
+        else:
+            size = self._target.tell()
+            self._target.close()
+            os.replace(self._path + ".part", self._path)
+            log.info("[OUTPUT] Wrote %d bytes to %s", size, self._path)
+        self.files += 1
+        if self.on_file is not None:
+            self.on_file(self._name, size)
+        self._name, self._path, self._target = None, None, None
+
+    def close(self):
+        if self._name is not None and not isinstance(self._target, list):
+            # the link went away in the middle of a file, the .part file stays as a marker
+            self._target.close()
+            log.warning("[Batch] %s incomplete, %d bytes missing", self._name, self._remaining)
+        self._name, self._path, self._target = None, None, None
+        log.info("[OUTPUT] Batch: %d files, %d bytes", self.files, self.bytes_written)
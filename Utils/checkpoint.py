@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+
+# how much newly committed data triggers a checkpoint write, besides the one at the end of a session
+CHECKPOINT_INTERVAL = 1024 * 1024
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of the whole file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f_obj:
+        for block in iter(lambda: f_obj.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """
+    Receiver side progress of a resumable transfer, persisted next to its output file as <output>.checkpoint.
+    committed_offset only ever covers bytes already flushed to the output file, so a new session can
+    safely continue from there when the sender still has the same content (same hash).
+    """
+    def __init__(self, path: str, file_name: str, content_hash: str, committed_offset: int = 0):
+        self.path = path
+        self.file_name = file_name
+        self.content_hash = content_hash
+        self.transfer_id = f"{file_name}@{content_hash[:16]}"
+        self.committed_offset = committed_offset
+        self._saved_offset = committed_offset
+
+    @staticmethod
+    def path_for(output_path: str) -> str:
+        return output_path + ".checkpoint"
+
+    @staticmethod
+    def load(path: str):
+        """The checkpoint stored at path, or None when there is none (or it can't be read)."""
+        try:
+            with open(path) as f_obj:
+                data = json.load(f_obj)
+            return Checkpoint(path, data["file_name"], data["content_hash"], int(data["committed_offset"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def advance(self, committed_offset: int) -> bool:
+        """Moves the committed offset. True when enough new data piled up to be worth a save()."""
+        self.committed_offset = committed_offset
+        return committed_offset - self._saved_offset >= CHECKPOINT_INTERVAL
+
+    def save(self):
+        data = {
+            "transfer_id": self.transfer_id,
+            "file_name": self.file_name,
+            "content_hash": self.content_hash,
+            "committed_offset": self.committed_offset,
+        }
+        # write then rename, a crash never leaves a half written checkpoint behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f_obj:
+            json.dump(data, f_obj)
+        os.replace(tmp_path, self.path)
+        self._saved_offset = self.committed_offset
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,18 +1,204 @@
 # configuration.py
+import os
+
+from Utils.file_handler import read_config_file
+from Utils.log import get_logger, LEVELS
+from Utils.metrics import FORMATS as METRICS_FORMATS
+from Utils.output_sink import DEFAULT_MAX_TRANSFER
+from Network_Packets.wire_format import WireFormat
+from Network_Packets.congestion_control import CONTROLLERS
+from Network_Packets.segment_sizing import SIZERS
+from Network_Packets.compression import CODECS
+
+log = get_logger("config")
+
+# environment variables named like this plus the upper-case key (RJTP_WINDOW_SIZE=64) override the file
+ENV_PREFIX = "RJTP_"
+
+
+class ConfigError(ValueError):
+    """A setting that is missing, can't be parsed or is out of range. The message names the key."""
+
+
+def parse_bool(value) -> bool:
+    """true/false, yes/no, on/off, 1/0 in any case. Anything else is an error, never silently True."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "yes", "on", "1"):
+        return True
+    if text in ("false", "no", "off", "0"):
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+def _at_least(minimum, parse=int):
+    def check(value):
+        number = parse(value)
+        if number < minimum:
+            raise ValueError(f"must be at least {minimum}, got {number}")
+        return number
+    return check
+
+
+def _fraction(value) -> float:
+    number = float(value)
+    if not 0.0 <= number <= 1.0:
+        raise ValueError(f"must be between 0 and 1, got {number}")
+    return number
+
+
+def _one_of(names):
+    def check(value):
+        name = str(value).strip().lower()
+        if name not in names:
+            raise ValueError(f"expected one of {sorted(names)}, got {value!r}")
+        return name
+    return check
+
+
+def _codec_list(value) -> str:
+    names = [name.strip().lower() for name in str(value).split(",") if name.strip()]
+    unknown = [name for name in names if name != "none" and name not in CODECS]
+    if unknown:
+        raise ValueError(f"unknown codec(s) {unknown}, expected some of {sorted(CODECS)} or none")
+    return ",".join(names) or "none"
+
+
+def _optional(parse):
+    def check(value):
+        return None if str(value).strip().lower() in ("", "none") else parse(value)
+    return check
+
+
+def _port(value) -> int:
+    port = int(value)
+    if not 0 <= port <= 65535:
+        raise ValueError(f"not a port number: {port}")
+    return port
+
+
+REQUIRED = object()
+
+# config key -> (attribute, parser, default). A parser gets the raw value (a string from a file or the
+# environment, anything from overrides) and raises ValueError when it doesn't fit.
+FIELDS = {
+    # client only, the file, directory or comma separated list to send
+    "message": ("message", _optional(str), None),
+    "window_size": ("window_size", _at_least(1), REQUIRED),
+    "maximum_msg_size": ("message_size", _at_least(1), REQUIRED),
+    "timeout": ("timeout", _at_least(1), REQUIRED),
+    "dynamic_message_size": ("dynamic", parse_bool, False),
+    # optional, older config files don't have it and stay on JSON
+    "wire_format": ("wire_format", _one_of({fmt.value for fmt in WireFormat}), WireFormat.JSON.value),
+    "streaming": ("streaming", parse_bool, False),
+    "sack": ("sack", parse_bool, False),
+    # fraction of data segments the sender throws away on purpose, for loss experiments
+    "simulated_loss": ("simulated_loss", _fraction, 0.0),
+    # one segment dropped once on purpose to show a retransmission, off unless set
+    "demo_drop_seq": ("demo_drop_seq", _optional(_at_least(0)), None),
+    # bytes one simulated loss draw stands for (say 1500 for a packet), 0 = one draw per segment
+    "simulated_loss_unit": ("simulated_loss_unit", _at_least(0), 0),
+    # sender only, nothing to negotiate
+    "congestion_control": ("congestion_control", _one_of(set(CONTROLLERS)), "reno"),
+    "congestion_trace": ("congestion_trace", _optional(str), None),
+    "pipelined": ("pipelined", parse_bool, False),
+    # delayed ACKs, both negotiated (1 / 0 means an ACK for every segment, the old behaviour)
+    "ack_interval": ("ack_interval", _at_least(0), 1),
+    "ack_delay": ("ack_delay", _at_least(0), 0),
+    # bytes per recv_into on either end, local only
+    "recv_buffer_size": ("recv_size", _at_least(1), 65536),
+    # debug shows every segment and ACK, info only the connection events
+    "log_level": ("log_level", _one_of(set(LEVELS)), "info"),
+    # connections a single file is split across, sender only (0 is read as 1)
+    "parallel_streams": ("parallel_streams", lambda value: max(1, int(value)), 1),
+    # lets a dropped transfer continue where the receiver's checkpoint left off (needs -output_dir there)
+    "resumable": ("resumable", parse_bool, False),
+    # codecs this side accepts, most preferred first ("zlib,lzma"), negotiated like the wire format
+    "compression": ("compression", _codec_list, "none"),
+    "adaptive_compression": ("adaptive_compression", parse_bool, True),
+    # per-segment CRC32 and a sha256 of the whole transfer compared at FIN, both ends have to agree
+    "integrity": ("integrity", parse_bool, False),
+    # receiver only: how dynamic_message_size picks sizes (adaptive / random) and the smallest it asks for
+    "dynamic_sizing": ("dynamic_sizing", _one_of(set(SIZERS)), "adaptive"),
+    "min_msg_size": ("min_msg_size", _at_least(1), 512),
+    # receiver only: bytes of early (out-of-order) data one session may hold
+    "reorder_buffer_size": ("reorder_buffer_size", _at_least(1), 16 * 1024 * 1024),
+    # receiver only: bytes of in-order data waiting for the output writer, advertised to senders as the
+    # free window of each ACK when flow_control is on (both ends have to agree)
+    "write_queue_size": ("write_queue_size", _at_least(1), 8 * 1024 * 1024),
+    "flow_control": ("flow_control", parse_bool, True),
+    # receiver only: bytes all sessions together may hold in write queues and reorder buffers
+    "receive_memory_limit": ("receive_memory_limit", _at_least(1), 64 * 1024 * 1024),
+    # receiver only: the largest file size a parallel transfer may announce in its SYN
+    "max_transfer_size": ("max_transfer_size", _at_least(0), DEFAULT_MAX_TRANSFER),
+    # counters / histograms dumped every metrics_interval seconds to metrics_file (jsonl or prometheus)
+    # and/or served over HTTP on metrics_port (0 picks a free port), local only
+    "metrics_file": ("metrics_file", _optional(str), None),
+    "metrics_port": ("metrics_port", _optional(_port), None),
+    "metrics_format": ("metrics_format", _one_of(set(METRICS_FORMATS)), "jsonl"),
+    "metrics_interval": ("metrics_interval", _at_least(0.01, float), 1.0),
+}
+
+
+def env_values(environ=None, prefix: str = ENV_PREFIX) -> dict:
+    """The config keys set in the environment (RJTP_WINDOW_SIZE -> window_size)."""
+    environ = os.environ if environ is None else environ
+    return {key: environ[prefix + key.upper()] for key in FIELDS if prefix + key.upper() in environ}
+
+
+def parse_overrides(pairs) -> dict:
+    """['window_size=64', 'sack=true'] from the command line -> {'window_size': '64', 'sack': 'true'}."""
+    values = {}
+    for pair in pairs or ():
+        key, sep, value = pair.partition("=")
+        if not sep or not key.strip():
+            raise ConfigError(f"expected key=value, got {pair!r}")
+        values[key.strip()] = value.strip()
+    return values
 
-from Utils.file_handler import FileHandler
 
 class ConnectionConfig:
-    def __init__(self, path: str):
-        file = FileHandler(path)
-        # Force integer casting here
-        self.window_size = int(file.get_window_size())
-        self.message_size = int(file.get_message_size())  # Fixed key name to match config.txt
-        self.timeout = int(file.get_timeout())
+    """
+    Every setting of one end, typed and checked once when the object is built; the rest of the code only
+    reads it through the getters. Values come from the config file at path (if any), then the environment
+    (os.environ unless another mapping is given, {} leaves it out, see env_values), then overrides (command line /
+    in-memory), later ones winning. Every entry point builds its settings here, so they all see the same layers.
+    A missing required key or a value that doesn't parse raises ConfigError naming it, unknown keys in the
+    file are logged and ignored.
+    """
+    def __init__(self, path: str = None, overrides: dict = None, environ=None):
+        self.path = path
+        values = {}
+        if path is not None:
+            try:
+                values.update(read_config_file(path))
+            except ValueError as e:
+                raise ConfigError(str(e))
+            for key in values:
+                if key not in FIELDS:
+                    log.warning("[Config] %s: unknown key '%s' ignored", path, key)
+        values.update(env_values(environ))
+        if overrides:
+            unknown = [key for key in overrides if key not in FIELDS]
+            if unknown:
+                raise ConfigError(f"unknown setting(s) {unknown}")
+            values.update(overrides)
+
+        for key, (attribute, parse, default) in FIELDS.items():
+            if key in values and values[key] is not None:
+                try:
+                    value = parse(values[key])
+                except (TypeError, ValueError) as e:
+                    raise ConfigError(f"{key}: {e}")
+            elif default is REQUIRED:
+                raise ConfigError(f"{key} is required" + (f" (missing from {path})" if path else ""))
+            else:
+                value = default
+            setattr(self, attribute, value)
 
-        # specific check for boolean
-        dyn = bool(file.get_dynamic_state())
-        self.dynamic = True if str(dyn).lower() == "true" else False
+    def get_message(self):
+        return self.message
 
     def get_window_size(self) -> int:
         return self.window_size
@@ -24,4 +210,91 @@ class ConnectionConfig:
         return self.message_size
 
     def get_is_dynamic(self) -> bool:
-        return self.dynamic
\ No newline at end of file
+        return self.dynamic
+
+    def get_wire_format(self) -> str:
+        return self.wire_format
+
+    def get_streaming(self) -> bool:
+        return self.streaming
+
+    def get_sack(self) -> bool:
+        return self.sack
+
+    def get_simulated_loss(self) -> float:
+        return self.simulated_loss
+
+    def get_congestion_control(self) -> str:
+        return self.congestion_control
+
+    def get_congestion_trace(self):
+        return self.congestion_trace
+
+    def get_pipelined(self) -> bool:
+        return self.pipelined
+
+    def get_recv_size(self) -> int:
+        return self.recv_size
+
+    def get_ack_interval(self) -> int:
+        return self.ack_interval
+
+    def get_ack_delay(self) -> int:
+        return self.ack_delay
+
+    def get_log_level(self) -> str:
+        return self.log_level
+
+    def get_parallel_streams(self) -> int:
+        return self.parallel_streams
+
+    def get_resumable(self) -> bool:
+        return self.resumable
+
+    def get_compression(self) -> str:
+        return self.compression
+
+    def get_adaptive_compression(self) -> bool:
+        return self.adaptive_compression
+
+    def get_integrity(self) -> bool:
+        return self.integrity
+
+    def get_simulated_loss_unit(self) -> int:
+        return self.simulated_loss_unit
+
+    def get_dynamic_sizing(self) -> str:
+        return self.dynamic_sizing
+
+    def get_min_msg_size(self) -> int:
+        return self.min_msg_size
+
+    def get_reorder_buffer_size(self) -> int:
+        return self.reorder_buffer_size
+
+    def get_write_queue_size(self) -> int:
+        return self.write_queue_size
+
+    def get_flow_control(self) -> bool:
+        return self.flow_control
+
+    def get_receive_memory_limit(self) -> int:
+        return self.receive_memory_limit
+
+    def get_max_transfer_size(self) -> int:
+        return self.max_transfer_size
+
+    def get_metrics_file(self):
+        return self.metrics_file
+
+    def get_metrics_port(self):
+        return self.metrics_port
+
+    def get_metrics_format(self) -> str:
+        return self.metrics_format
+
+    def get_metrics_interval(self) -> float:
+        return self.metrics_interval
+
+    def get_demo_drop_seq(self):
+        return self.demo_drop_seq
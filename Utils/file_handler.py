@@ -1,24 +1,16 @@
-class FileHandler:
-    def __init__(self, path: str):
-        self.path = path
-        self.data = dict()
-
-        with open(self.path, 'r') as f:
-            for line in f:
-                key, value = line.strip().split(": ")
-                self.data[key] = value  # or int(value) if needed
-
-    def get_window_size(self):
-        return int(self.data.get("window_size"))
-
-    def get_timeout(self):
-        return int(self.data.get("timeout"))
-
-    def get_message_size(self):
-        return int(self.data.get("maximum_msg_size"))
-
-    def get_dynamic_state(self):
-        return bool(self.data.get("dynamic_message_size"))
-
-    def get_message(self) -> str:
-        return str(self.data.get("message"))
+def read_config_file(path: str) -> dict:
+    """
+    The raw `key: value` pairs of a config file, values still strings (ConnectionConfig types and checks them).
+    Blank lines and lines starting with # are skipped, a value may contain ':' itself.
+    """
+    data = {}
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, sep, value = line.partition(":")
+            if not sep or not key.strip():
+                raise ValueError(f"{path}:{number}: expected 'key: value', got {line!r}")
+            data[key.strip()] = value.strip()
+    return data
@@ -0,0 +1,43 @@
+import logging
+import sys
+
+# every component logs under this name, so one call changes the level everywhere
+ROOT_LOGGER = "transfer"
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time, so redirect_stdout (the benchmarks' quiet()) keeps working."""
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+def _root() -> logging.Logger:
+    root = logging.getLogger(ROOT_LOGGER)
+    if not root.handlers:
+        handler = _ConsoleHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        root.propagate = False
+    return root
+
+
+def get_logger(component: str) -> logging.Logger:
+    """
+    Logger for one component. Per-packet lines go out at DEBUG with %-style arguments, so with the
+    default INFO level they are dropped before any formatting happens.
+    """
+    _root()
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
+
+
+def set_level(level):
+    """Accepts a logging level or one of debug / info / warning / error."""
+    if isinstance(level, str):
+        try:
+            level = LEVELS[level.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown log level '{level}', expected one of {sorted(LEVELS)}")
+    _root().setLevel(level)
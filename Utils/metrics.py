@@ -0,0 +1,255 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# RTT buckets in ms and window occupancy buckets in segments, the histograms' upper bounds
+RTT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+WINDOW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+FORMATS = ("jsonl", "prometheus")
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, source=None):
+        self.name = name
+        self.help = help_text
+        # counters the component already keeps as attributes are read through source when sampled,
+        # so the hot path doesn't pay for a second increment
+        self._source = source
+        self._value = 0
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    @property
+    def value(self):
+        return self._source() if self._source else self._value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self._value = value
+
+
+class Histogram:
+    """Fixed buckets, cumulative like Prometheus histograms: each bucket counts observations <= its bound."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self._counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def buckets(self) -> list:
+        """(upper bound, cumulative count) pairs, the last one is +Inf."""
+        out, running = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self._counts):
+            running += count
+            out.append((bound, running))
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, an estimate good to one bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, running in self.buckets():
+            if running >= rank:
+                return bound if bound != float("inf") else self.bounds[-1]
+        return self.bounds[-1]
+
+    @property
+    def value(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {("+Inf" if bound == float("inf") else bound): running for bound, running in self.buckets()},
+        }
+
+
+class MetricsRegistry:
+    """
+    The metrics of one component (a Framer, a DataCollector). snapshot() is the in-process view,
+    to_prometheus() the text exposition format. labels go on every Prometheus sample.
+    """
+    def __init__(self, prefix: str, labels: dict = None):
+        self.prefix = prefix
+        self.labels = dict(labels or {})
+        self._metrics = {}
+
+    def counter(self, name: str, help_text: str, source=None) -> Counter:
+        return self._add(Counter(name, help_text, source))
+
+    def gauge(self, name: str, help_text: str, source=None) -> Gauge:
+        return self._add(Gauge(name, help_text, source))
+
+    def histogram(self, name: str, help_text: str, buckets) -> Histogram:
+        return self._add(Histogram(name, help_text, buckets))
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def __getitem__(self, name: str):
+        return self._metrics[name]
+
+    def snapshot(self) -> dict:
+        return {name: metric.value for name, metric in self._metrics.items()}
+
+    def to_prometheus(self) -> str:
+        return _prometheus([self])
+
+    def metrics(self):
+        return self._metrics.values()
+
+
+def _prometheus(registries) -> str:
+    # registries with the same prefix (the streams of a parallel transfer) share one family per metric,
+    # told apart by their labels, since HELP / TYPE may only appear once per family
+    families = {}
+    for registry in registries:
+        for metric in registry.metrics():
+            families.setdefault(f"{registry.prefix}_{metric.name}", []).append((registry.labels, metric))
+    lines = []
+    for full, members in families.items():
+        lines.append(f"# HELP {full} {members[0][1].help}")
+        lines.append(f"# TYPE {full} {members[0][1].kind}")
+        for labels, metric in members:
+            if isinstance(metric, Histogram):
+                for bound, running in metric.buckets():
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{full}_bucket{_labels(labels, le=le)} {running}")
+                lines.append(f"{full}_sum{_labels(labels)} {metric.sum}")
+                lines.append(f"{full}_count{_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{full}{_labels(labels)} {metric.value}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _labels(labels: dict, **extra) -> str:
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    body = ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                    for key, value in merged.items())
+    return "{" + body + "}"
+
+
+def render(registries, fmt: str) -> str:
+    """Every registry in one dump: a JSON line with a timestamp, or Prometheus text."""
+    if fmt == "prometheus":
+        return _prometheus(registries)
+    record = {
+        "t": round(time.time(), 3),
+        "components": [{"component": registry.prefix, **registry.labels, **registry.snapshot()}
+                       for registry in registries],
+    }
+    return json.dumps(record) + "\n"
+
+
+class MetricsReporter:
+    """
+    Publishes the registries returned by get_registries (called on every dump, so components can come and go):
+    - path: JSON lines appended every interval seconds, or a Prometheus text file rewritten in place
+      (the node_exporter textfile layout)
+    - port: a local HTTP endpoint answering every GET with the current dump
+    A last dump is written on stop(), so short transfers still leave a record.
+    """
+    def __init__(self, get_registries, path: str = None, port: int = None, fmt: str = "jsonl",
+                 interval: float = 1.0, host: str = "127.0.0.1"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown metrics format '{fmt}', expected one of {list(FORMATS)}")
+        self.get_registries = get_registries
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), self._handler_class())
+            self._server.daemon_threads = True
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server else None
+
+    def render(self) -> str:
+        return render(self.get_registries(), self.fmt)
+
+    def start(self):
+        if self._server is not None:
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if self.path:
+            self._thread = threading.Thread(target=self._dump_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _dump_loop(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+        self.dump()
+
+    def dump(self):
+        text = self.render()
+        if self.fmt == "prometheus":
+            # scrapers read the file whole, never show them a half written one
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f_obj:
+                f_obj.write(text)
+            os.replace(tmp_path, self.path)
+        else:
+            with open(self.path, "a") as f_obj:
+                f_obj.write(text)
+
+    def _handler_class(self):
+        reporter = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = reporter.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4" if reporter.fmt == "prometheus" else "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return _MetricsHandler
+
+
+def reporter_from_config(cfg, get_registries):
+    """A started MetricsReporter when the config asks for metrics_file / metrics_port, otherwise None."""
+    path, port = cfg.get_metrics_file(), cfg.get_metrics_port()
+    if path is None and port is None:
+        return None
+    return MetricsReporter(get_registries, path, port, cfg.get_metrics_format(), cfg.get_metrics_interval()).start()
@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from Utils.log import get_logger
+
+log = get_logger("output")
+
+# the largest parallel transfer a collector accepts unless configured otherwise (max_transfer_size)
+DEFAULT_MAX_TRANSFER = 64 * 1024 ** 3
+
+
+class ConsoleSink:
+    """The original behaviour: collect the data and print it once the session is over."""
+    def __init__(self):
+        self.chunks = []
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self.chunks.append(bytes(data))
+        self.bytes_written += len(data)
+
+    def close(self):
+        full_data = b"".join(self.chunks)
+        self.chunks = []
+        print(f"\n[OUTPUT] Reconstructed Data: {full_data.decode('utf-8', errors='replace')}\n")
+
+
+class FileSink:
+    """
+    Streams in-order data straight to a file, nothing is held back in memory.
+    start_offset > 0 continues a resumed transfer: the first start_offset bytes already there are kept.
+    """
+    def __init__(self, path: str, start_offset: int = 0):
+        self.path = path
+        if start_offset:
+            self.file_obj = open(path, 'r+b')
+            self.file_obj.truncate(start_offset)
+            self.file_obj.seek(start_offset)
+        else:
+            self.file_obj = open(path, 'wb')
+        self.start_offset = start_offset
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self.file_obj.write(data)
+        self.bytes_written += len(data)
+
+    def position(self) -> int:
+        return self.start_offset + self.bytes_written
+
+    def flush(self):
+        """Pushes everything written so far to disk, a checkpoint may only point at flushed data."""
+        self.file_obj.flush()
+        os.fsync(self.file_obj.fileno())
+
+    def close(self):
+        self.file_obj.close()
+        log.info("[OUTPUT] Wrote %d bytes to %s", self.bytes_written, self.path)
+
+
+def output_path(output_dir: str, file_name: str, fallback_name: str) -> str:
+    # only the base name is used, a client can't write outside the output directory
+    name = os.path.basename(file_name or "")
+    if name in ("", ".", ".."):
+        name = fallback_name
+    return os.path.join(output_dir, name)
+
+
+def open_sink(output_dir: str, file_name: str, fallback_name: str, start_offset: int = 0):
+    """FileSink inside output_dir when one is configured, otherwise print to the console."""
+    if not output_dir:
+        return ConsoleSink()
+    return FileSink(output_path(output_dir, file_name, fallback_name), start_offset)
+
+
+
+class RangeTarget:
+    """
+    The output of one parallel transfer, shared by all of its streams. Each stream writes its range at absolute
+    offsets: pwrite into a file sized to the whole transfer, or into an anonymous temporary file when there is
+    no output directory (printed once complete), so nothing the size of the transfer is allocated up front.
+    Every stream writes from its own writer thread: the ranges never overlap, the lock only covers the count
+    (and the seek + write pair where there is no pwrite).
+    """
+    def __init__(self, path: str, total_size: int):
+        self.path = path
+        self.total_size = total_size
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self.streams = 0
+        if path:
+            # no O_TRUNC: a later stream of the same transfer may reopen a file the earlier ones already filled
+            self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                os.ftruncate(self.fd, total_size)
+            except OSError:
+                os.close(self.fd)
+                raise
+            self.spool = None
+        else:
+            # grows only as data arrives
+            self.spool = tempfile.TemporaryFile()
+            self.fd = self.spool.fileno()
+
+    def write_at(self, offset: int, data):
+        # a stream never writes past the size announced in its SYN
+        data = memoryview(data)[:max(0, self.total_size - offset)]
+        if hasattr(os, "pwrite"):
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self.fd, view, offset)
+                offset += written
+                view = view[written:]
+        else:
+            with self._lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                os.write(self.fd, data)
+        with self._lock:
+            self.bytes_written += len(data)
+
+    def complete(self) -> bool:
+        return self.bytes_written >= self.total_size
+
+    def close(self):
+        if self.spool is not None:
+            self.spool.seek(0)
+            full_data = self.spool.read(self.total_size)
+            self.spool.close()
+            self.spool = self.fd = None
+            print(f"\n[OUTPUT] Reconstructed Data: {full_data.decode('utf-8', errors='replace')}\n")
+        elif self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            log.info("[OUTPUT] Wrote %d bytes to %s", self.bytes_written, self.path)
+
+
+class RangeSink:
+    """Sink for one stream of a parallel transfer: in-order data lands at range_offset onwards in the shared target."""
+    def __init__(self, registry, transfer_id: str, target: RangeTarget, range_offset: int):
+        self.registry = registry
+        self.transfer_id = transfer_id
+        self.target = target
+        self.position = range_offset
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self.target.write_at(self.position, data)
+        self.position += len(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        self.registry.release(self.transfer_id)
+
+
+class TransferRegistry:
+    """
+    Parallel transfers currently being received, by transfer id. Streams open and release their targets
+    from the collector's loop, so there is no locking here. A file target is closed as soon as none of its streams is connected
+    (a late stream just reopens it); one without an output directory is kept until every byte arrived, then printed.
+    The size comes from the peer's SYN: a transfer over max_size, or bigger than the output directory's free
+    space, is refused with a ValueError before anything is allocated.
+    """
+    def __init__(self, output_dir: str = None, max_size: int = DEFAULT_MAX_TRANSFER):
+        self.output_dir = output_dir
+        self.max_size = max_size
+        self.targets = {}
+
+    def open_range(self, transfer_id: str, file_name: str, fallback_name: str, total_size: int,
+                   range_offset: int) -> RangeSink:
+        target = self.targets.get(transfer_id)
+        if target is None:
+            if total_size > self.max_size:
+                raise ValueError(f"{total_size} bytes is over the {self.max_size} byte limit")
+            path = output_path(self.output_dir, file_name, fallback_name) if self.output_dir else None
+            if path is not None:
+                # a file the earlier streams already sized only needs what it doesn't have yet
+                present = os.path.getsize(path) if os.path.isfile(path) else 0
+                free = shutil.disk_usage(self.output_dir).free
+                if total_size - present > free:
+                    raise ValueError(f"{total_size} bytes don't fit in the {free} bytes free in {self.output_dir}")
+            target = RangeTarget(path, total_size)
+            self.targets[transfer_id] = target
+        target.streams += 1
+        return RangeSink(self, transfer_id, target, range_offset)
+
+    def release(self, transfer_id: str):
+        target = self.targets.get(transfer_id)
+        if target is None:
+            return
+        target.streams -= 1
+        if target.streams <= 0 and (target.path or target.complete()):
+            target.close()
+            del self.targets[transfer_id]
@@ -0,0 +1,102 @@
+import os
+from collections import deque
+
+
+class BufferSource:
+    """
+    Whole message already in memory (bytes or an mmap). Segments are plain memoryview slices.
+    start / length restrict it to one byte range of the message (parallel streams); offsets are relative to start.
+    """
+    def __init__(self, raw_message, start: int = 0, length: int = None):
+        full_view = memoryview(raw_message)
+        end = len(full_view) if length is None else min(start + length, len(full_view))
+        self.view_all = full_view[start:end]
+        full_view.release()
+
+    def __len__(self):
+        return len(self.view_all)
+
+    def view(self, start: int, length: int) -> memoryview:
+        return self.view_all[start:start + length]
+
+    def release(self, upto: int):
+        # nothing to give back, the whole buffer stays mapped until close()
+        pass
+
+    def close(self):
+        self.view_all.release()
+
+
+class StreamingSource:
+    """
+    Reads the source file forward on demand, in read_chunk sized blocks.
+    Only the bytes between the oldest unacked offset (see release()) and the furthest segment asked for
+    are kept, so memory follows the window size and not the file size.
+    start / length restrict it to one byte range of the file, offsets are relative to start.
+    """
+    def __init__(self, path: str, read_chunk: int = 64 * 1024, start: int = 0, length: int = None):
+        self.file_obj = open(path, 'rb')
+        file_size = os.fstat(self.file_obj.fileno()).st_size
+        start = min(start, file_size)
+        self.total_size = file_size - start if length is None else min(length, file_size - start)
+        self.file_obj.seek(start)
+        self.read_chunk = read_chunk
+        self.blocks = deque()
+        self.blocks_start = 0
+        self.read_head = 0
+
+    def __len__(self):
+        return self.total_size
+
+    def _read_until(self, end: int):
+        while self.read_head < end:
+            block = self.file_obj.read(min(self.read_chunk, self.total_size - self.read_head))
+            if not block:
+                # file shrank under us, whatever is missing reads as empty
+                self.total_size = self.read_head
+                break
+            self.blocks.append(block)
+            self.read_head += len(block)
+
+    def view(self, start: int, length: int) -> memoryview:
+        end = min(start + length, self.total_size)
+        if start < self.blocks_start:
+            raise ValueError(f"offset {start} was already released (buffer starts at {self.blocks_start})")
+        self._read_until(end)
+
+        # find the block holding start
+        block_offset = self.blocks_start
+        index = 0
+        while index < len(self.blocks) and block_offset + len(self.blocks[index]) <= start:
+            block_offset += len(self.blocks[index])
+            index += 1
+        if index == len(self.blocks):
+            return memoryview(b"")
+
+        block = self.blocks[index]
+        if end - block_offset <= len(block):
+            # the common case: the segment sits inside one block, no copy
+            return memoryview(block)[start - block_offset:end - block_offset]
+
+        # segment straddles blocks, stitch the pieces together
+        pieces = []
+        pos = start
+        while pos < end and index < len(self.blocks):
+            block = self.blocks[index]
+            pieces.append(block[pos - block_offset:min(end - block_offset, len(block))])
+            pos = block_offset + len(block)
+            block_offset += len(block)
+            index += 1
+        return memoryview(b"".join(pieces))
+
+    def release(self, upto: int):
+        """Drops every block that lies completely below upto (everything before it is ACKed)."""
+        while self.blocks and self.blocks_start + len(self.blocks[0]) <= upto:
+            self.blocks_start += len(self.blocks.popleft())
+
+    def buffered_bytes(self) -> int:
+        return self.read_head - self.blocks_start
+
+    def close(self):
+        self.blocks.clear()
+        self.file_obj.close()
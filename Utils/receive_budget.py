@@ -0,0 +1,27 @@
+import threading
+
+DEFAULT_RECEIVE_MEMORY = 64 * 1024 * 1024
+
+
+class ReceiveBudget:
+    """
+    Memory one collector lets all of its sessions hold for data received but not written out yet (write queues
+    and reorder buffers), split evenly between the transfers in progress. A session never advertises a window
+    past its share, so however many senders push at once the collector holds about limit bytes; when a new
+    transfer starts, the windows the others already advertised can add at most their old shares on top.
+    """
+    def __init__(self, limit: int = DEFAULT_RECEIVE_MEMORY):
+        self.limit = max(1, int(limit))
+        self.transfers = 0
+        self._lock = threading.Lock()
+
+    def join(self):
+        with self._lock:
+            self.transfers += 1
+
+    def leave(self):
+        with self._lock:
+            self.transfers = max(0, self.transfers - 1)
+
+    def share(self) -> int:
+        return self.limit // max(1, self.transfers)
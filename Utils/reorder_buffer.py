@@ -0,0 +1,90 @@
+import bisect
+
+# bytes of early data a session holds at most, far more than a window of maximum-size segments
+DEFAULT_REORDER_LIMIT = 16 * 1024 * 1024
+
+
+class ReorderBuffer:
+    """
+    Receiver side reassembly, keyed by the byte offset of the data in the connection (not by sequence number).
+    Only holds data that arrived ahead of the first missing byte, and never the same byte twice: a segment
+    overlapping bytes already delivered or already held is cut down to the part that is new. Once the hole in
+    front of held data closes, pop_ready hands it back in order so it can go to the sink right away.
+    At most limit bytes are held, a segment that doesn't fit is refused and the sender has to send it again.
+    """
+    def __init__(self, limit: int = DEFAULT_REORDER_LIMIT):
+        self.limit = limit
+        # first byte not delivered yet
+        self.next_offset = 0
+        # sorted start offsets of the held pieces, start -> (data, sequence of the segment it came from)
+        self._starts = []
+        self._pieces = {}
+        self.buffered_bytes = 0
+        self.refused = 0
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def take_in_order(self, offset: int, data):
+        """
+        The part of an in-order segment (one starting at or before next_offset) that wasn't delivered yet,
+        and moves next_offset past it. Held data it overlaps is dropped by the next pop_ready.
+        """
+        skip = self.next_offset - offset
+        if skip >= len(data):
+            return data[:0]
+        self.next_offset = offset + len(data)
+        return data[skip:] if skip else data
+
+    def insert(self, offset: int, data, seq: int) -> bool:
+        """Holds the new bytes of an early segment. False when they don't fit, nothing is stored then."""
+        end = offset + len(data)
+        cursor = max(offset, self.next_offset)
+        idx = bisect.bisect_right(self._starts, cursor) - 1
+        if idx >= 0:
+            # the piece starting at or before the cursor may already cover its first bytes
+            cursor = max(cursor, self._starts[idx] + len(self._pieces[self._starts[idx]][0]))
+        idx += 1
+
+        missing = []
+        while cursor < end and idx < len(self._starts) and self._starts[idx] < end:
+            start = self._starts[idx]
+            if start > cursor:
+                missing.append((cursor, start))
+            cursor = max(cursor, start + len(self._pieces[start][0]))
+            idx += 1
+        if cursor < end:
+            missing.append((cursor, end))
+
+        new_bytes = sum(stop - start for start, stop in missing)
+        if self.buffered_bytes + new_bytes > self.limit:
+            self.refused += 1
+            return False
+        for start, stop in missing:
+            piece = data if (start, stop) == (offset, end) else bytes(data[start - offset:stop - offset])
+            bisect.insort(self._starts, start)
+            self._pieces[start] = (piece, seq)
+        self.buffered_bytes += new_bytes
+        return True
+
+    def pop_ready(self) -> list:
+        """(data, seq) for every held piece that is now contiguous with the delivered data, lowest first."""
+        ready = []
+        while self._starts and self._starts[0] <= self.next_offset:
+            start = self._starts.pop(0)
+            data, seq = self._pieces.pop(start)
+            self.buffered_bytes -= len(data)
+            # empty when an in-order segment already covered all of it, the sequence still counts as received
+            ready.append((self.take_in_order(start, data), seq))
+        return ready
+
+    def end_offset(self) -> int:
+        """One past the highest byte held (next_offset when nothing is): a segment starting beyond it opens a new hole."""
+        if not self._starts:
+            return self.next_offset
+        last = self._starts[-1]
+        return last + len(self._pieces[last][0])
+
+    def held_sequences(self) -> list:
+        """Sequence numbers with data waiting here, sorted, for the SACK blocks."""
+        return sorted({seq for _, seq in self._pieces.values()})
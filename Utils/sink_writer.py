@@ -0,0 +1,109 @@
+import collections
+import threading
+
+from Utils.log import get_logger
+
+log = get_logger("writer")
+
+# the writer joins queued chunks into writes of about this size, one syscall for many small segments
+WRITE_BATCH = 1024 * 1024
+DEFAULT_WRITE_QUEUE = 8 * 1024 * 1024
+
+
+class SinkWriter:
+    """
+    Puts a writer thread between a session and its output sink (see Utils/output_sink.py).
+    write() only queues the data, so the network loop goes straight back to reading and ACKing while the
+    thread does the (possibly slow) disk writes, several queued chunks joined into one. The queue is bounded
+    by limit bytes through the window the receiver advertises, not by blocking: the next ACK offers no more
+    than free(), and a sender that keeps to it never pushes more than limit bytes plus what was in flight.
+    on_written() runs on the writer thread after every write, the session checkpoints there and wakes its
+    collector when a sender it held back can go on.
+    """
+    def __init__(self, sink, limit: int = DEFAULT_WRITE_QUEUE, on_written=None):
+        self.sink = sink
+        self.limit = max(1, int(limit))
+        self.on_written = on_written
+        self.queued_bytes = 0
+        self.bytes_written = 0
+        self.error = None
+        self._chunks = collections.deque()
+        self._busy = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="sink-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, data: bytes):
+        with self._cond:
+            if self.error is not None:
+                raise self.error
+            self._chunks.append(data)
+            self.queued_bytes += len(data)
+            self._cond.notify_all()
+
+    def free(self) -> int:
+        """Bytes the queue still has room for."""
+        return max(0, self.limit - self.queued_bytes)
+
+    def position(self) -> int:
+        return self.sink.position()
+
+    def drain(self):
+        """Waits until everything queued so far is written. Raises what the writer thread ran into."""
+        with self._cond:
+            while (self._chunks or self._busy) and self.error is None:
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+
+    def flush(self):
+        self.drain()
+        self.sink.flush()
+
+    def close(self):
+        """Writes out what's left, stops the thread and closes the sink."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.sink.close()
+        if self.error is not None:
+            log.error("[Writer] Output incomplete: %s", self.error)
+
+    def _take_batch(self) -> list:
+        batch, size = [], 0
+        while self._chunks and (not batch or size + len(self._chunks[0]) <= WRITE_BATCH):
+            chunk = self._chunks.popleft()
+            batch.append(chunk)
+            size += len(chunk)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._chunks and not self._closing:
+                    self._cond.wait()
+                if not self._chunks or self.error is not None:
+                    return
+                batch = self._take_batch()
+                self._busy = True
+            size = sum(len(chunk) for chunk in batch)
+            try:
+                self.sink.write(batch[0] if len(batch) == 1 else b"".join(batch))
+                self.bytes_written += size
+            except OSError as e:
+                log.error("[Writer] Write failed: %s", e)
+                self.error = e
+            with self._cond:
+                self.queued_bytes -= size
+            # still busy while on_written runs, drain() returns only once a checkpoint it saves is done
+            if self.on_written is not None and self.error is None:
+                try:
+                    self.on_written()
+                except OSError as e:
+                    log.error("[Writer] %s", e)
+                    self.error = e
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
@@ -1,125 +1,565 @@
+import argparse
+import errno
+import mmap
+import os
+import select
 import socket
-import json
 import sys
-from typing import List
+import threading
+import time
+import uuid
 
-from Utils.configuration import ConnectionConfig
-from Utils.config_writer import FileConfiger
-from Utils.file_handler import FileHandler
+from Utils.configuration import ConnectionConfig, ConfigError, parse_overrides
 from Network_Packets.packet import HandshakePacket, AckPacket, FinPacket, PacketType, HandshakeAckPacket
 from Network_Packets.window_framer import Framer
+from Network_Packets.pipelined_framer import PipelinedFramer
+from Network_Packets.wire_format import WireFormat, negotiate_format
+from Network_Packets.frame_decoder import FrameDecoder
+from Network_Packets.compression import parse_codecs, negotiate_compression, make_codec, BlockCompressor, \
+    NO_COMPRESSION
+from Utils.payload_source import BufferSource, StreamingSource
+from Utils.log import get_logger, set_level
+from Utils.metrics import reporter_from_config
+from Utils.checkpoint import file_digest
+from Utils.batch import is_batch, batch_entries, BatchSource
+
+log = get_logger("emitter")
+
+
+class Link:
+    """
+    The connection to one collector with its FrameDecoder. Carries one transfer, or one after the other when
+    both ends agreed on keep_alive in the handshake (see EmitterPool).
+    """
+    def __init__(self, target_ip: str, target_socket: int, recv_size: int):
+        self.address = (target_ip, target_socket)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # segments and ACKs are small writes, Nagle would hold them back and skew every RTT sample
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = FrameDecoder(recv_size)
+        self.connected = False
+        # set by each handshake: whether the receiver keeps the link open for another transfer
+        self.keep_alive = False
+        self.transfers = 0
+        self.last_used = time.monotonic()
+
+    def connect(self):
+        self.sock.connect(self.address)
+        self.connected = True
+
+    def usable(self, idle_timeout: float) -> bool:
+        """Connected, not idle for longer than idle_timeout and quiet: a readable idle link was closed by the peer."""
+        if not self.connected or time.monotonic() - self.last_used > idle_timeout:
+            return False
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def close(self):
+        self.connected = False
+        self.sock.close()
+
+
+def _require_file(path: str):
+    """Raises FileNotFoundError unless path is a regular file: a library caller gets an exception, never an exit."""
+    if not os.path.isfile(path):
+        raise FileNotFoundError(errno.ENOENT, "source file missing", path)
 
 
 class DataEmitter:
-    def __init__(self, config_loc: str, target_ip: str = "127.0.0.1", target_socket: int = 5555):
-        raw_handler = FileHandler(config_loc)
-        # Store raw filename and text for later
-        self.msg_source = raw_handler.get_message()
-        self.raw_text_content = ""
+    def __init__(self, config_loc: str, target_ip: str = "127.0.0.1", target_socket: int = 5555,
+                 byte_range: tuple = None, transfer_id: str = None, message: str = None,
+                 net_params: ConnectionConfig = None, link: Link = None, keep_alive: bool = False):
+        # message / net_params let library callers skip the config file (or parse it once for many emitters)
+        self.net_params = net_params if net_params is not None else ConnectionConfig(config_loc)
+        # Store raw filename and the mapped file contents for later
+        self.msg_source = message if message is not None else self.net_params.get_message()
+        if self.msg_source is None:
+            raise ConfigError("message: nothing to send, give one or set it in the config")
+        # a directory or a comma separated list: every file goes over this one connection (see Utils/batch.py)
+        self.batch = batch_entries(self.msg_source) if byte_range is None and is_batch(self.msg_source) else None
+        # checked before any link is opened, the receiver shouldn't be left with an empty output
+        if self.batch is None:
+            _require_file(self.msg_source)
+        self.raw_content = b""
+        self.payload_source = None
+        # parallel streams (see ParallelEmitter): this emitter only sends (offset, length) of the file
+        self.byte_range = byte_range
+        self.transfer_id = transfer_id
+        # publishes the Framer's metrics when the config asks for it; a ParallelEmitter reports for all its streams
+        self.report_metrics = True
 
-        self.net_params = ConnectionConfig(config_loc)
+        set_level(self.net_params.get_log_level())
         self.dest_addr = target_ip
         self.dest_port = target_socket
-        self.link_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # a pooled link may already be connected and have carried earlier transfers
+        self.link = link if link is not None else Link(target_ip, target_socket, self.net_params.get_recv_size())
+        self.link_socket = self.link.sock
+        # ask the receiver to keep the link open after this transfer instead of closing it
+        self.keep_alive = keep_alive
 
         self.proposed_window = self.net_params.get_window_size()
         self.proposed_msg_size = self.net_params.get_message_size()
         self.proposed_timeout = self.net_params.get_timeout()
         self.proposed_dynamic = self.net_params.get_is_dynamic()
+        self.proposed_format = self.net_params.get_wire_format()
+        self.streaming = self.net_params.get_streaming()
+        self.proposed_sack = self.net_params.get_sack()
+        self.proposed_ack_interval = self.net_params.get_ack_interval()
+        self.proposed_ack_delay = self.net_params.get_ack_delay()
+        # parallel streams and batches have their own bookkeeping, resuming only applies to a single file on one stream
+        self.resumable = self.net_params.get_resumable() and transfer_id is None and self.batch is None
+        self.resume_offset = 0
+        self.proposed_compression = parse_codecs(self.net_params.get_compression())
+        self.proposed_integrity = self.net_params.get_integrity()
+        self.effective_integrity = False
+        self.proposed_flow_control = self.net_params.get_flow_control()
+        self.effective_flow_control = False
+        # None until a digest was compared at teardown
+        self.integrity_ok = None
+        self.transfer_agent = None
 
         self.effective_window = 0
         self.effective_msg_size = 0
         self.effective_timeout = 0
         self.effective_dynamic = False
-        self.payload_segments = []
+        self.effective_sack = False
+        self.effective_ack_interval = 1
+        self.effective_ack_delay = 0
+        self.effective_compression = NO_COMPRESSION
+        # everything up to and including SYN/ACK is JSON
+        self.effective_format = WireFormat.JSON
+        # one decoder for the whole link, handed to the Framer after the handshake
+        self.rx_decoder = self.link.decoder
 
-    def _harvest_and_slice(self, chunk_cap: int) -> List[str]:
+    def _map_source(self):
+        """
+        Maps the source file read-only instead of reading it into a string, the Framer slices segments
+        straight out of the mapping. Works the same for text and binary files.
+        """
         try:
-            with open(self.msg_source, 'r') as f_obj:
-                self.raw_text_content = f_obj.read()
-            return [self.raw_text_content[i:i + chunk_cap] for i in range(0, len(self.raw_text_content), chunk_cap)]
+            with open(self.msg_source, 'rb') as f_obj:
+                try:
+                    return mmap.mmap(f_obj.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # empty files can't be mapped
+                    return b""
         except FileNotFoundError:
-            print(f"Critical: Source file {self.msg_source} missing.")
-            sys.exit(1)
+            # gone since the emitter was built
+            _require_file(self.msg_source)
+            raise
+
+    def _open_source(self):
+        """Streaming mode reads the file as the window advances, otherwise the whole file is mapped."""
+        if self.batch is not None:
+            return BatchSource(self.batch)
+        if self.streaming:
+            _require_file(self.msg_source)
+            # read a few segments at a time, never less than one segment
+            return StreamingSource(self.msg_source, max(self.effective_msg_size * 4, 64 * 1024), *self._range())
+        self.raw_content = self._map_source()
+        return BufferSource(self.raw_content, *self._range())
+
+    def _range(self) -> tuple:
+        return self.byte_range if self.byte_range is not None else (0, None)
+
+    def _release_source(self):
+        if self.payload_source is not None:
+            self.payload_source.close()
+            self.payload_source = None
+        if isinstance(self.raw_content, mmap.mmap):
+            try:
+                self.raw_content.close()
+            except BufferError:
+                # a segment view is still referenced somewhere, the mapping goes away with it
+                pass
+        self.raw_content = b""
 
     def _dispatch_unit(self, packet_obj) -> None:
-        self.link_socket.sendall(packet_obj.to_bytes())
+        self.link_socket.sendall(packet_obj.encode(self.effective_format))
 
     def _await_specific_packet(self, expected_flag: PacketType):
         self.link_socket.settimeout(None)
-        accumulator = ""
         while True:
-            raw_bytes = self.link_socket.recv(4096).decode('utf-8')
-            if not raw_bytes: continue
-            accumulator += raw_bytes
-            while "\n" in accumulator:
-                line_data, accumulator = accumulator.split("\n", 1)
-                try:
-                    p_map = json.loads(line_data)
-                    if p_map.get("flag") == expected_flag.value:
-                        return p_map
-                except json.JSONDecodeError:
-                    continue
+            packets = self.rx_decoder.packets()
+            for index, pkt in enumerate(packets):
+                if pkt.flag is expected_flag:
+                    # whatever came in the same read behind it belongs to the next reader
+                    self.rx_decoder.push_back(packets[index + 1:])
+                    return pkt
+            if not self.rx_decoder.recv_from(self.link_socket):
+                raise ConnectionError(f"link closed while waiting for {expected_flag.value}")
 
     def initiate_link(self):
-        print("[Emitter] Dialing target...")
-        self.link_socket.connect((self.dest_addr, self.dest_port))
-        # new line
-        #self.link_socket.settimeout(self.proposed_timeout)
+        if not self.link.connected:
+            log.info("[Emitter] Dialing target...")
+            self.link.connect()
+        # the SYN of a reused link goes out as JSON like any other, whatever the last transfer agreed on
+        self.effective_format = WireFormat.JSON
 
+        range_offset, total_size, content_hash = 0, None, None
+        if self.transfer_id is not None:
+            range_offset, total_size = self.byte_range[0], os.path.getsize(self.msg_source)
+        elif self.resumable and os.path.isfile(self.msg_source):
+            # the receiver only resumes when the content is byte for byte what it saw last time
+            content_hash = file_digest(self.msg_source)
+        file_name = os.path.basename(self.msg_source) if self.batch is None else None
         syn = HandshakePacket(PacketType.SYN, self.proposed_window, self.proposed_msg_size, self.proposed_timeout,
-                              self.proposed_dynamic)
+                              self.proposed_dynamic, self.proposed_format, file_name,
+                              self.proposed_sack, self.proposed_ack_interval, self.proposed_ack_delay,
+                              self.transfer_id, range_offset, total_size, content_hash,
+                              compression=self.proposed_compression, integrity=self.proposed_integrity,
+                              batch=len(self.batch) if self.batch is not None else 0, keep_alive=self.keep_alive,
+                              flow_control=self.proposed_flow_control)
         self._dispatch_unit(syn)
-        print("[Emitter] Sent SYN.")
+        log.info("[Emitter] Sent SYN.")
 
         synack = self._await_specific_packet(PacketType.SYNACK)
-        print("[Emitter] Received SYN/ACK.")
+        log.info("[Emitter] Received SYN/ACK.")
+        if self.batch is not None and synack.batch != len(self.batch):
+            # an older receiver would write the whole batch, headers included, into one file
+            self.link.close()
+            raise ConnectionError("receiver does not accept batch transfers")
 
-        server_win = int(synack.get("window_size", self.proposed_window))
-        server_msg = int(synack.get("maximum_msg_size", self.proposed_msg_size))
-        server_to = int(synack.get("timeout", self.proposed_timeout))
-        server_dyn = bool(synack.get("dynamic_size", self.proposed_dynamic))
+        server_win = synack.window
+        server_msg = synack.maximum_message_size
+        server_to = synack.timeout
+        server_dyn = synack.dynamic
 
         self.effective_window = min(self.proposed_window, server_win)
         self.effective_msg_size = min(self.proposed_msg_size, server_msg)
         self.effective_timeout = min(self.proposed_timeout, server_to)
         self.effective_dynamic = self.proposed_dynamic and server_dyn
+        # servers that predate the binary format don't echo the field back, so they stay on JSON
+        self.effective_format = negotiate_format(self.proposed_format, synack.wire_format)
+        self.effective_sack = self.proposed_sack and synack.sack
+        # older servers ACK every segment, which is what 1 / 0 means
+        self.effective_ack_interval = min(self.proposed_ack_interval, synack.ack_interval)
+        self.effective_ack_delay = min(self.proposed_ack_delay, synack.ack_delay)
+        # same rule on both ends: the first of our codecs the server also allows
+        self.effective_compression = negotiate_compression(self.proposed_compression, synack.compression)
+        self.effective_integrity = self.proposed_integrity and synack.integrity
+        # the Framer follows the window of every ACK that carries one, this is only for the log
+        self.effective_flow_control = self.proposed_flow_control and synack.flow_control
+        self.link.keep_alive = self.keep_alive and synack.keep_alive
+        if self.resumable:
+            self.resume_offset = min(max(0, synack.resume_offset), os.path.getsize(self.msg_source))
+            if self.resume_offset:
+                # the receiver already has everything before this, only the rest goes out
+                log.info("[Emitter] Resuming at byte %d", self.resume_offset)
+                self.byte_range = (self.resume_offset, None)
 
-        print(
+        log.info(
             f"[Emitter] Negotiated: Win={self.effective_window},"
             f" Msg={self.effective_msg_size},"
             f" Timeout={self.effective_timeout},"
-            f" Dyn={self.effective_dynamic}")
+            f" Dyn={self.effective_dynamic},"
+            f" Format={self.effective_format.value},"
+            f" SACK={self.effective_sack},"
+            f" AckEvery={self.effective_ack_interval}/{self.effective_ack_delay}ms,"
+            f" Compression={self.effective_compression},"
+            f" Integrity={self.effective_integrity},"
+            f" FlowControl={self.effective_flow_control}")
 
-        self.payload_segments = self._harvest_and_slice(self.effective_msg_size)
+        self.payload_source = self._open_source()
 
         self._dispatch_unit(HandshakeAckPacket(PacketType.ACK))
-        print("[Emitter] Connection Established.")
+        log.info("[Emitter] Connection Established.")
 
     def execute_transfer(self):
-        print("[Emitter] Handing over control to Framer...")
-        # PASS RAW TEXT CONTENT HERE
-        transfer_agent = Framer(
+        log.info("[Emitter] Handing over control to Framer...")
+        # pipelined mode sends and processes ACKs on separate threads
+        framer_cls = PipelinedFramer if self.net_params.get_pipelined() else Framer
+        self.transfer_agent = framer_cls(
             self.link_socket,
-            self.raw_text_content,  # New Argument
-            self.payload_segments,
+            self.payload_source,
             self.effective_window,
             self.effective_msg_size,
             self.effective_timeout,
-           self.effective_dynamic
+           self.effective_dynamic,
+            self.effective_format,
+            self.effective_sack,
+            self.net_params.get_simulated_loss(),
+            congestion=self.net_params.get_congestion_control(),
+            trace_path=self.net_params.get_congestion_trace(),
+            decoder=self.rx_decoder,
+            ack_delay=self.effective_ack_delay,
+            compressor=self._make_compressor(),
+            integrity=self.effective_integrity,
+            loss_unit=self.net_params.get_simulated_loss_unit(),
+            metrics_labels=self._metrics_labels(),
+            drop_seq=self.net_params.get_demo_drop_seq()
         )
-        transfer_agent.run_transfer_loop()
-        print("[Emitter] Transfer complete.")
+        reporter = reporter_from_config(self.net_params, lambda: [self.transfer_agent.metrics]) \
+            if self.report_metrics else None
+        try:
+            self.transfer_agent.run_transfer_loop()
+        finally:
+            if reporter is not None:
+                reporter.stop()
+        self._release_source()
+        if self.batch is not None:
+            log.info("[Emitter] Batch of %d files sent.", len(self.batch))
+        log.info("[Emitter] Transfer complete.")
+
+    def _metrics_labels(self) -> dict:
+        labels = {"file": os.path.basename(self.msg_source) if self.batch is None else f"batch:{len(self.batch)}"}
+        if self.transfer_id is not None:
+            labels.update(transfer_id=self.transfer_id, range_offset=self._range()[0])
+        return labels
+
+    def _make_compressor(self):
+        codec = make_codec(self.effective_compression)
+        if codec is None:
+            return None
+        return BlockCompressor(codec, self.net_params.get_adaptive_compression())
 
     def terminate_link(self):
-        print("[Emitter] Initiating Teardown.")
-        self._dispatch_unit(FinPacket(PacketType.FIN))
-        self._await_specific_packet(PacketType.FINACK)
+        log.info("[Emitter] Initiating Teardown.")
+        digest = None
+        if self.transfer_agent is not None and self.transfer_agent.tx_digest is not None:
+            digest = self.transfer_agent.tx_digest.hexdigest()
+        self._dispatch_unit(FinPacket(PacketType.FIN, digest))
+        finack = self._await_specific_packet(PacketType.FINACK)
+        if digest is not None:
+            self.integrity_ok = finack.digest == digest
+            if self.integrity_ok:
+                log.info("[Emitter] Receiver confirmed the transfer digest (sha256 %s)", digest)
+            else:
+                log.error("[Emitter] Digest MISMATCH: sent %s, receiver has %s", digest, finack.digest)
+        self.link.transfers += 1
+        self.link.last_used = time.monotonic()
+        if self.link.keep_alive:
+            # no final ACK, the receiver waits for the next SYN on this link
+            log.info("[Emitter] Transfer closed, link kept open.")
+            return
         self._dispatch_unit(HandshakeAckPacket(PacketType.ACK))
-        print("[Emitter] Closed.")
+        self.link.close()
+        log.info("[Emitter] Closed.")
 
 
-if __name__ == "__main__":
+def split_ranges(total_size: int, streams: int) -> list:
+    """(offset, length) for each stream, as even as possible. Never more streams than bytes, at least one."""
+    streams = max(1, min(streams, total_size))
+    base, extra = divmod(total_size, streams)
+    ranges = []
+    offset = 0
+    for index in range(streams):
+        length = base + (1 if index < extra else 0)
+        ranges.append((offset, length))
+        offset += length
+    return ranges
+
+
+class ParallelEmitter:
+    """
+    Sends one file over several connections at once: the file is cut into byte ranges and each range gets its
+    own DataEmitter, socket and Framer, running on its own thread. All of them announce the same transfer id,
+    the collector writes every range into its place in the one output file.
+    """
+    def __init__(self, config_loc: str, target_ip: str = "127.0.0.1", target_socket: int = 5555,
+                 streams: int = None, message: str = None, net_params: ConnectionConfig = None):
+        net_params = net_params if net_params is not None else ConnectionConfig(config_loc)
+        streams = streams or net_params.get_parallel_streams()
+        msg_source = message if message is not None else net_params.get_message()
+        if msg_source is None:
+            raise ConfigError("message: nothing to send, give one or set it in the config")
+        _require_file(msg_source)
+        self.transfer_id = uuid.uuid4().hex
+        self.ranges = split_ranges(os.path.getsize(msg_source), streams)
+        self.emitters = [DataEmitter(config_loc, target_ip, target_socket, byte_range, self.transfer_id,
+                                     message=msg_source, net_params=net_params)
+                         for byte_range in self.ranges]
+        for emitter in self.emitters:
+            emitter.report_metrics = False
+        self.net_params = net_params
+        self.errors = []
+
+    def _run_stream(self, emitter: DataEmitter):
+        try:
+            emitter.initiate_link()
+            emitter.execute_transfer()
+            emitter.terminate_link()
+        except (OSError, ConnectionError) as e:
+            self.errors.append(e)
+
+    def registries(self) -> list:
+        """Metrics of the streams whose Framer is running or done."""
+        return [emitter.transfer_agent.metrics for emitter in self.emitters if emitter.transfer_agent is not None]
+
+    def run(self):
+        log.info("[Emitter] Sending transfer %s over %d streams", self.transfer_id, len(self.emitters))
+        workers = [threading.Thread(target=self._run_stream, args=(emitter,), name=f"stream-{index}")
+                   for index, emitter in enumerate(self.emitters)]
+        # one dump for every stream, each framer labelled with its range
+        reporter = reporter_from_config(self.net_params, self.registries)
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if reporter is not None:
+            reporter.stop()
+        if self.errors:
+            raise self.errors[0]
+        log.info("[Emitter] All %d streams done.", len(self.emitters))
+
+
+def send_file(message: str, target_ip: str = "127.0.0.1", target_socket: int = 5555,
+              config_loc: str = "config.txt", net_params: ConnectionConfig = None):
+    """
+    Sends one file (or a batch, see Utils/batch.py) without any prompt, the non-interactive entry point for
+    other programs. Connection settings come from net_params, or config_loc when none is given.
+    Returns the finished DataEmitter (integrity_ok, transfer_agent.metrics), or the ParallelEmitter.
+    """
+    net_params = net_params if net_params is not None else ConnectionConfig(config_loc)
+    # a batch always goes over one connection
+    if net_params.get_parallel_streams() > 1 and not is_batch(message):
+        node = ParallelEmitter(config_loc, target_ip, target_socket, message=message, net_params=net_params)
+        node.run()
+        return node
+    node = DataEmitter(config_loc, target_ip, target_socket, message=message, net_params=net_params)
+    node.initiate_link()
+    node.execute_transfer()
+    node.terminate_link()
+    return node
+
+
+class EmitterPool:
+    """
+    Links kept open per destination (ip, port) for a process that sends many messages: every send borrows an
+    idle link, runs a keep_alive transfer on it and hands it back, so only the first message to a destination
+    pays for the TCP connect. At most max_links per destination are open, further senders wait for one.
+    Links that broke, sat idle longer than idle_timeout or whose receiver refused keep_alive are closed and
+    replaced by fresh ones; maintain() does that for idle links and tops every known destination up to
+    warm_links connected links. The settings are parsed once, from config_loc or net_params.
+    """
+    def __init__(self, config_loc: str = "config.txt", max_links: int = 4, idle_timeout: float = 30.0,
+                 warm_links: int = 0, net_params: ConnectionConfig = None):
+        self.net_params = net_params if net_params is not None else ConnectionConfig(config_loc)
+        self.max_links = max(1, max_links)
+        self.idle_timeout = idle_timeout
+        self.warm_links = min(warm_links, self.max_links)
+        self._idle = {}
+        self._busy = {}
+        self._cond = threading.Condition()
+        self.connects = 0
+        self.reuses = 0
+
+    def _open_count(self, destination: tuple) -> int:
+        return len(self._idle.get(destination, ())) + self._busy.get(destination, 0)
+
+    def _acquire(self, destination: tuple) -> Link:
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(destination, [])
+                while idle:
+                    link = idle.pop()
+                    if link.usable(self.idle_timeout):
+                        self._busy[destination] = self._busy.get(destination, 0) + 1
+                        self.reuses += 1
+                        return link
+                    link.close()
+                if self._open_count(destination) < self.max_links:
+                    self._busy[destination] = self._busy.get(destination, 0) + 1
+                    break
+                self._cond.wait()
+        # connecting happens outside the lock, other destinations don't wait for it
+        try:
+            return self._connect(destination)
+        except OSError:
+            self._release(destination, None)
+            raise
+
+    def _connect(self, destination: tuple) -> Link:
+        link = Link(*destination, self.net_params.get_recv_size())
+        link.connect()
+        with self._cond:
+            self.connects += 1
+        return link
+
+    def _release(self, destination: tuple, link, reusable: bool = False):
+        with self._cond:
+            self._busy[destination] -= 1
+            if link is not None:
+                if reusable:
+                    self._idle.setdefault(destination, []).append(link)
+                else:
+                    link.close()
+            self._cond.notify()
+
+    def send(self, message: str, target_ip: str = "127.0.0.1", target_socket: int = 5555) -> DataEmitter:
+        """Sends one file (or batch) over a pooled link, returns the finished DataEmitter."""
+        destination = (target_ip, target_socket)
+        while True:
+            link = self._acquire(destination)
+            reused = link.transfers > 0
+            try:
+                emitter = DataEmitter(None, target_ip, target_socket, message=message, net_params=self.net_params,
+                                      link=link, keep_alive=True)
+            except BaseException:
+                # nothing went over the link yet (a missing source, an empty batch), it stays in the pool
+                self._release(destination, link, True)
+                raise
+            try:
+                emitter.initiate_link()
+                emitter.execute_transfer()
+                emitter.terminate_link()
+            except (OSError, ConnectionError) as e:
+                self._release(destination, link)
+                if not reused:
+                    raise
+                # the receiver may have dropped a link that sat idle, once more on a fresh one
+                log.info("[Pool] Link to %s:%d broke (%s), reconnecting", target_ip, target_socket, e)
+                continue
+            except BaseException:
+                self._release(destination, link)
+                raise
+            self._release(destination, link, link.keep_alive)
+            return emitter
+
+    def warm(self, target_ip: str, target_socket: int, count: int = 1):
+        """Connects links to a destination ahead of the first send, up to count idle ones (within max_links)."""
+        destination = (target_ip, target_socket)
+        while True:
+            with self._cond:
+                idle = self._idle.setdefault(destination, [])
+                if len(idle) >= count or self._open_count(destination) >= self.max_links:
+                    return
+                self._busy[destination] = self._busy.get(destination, 0) + 1
+            try:
+                link = self._connect(destination)
+            except OSError as e:
+                self._release(destination, None)
+                log.warning("[Pool] Can't connect to %s:%d: %s", target_ip, target_socket, e)
+                return
+            self._release(destination, link, True)
+
+    def maintain(self):
+        """Closes idle links that went stale or broke, then tops every destination up to warm_links."""
+        with self._cond:
+            for destination, idle in self._idle.items():
+                alive = [link for link in idle if link.usable(self.idle_timeout)]
+                for link in idle:
+                    if link not in alive:
+                        link.close()
+                idle[:] = alive
+            destinations = list(self._idle)
+        if self.warm_links:
+            for destination in destinations:
+                self.warm(*destination, self.warm_links)
+
+    def close(self):
+        with self._cond:
+            for idle in self._idle.values():
+                for link in idle:
+                    link.close()
+            self._idle.clear()
+
+
+def _prompt_config() -> ConnectionConfig:
+    """The interactive mode: settings from config.txt, or typed in and kept in memory."""
     print("\n" + "=" * 50)
     print("Choose mode:")
     print(" 1. config from file (default)")
@@ -127,21 +567,46 @@ if __name__ == "__main__":
     print("=" * 50)
     choice = input("Enter choice (file/manual): ").strip()
 
+    net_params = None
     if choice == "manual":
         try:
-            m_size = int(input("Msg Size: "))
-            w_size = int(input("Window Size: "))
-            tout = int(input("Timeout: "))
-            is_dyn = input("Dynamic (True/False): ")
-            manual_config = FileConfiger("message.txt", m_size, w_size, tout, is_dyn)
-            path = manual_config.get_new_config()
-        except ValueError:
-            print("Invalid input, using default.")
-            path = "config.txt"
-    else:
-        path = "config.txt"
+            # built in memory, nothing is written to disk
+            net_params = ConnectionConfig(overrides={
+                "message": "message.txt",
+                "maximum_msg_size": input("Msg Size: "),
+                "window_size": input("Window Size: "),
+                "timeout": input("Timeout: "),
+                "dynamic_message_size": input("Dynamic (True/False): "),
+            })
+        except ConfigError as e:
+            print(f"Invalid input ({e}), using default.")
+    if net_params is None:
+        net_params = ConnectionConfig("config.txt")
+    return net_params
 
-    node = DataEmitter(path)
-    node.initiate_link()
-    node.execute_transfer()
-    node.terminate_link()
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-config", type=str, default=None, help="config file, skips the interactive prompt")
+    parser.add_argument("-message", type=str, default=None,
+                        help="file, directory or comma separated list to send instead of the config's message")
+    parser.add_argument("-set", action="append", default=[], metavar="KEY=VALUE",
+                        help="overrides one config setting (repeatable), as do RJTP_<KEY> environment variables")
+    parser.add_argument("-host", type=str, default="127.0.0.1")
+    parser.add_argument("-port", type=int, default=5555)
+    args = parser.parse_args()
+    if args.config is not None or args.message is not None or args.set:
+        try:
+            overrides = parse_overrides(args.set)
+            if args.message is not None:
+                overrides["message"] = args.message
+            net_params = ConnectionConfig(args.config or "config.txt", overrides)
+        except (ConfigError, OSError) as e:
+            parser.error(str(e))
+    else:
+        net_params = _prompt_config()
+    try:
+        send_file(net_params.get_message(), args.host, args.port, net_params=net_params)
+    except (OSError, ValueError) as e:
+        log.error("Critical: %s", e)
+        sys.exit(1)
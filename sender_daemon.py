@@ -0,0 +1,159 @@
+"""
+Long-lived local sender. Keeps an EmitterPool (see client.py) of open links per destination and takes send
+jobs from other processes over a Unix socket, or from this process through submit(). Applications hand over
+a path and a destination instead of starting client.py (interpreter, imports, config, connect) per message.
+
+Protocol on the Unix socket: one JSON object per line each way,
+    {"message": "path/to/file", "host": "127.0.0.1", "port": 5555}
+    {"ok": true, "message": ..., "bytes": 1234, "elapsed_ms": 3.2, "integrity_ok": null, "reused": true}
+    {"ok": false, "message": ..., "error": "..."}
+A client may send any number of jobs on one connection, the replies come back in the same order.
+
+    python sender_daemon.py -socket /tmp/sender.sock -config config.txt
+    python sender_daemon.py -socket /tmp/sender.sock -send message.txt -host 127.0.0.1 -port 5555
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from client import EmitterPool
+from Utils.configuration import ConnectionConfig, ConfigError, parse_overrides
+from Utils.log import get_logger, set_level
+
+log = get_logger("daemon")
+
+
+class SenderDaemon:
+    def __init__(self, socket_path: str, config_loc: str = "config.txt", max_links: int = 4,
+                 idle_timeout: float = 30.0, warm_links: int = 1, workers: int = 8,
+                 maintain_interval: float = 5.0, net_params: ConnectionConfig = None):
+        self.socket_path = socket_path
+        self.pool = EmitterPool(config_loc, max_links, idle_timeout, warm_links, net_params)
+        # the in-process job queue, a unix socket client's jobs go through it too
+        self.jobs = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="send")
+        self.maintain_interval = maintain_interval
+        self.listener = None
+        self._stop = threading.Event()
+
+    def submit(self, message: str, target_ip: str = "127.0.0.1", target_socket: int = 5555):
+        """Queues one send, returns a Future with the reply dict."""
+        return self.jobs.submit(self._run_job, message, target_ip, target_socket)
+
+    def _run_job(self, message: str, target_ip: str, target_socket: int) -> dict:
+        reply = {"message": message}
+        start = time.perf_counter()
+        try:
+            emitter = self.pool.send(message, target_ip, target_socket)
+        except (OSError, ValueError) as e:
+            # a missing source, an empty batch, a refused or broken link: this job fails, the daemon goes on
+            return {**reply, "ok": False, "error": str(e) or type(e).__name__}
+        except Exception as e:
+            log.exception("[Daemon] Job %s failed", message)
+            return {**reply, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {**reply, "ok": True, "bytes": emitter.transfer_agent.total_bytes,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+                "integrity_ok": emitter.integrity_ok, "reused": emitter.link.transfers > 1}
+
+    def start(self):
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("this platform has no unix sockets, use submit() from the same process")
+        if os.path.exists(self.socket_path):
+            # left over from a daemon that didn't shut down cleanly
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(64)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._maintain_loop, daemon=True).start()
+        log.info("[Daemon] Listening on %s", self.socket_path)
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn):
+        with conn, conn.makefile("rwb") as stream:
+            for line in stream:
+                job = None
+                try:
+                    job = json.loads(line)
+                    future = self.submit(str(job["message"]), job.get("host", "127.0.0.1"),
+                                         int(job.get("port", 5555)))
+                    reply = future.result()
+                except (ValueError, KeyError, TypeError) as e:
+                    message = job.get("message") if isinstance(job, dict) else None
+                    reply = {"ok": False, "message": message, "error": f"bad request: {e}"}
+                try:
+                    stream.write((json.dumps(reply) + "\n").encode("utf-8"))
+                    stream.flush()
+                except OSError:
+                    return
+
+    def _maintain_loop(self):
+        while not self._stop.wait(self.maintain_interval):
+            self.pool.maintain()
+
+    def stop(self):
+        self._stop.set()
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        self.jobs.shutdown(wait=True)
+        self.pool.close()
+
+
+def daemon_send(socket_path: str, message: str, target_ip: str = "127.0.0.1", target_socket: int = 5555) -> dict:
+    """One job for a running SenderDaemon, blocks until the reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall((json.dumps({"message": message, "host": target_ip, "port": target_socket}) + "\n").encode())
+        with conn.makefile("rb") as stream:
+            return json.loads(stream.readline())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-socket", type=str, default="/tmp/sender_daemon.sock")
+    parser.add_argument("-config", type=str, default="config.txt")
+    parser.add_argument("-max_links", type=int, default=4, help="open links per destination at most")
+    parser.add_argument("-idle_timeout", type=float, default=30.0, help="seconds before an idle link is replaced")
+    parser.add_argument("-warm_links", type=int, default=1, help="links kept connected per known destination")
+    parser.add_argument("-set", action="append", default=[], metavar="KEY=VALUE",
+                        help="overrides one config setting (repeatable), as do RJTP_<KEY> environment variables")
+    parser.add_argument("-log_level", type=str, default="info")
+    parser.add_argument("-send", type=str, default=None, help="send this file through a running daemon and exit")
+    parser.add_argument("-host", type=str, default="127.0.0.1")
+    parser.add_argument("-port", type=int, default=5555)
+    args = parser.parse_args()
+    if args.send is not None:
+        print(json.dumps(daemon_send(args.socket, os.path.abspath(args.send), args.host, args.port)))
+    else:
+        try:
+            net_params = ConnectionConfig(args.config, parse_overrides(args.set))
+        except (ConfigError, OSError) as e:
+            parser.error(str(e))
+        set_level(args.log_level)
+        SenderDaemon(args.socket, args.config, args.max_links, args.idle_timeout, args.warm_links,
+                     net_params=net_params).serve_forever()
@@ -1,141 +1,764 @@
+import os
+import time
+import zlib
+import hashlib
 import socket
-import json
+import selectors
 import argparse
-import random
+from enum import Enum
 
-from Utils.configuration import ConnectionConfig
+from Utils.configuration import ConnectionConfig, ConfigError, parse_overrides
+from Utils.output_sink import open_sink, output_path, FileSink, TransferRegistry
+from Utils.checkpoint import Checkpoint
+from Utils.batch import BatchSink
+from Utils.sink_writer import SinkWriter, DEFAULT_WRITE_QUEUE
+from Utils.receive_budget import ReceiveBudget
+from Utils.reorder_buffer import ReorderBuffer, DEFAULT_REORDER_LIMIT
+from Utils.log import get_logger, set_level
+from Utils.metrics import MetricsRegistry, reporter_from_config
 from Network_Packets.packet import HandshakePacket, DataPacket, AckPacket, FinPacket, PacketType
+from Network_Packets.wire_format import WireFormat, negotiate_format, MAX_SACK_BLOCKS
+from Network_Packets.frame_decoder import FrameDecoder, DEFAULT_RECV_SIZE
+from Network_Packets.compression import negotiate_compression, make_codec
+from Network_Packets.segment_sizing import make_sizer
 
 
-class DataCollector:
-    def __init__(self, bind_ip: str, bind_port: int, config_loc: str = "config.txt"):
-        self.srv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.srv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.srv_sock.bind((bind_ip, bind_port))
-        self.packet_store = {}
+log = get_logger("collector")
+
+# seconds between looks at the config file's modification time
+CONFIG_CHECK_INTERVAL = 1.0
+
+
+class SessionState(Enum):
+    HANDSHAKE = "handshake"
+    ESTABLISHED = "established"
+    CLOSING = "closing"
+    CLOSED = "closed"
+
+
+def collector_metrics(sessions: dict = None, budget: ReceiveBudget = None) -> MetricsRegistry:
+    """Totals over every session of a collector, the gauges look at the sessions that are open right now."""
+    metrics = MetricsRegistry("collector")
+    metrics.counter("sessions_total", "Connections accepted")
+    metrics.counter("segments_received_total", "Data segments received, duplicates included")
+    metrics.counter("bytes_delivered_total", "Bytes written to the outputs in order")
+    metrics.counter("duplicate_segments_total", "Segments whose bytes had all been received already")
+    metrics.counter("out_of_order_segments_total", "Segments that arrived ahead of a missing one")
+    metrics.counter("checksum_failures_total", "Segments dropped for a CRC32 mismatch")
+    metrics.counter("reorder_refused_total", "Early segments refused because the reorder buffer was full")
+    metrics.counter("acks_sent_total", "ACKs sent")
+    metrics.counter("resize_requests_total", "Segment size changes asked of senders")
+    metrics.counter("batch_files_total", "Files of batch transfers written out complete")
+    metrics.counter("keep_alive_transfers_total", "Transfers started on a link that already carried one")
+    metrics.counter("window_updates_total", "ACKs sent only to reopen a window that had closed")
+    metrics.counter("window_probes_total", "Zero window probes received")
+    metrics.counter("paused_reads_total", "Times a link wasn't read until its write queue drained (sender ignored the window)")
+    metrics.counter("config_reloads_total", "Times a changed config file was read again and applied")
+    if sessions is not None:
+        metrics.gauge("active_sessions", "Connections open right now", lambda: len(sessions))
+        metrics.gauge("reorder_buffered_bytes", "Early data held across all sessions",
+                      lambda: sum(s.reorder.buffered_bytes for s in list(sessions.values())))
+        metrics.gauge("write_queue_bytes", "In-order data waiting for the output writers across all sessions",
+                      lambda: sum(s.sink.queued_bytes for s in list(sessions.values()) if s.sink is not None))
+    if budget is not None:
+        metrics.gauge("receive_share_bytes", "Most a transfer may have buffered on this collector right now",
+                      budget.share)
+    return metrics
+
+
+class CollectorSession:
+    """
+    Everything that belongs to a single client link: reassembly state, the negotiated config and the wire format.
+    The DataCollector owns one of these per accepted connection and feeds it whatever the socket delivers.
+    In-order data is queued for the output sink's writer thread right away (see Utils/sink_writer.py), the
+    reorder buffer only holds data that arrived early. Each ACK advertises what's left of the smallest of
+    the write queue, the reorder buffer and this transfer's share of the collector's ReceiveBudget.
+    wake() is called from the writer thread once a sender that was held back can go on, the owner then
+    resumes reading (see over_limit()) and calls send_window_update() from its own loop.
+    """
+    def __init__(self, conn, origin, server_cfg: ConnectionConfig, output_dir: str = None,
+                 transfers: TransferRegistry = None, metrics: MetricsRegistry = None, wake=None,
+                 budget: ReceiveBudget = None):
+        self.conn = conn
+        self.origin = origin
+        self.server_cfg = server_cfg
+        self.output_dir = output_dir
+        # shared with every other session, parallel streams of one transfer meet there
+        self.transfers = transfers if transfers is not None else TransferRegistry(output_dir)
+        # a SinkWriter around the output sink of the current transfer
+        self.sink = None
+        self.write_queue_size = server_cfg.get_write_queue_size() if server_cfg else DEFAULT_WRITE_QUEUE
+        # memory shared with every other session of the collector
+        self.budget = budget if budget is not None else ReceiveBudget()
+        self.wake = wake
+        self.window_update_due = False
+        # a FIN that came with writes still queued, answered from the select loop once they're out (see answer_fin)
+        self.fin_pending = None
+        # the window of the last ACK (None without flow control), and whether the owner stopped reading the link
+        self.advertised_window = None
+        self.reading_paused = False
+        # resumable transfers only: progress persisted next to the output file
+        self.checkpoint = None
+        # early data, by byte offset; next_needed is the sequence the cumulative ACK waits for
+        self.reorder = ReorderBuffer(server_cfg.get_reorder_buffer_size() if server_cfg else DEFAULT_REORDER_LIMIT)
         self.next_needed = 0
-        self.incoming_buff = ""
-        self.config_loc = config_loc
+        self.decoder = FrameDecoder(server_cfg.get_recv_size() if server_cfg else DEFAULT_RECV_SIZE)
         self.negotiated = None
-        self.server_cfg = ConnectionConfig(config_loc)
+        self.wire_format = WireFormat.JSON
+        self.codec = None
+        # rolling sha256 of everything handed to the sink, only with negotiated integrity checks
+        self.rx_digest = None
+        # picks the segment sizes to ask for, only when dynamic_message_size was negotiated
+        self.sizer = None
+        # shared with the collector's other sessions, a session on its own counts into a registry of its own
+        self.metrics = metrics if metrics is not None else collector_metrics()
+        self.state = SessionState.HANDSHAKE
+        # delayed ACKs: in-order segments not ACKed yet, and when the ACK for them is due (monotonic seconds)
+        self.unacked_segments = 0
+        self.ack_deadline = None
+        # one ACK object per session, refilled for every ACK sent
+        self._ack = AckPacket(PacketType.ACK, -1)
+        self._handlers = {
+            PacketType.SYN: self._on_syn,
+            PacketType.ACK: self._on_ack,
+            PacketType.PUSH: self._on_push,
+            PacketType.FIN: self._on_fin,
+        }
 
-    @staticmethod
-    def _transmit(conn_handle, pkt_obj):
-        conn_handle.sendall(pkt_obj.to_bytes())
+    def _transmit(self, pkt_obj):
+        self.conn.sendall(pkt_obj.encode(self.wire_format))
 
-    def start_service(self):
-        self.srv_sock.listen(1)
-        print(f"[Collector] Listening on port {self.srv_sock.getsockname()[1]}...")
-        while True:
-            client_conn, origin = self.srv_sock.accept()
-            print(f"[Collector] Accepted link from {origin}")
-            self._manage_session(client_conn)
+    def receive(self) -> bool:
+        """Reads whatever the socket has and processes it. Returns False once the session is over."""
+        if not self.decoder.recv_from(self.conn):
+            return False
+        return self._process_packets()
 
-    def _manage_session(self, active_conn):
-        session_active = True
-        self.packet_store.clear()
-        self.next_needed = 0
-        self.incoming_buff = ""
-        while session_active:
-            try:
-                raw_input = active_conn.recv(1024).decode('utf-8')
-                if not raw_input: break
-                self.incoming_buff += raw_input
-                while "\n" in self.incoming_buff:
-                    json_str, self.incoming_buff = self.incoming_buff.split("\n", 1)
-                    if not json_str.strip(): continue
-                    try:
-                        p_data = json.loads(json_str)
-                        session_active = self._route_logic(p_data, active_conn)
-                    except json.JSONDecodeError:
-                        pass
-            except socket.error:
+    def feed(self, raw_input: bytes) -> bool:
+        """Same as receive() for bytes that were read elsewhere."""
+        self.decoder.feed(raw_input)
+        return self._process_packets()
+
+    def _process_packets(self) -> bool:
+        for pkt in self.decoder.packets():
+            if not self._route_logic(pkt):
+                self.state = SessionState.CLOSED
+                return False
+        # every in-order segment of this read shares one ACK
+        if self.unacked_segments >= self.negotiated_ack_interval():
+            self._send_ack()
+        elif self.unacked_segments and self.ack_deadline is None:
+            self.ack_deadline = time.monotonic() + self.negotiated["ack_delay"] / 1000
+        return True
+
+    def negotiated_ack_interval(self) -> int:
+        return self.negotiated["ack_interval"] if self.negotiated else 1
+
+    def flush_due_ack(self, now: float):
+        """Sends the pending delayed ACK once its deadline has passed."""
+        if self.ack_deadline is not None and now >= self.ack_deadline:
+            self._send_ack()
+
+    def close(self):
+        self.conn.close()
+        log.info("[Collector] Session %s Closed.", self.origin)
+        if self.checkpoint is not None:
+            # the link went away before FIN, remember everything that made it to disk
+            self._save_checkpoint()
+        self._close_sink()
+
+    def _sack_blocks(self) -> list:
+        """Runs of consecutive early segments as [start, end] pairs, lowest first, at most MAX_SACK_BLOCKS."""
+        blocks = []
+        for seq in self.reorder.held_sequences():
+            if blocks and seq == blocks[-1][1] + 1:
+                blocks[-1][1] = seq
+            elif len(blocks) == MAX_SACK_BLOCKS:
                 break
-        active_conn.close()
-        print("[Collector] Session Closed.")
-        full_text = "".join([self.packet_store[k] for k in sorted(self.packet_store)])
-        print(f"\n[OUTPUT] Reconstructed Data: {full_text}\n")
-
-    def _route_logic(self, p_map: dict, conn) -> bool:
-        p_type = p_map.get("flag")
-
-        if p_type == PacketType.SYN.value:
-            print("[Collector] SYN received.")
-            client_syn = HandshakePacket.json_to_packet(p_map)
-
-            if self.server_cfg:
-                s_win = int(self.server_cfg.get_window_size())
-                s_msg = int(self.server_cfg.get_message_size())
-                s_timeout = int(self.server_cfg.get_timeout())
-                s_dyn = bool(self.server_cfg.get_is_dynamic())
             else:
-                s_win, s_msg, s_timeout, s_dyn = client_syn.window, client_syn.maximum_message_size, client_syn.timeout, client_syn.dynamic
-
-            self.negotiated = {
-                "window_size": min(client_syn.window, s_win),
-                "maximum_msg_size": min(client_syn.maximum_message_size, s_msg),
-                "timeout": min(client_syn.timeout, s_timeout),
-                "dynamic_size": client_syn.dynamic and s_dyn,
-            }
-            print(f"[Collector] Negotiated Config: {self.negotiated}")
-            reply = HandshakePacket(PacketType.SYNACK, s_win, s_msg, s_timeout, s_dyn)
-            self._transmit(conn, reply)
-            return True
+                blocks.append([seq, seq])
+        return blocks
 
-        elif p_type == PacketType.ACK.value and not self.packet_store:
-            print("[Collector] Handshake ACK received.")
-            return True
+    def _open_resumable(self, client_syn: HandshakePacket, fallback_name: str) -> int:
+        """
+        FileSink for a resumable transfer. Picks up after the committed offset of a matching checkpoint
+        (same name, same content hash, output file still there); returns that offset, 0 for a fresh start.
+        """
+        path = output_path(self.output_dir, client_syn.file_name, fallback_name)
+        name = os.path.basename(path)
+        previous = Checkpoint.load(Checkpoint.path_for(path))
+        resume_offset = 0
+        if (previous is not None and previous.file_name == name and previous.content_hash == client_syn.content_hash
+                and os.path.isfile(path) and os.path.getsize(path) >= previous.committed_offset):
+            resume_offset = previous.committed_offset
+        self.checkpoint = Checkpoint(Checkpoint.path_for(path), name, str(client_syn.content_hash), resume_offset)
+        self.checkpoint.save()
+        self.sink = self._start_writer(FileSink(path, resume_offset))
+        return resume_offset
 
-        elif p_type == PacketType.PUSH.value:
-            data_pkt = DataPacket.json_to_packet(p_map)
-            seq = data_pkt.sequence
-            print(f"[Collector] Got PUSH {seq}")
-
-            if seq == self.next_needed:
-                self.packet_store[seq] = data_pkt.payload
-                self.next_needed += 1
-                while self.next_needed in self.packet_store:
-                    self.next_needed += 1
-            elif seq > self.next_needed:
-                self.packet_store[seq] = data_pkt.payload
-
-            ack_val = max(0, self.next_needed - 1)
-
-            # --- DYNAMIC MESSAGE SIZE LOGIC ---
-            update_msg_size = None
-            if self.negotiated and self.negotiated["dynamic_size"]:
-                # Trigger change periodically (e.g. every 3rd packet)
-                if seq % 3 == 0:
-                    # Random message size between 5 and 20
-                    update_msg_size = random.randint(5, 20)
-                    print(f"[Collector] Dynamic Config: Requesting new Msg Size -> {update_msg_size}")
-
-            ack_reply = AckPacket(PacketType.ACK, ack_val, new_block_size=update_msg_size)
-            self._transmit(conn, ack_reply)
-            return True
+    def _start_writer(self, sink) -> SinkWriter:
+        self.budget.join()
+        return SinkWriter(sink, self.write_queue_size, self._after_write)
+
+    def _close_sink(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+            self.budget.leave()
+
+    def _after_write(self):
+        """Writer thread, after every write: checkpoints, and a wake-up once a held back sender can go on."""
+        checkpoint = self.checkpoint
+        if checkpoint is not None and checkpoint.advance(self.sink.position()):
+            # a checkpoint only ever points at data the output file already has
+            self.sink.sink.flush()
+            checkpoint.save()
+        if self.fin_pending is not None:
+            # the last write before the FIN is done, the select loop can send the FIN/ACK now
+            if self.wake is not None and self.sink.queued_bytes == 0:
+                self.wake()
+            return
+        if self.window_update_due or self.wake is None:
+            return
+        if self.reading_paused:
+            held_back = self.caught_up()
+        else:
+            # a window too small for a full segment reopens once half of what it can be is free
+            held_back = (self.advertised_window is not None
+                         and self.advertised_window < self.negotiated["maximum_msg_size"]
+                         and self._receive_window() >= self._window_ceiling() // 2)
+        if held_back:
+            self.window_update_due = True
+            self.wake()
+
+    def _queue_limit(self) -> int:
+        return min(self.write_queue_size, self.budget.share())
+
+    def over_limit(self) -> bool:
+        """More queued than a window ever offers: the sender doesn't do flow control, stop reading it for now."""
+        return self.sink is not None and self.sink.queued_bytes > self._queue_limit()
+
+    def caught_up(self) -> bool:
+        """The write queue is down to half, a link that isn't being read can be read again."""
+        return self.sink is None or self.sink.queued_bytes <= self._queue_limit() // 2
+
+    def send_window_update(self):
+        """Tells a sender that was held back there is room again."""
+        if (self.window_update_due and self.state == SessionState.ESTABLISHED and self.negotiated
+                and self.negotiated["flow_control"]):
+            self._send_ack()
+            self.metrics["window_updates_total"].inc()
+        self.window_update_due = False
+
+    def _window_ceiling(self) -> int:
+        return min(self.write_queue_size, self.reorder.limit, self.budget.share())
+
+    def _receive_window(self) -> int:
+        """
+        Bytes past the cumulative ACK this session can take: the early data in the reorder buffer lies in
+        that range already, and all of it ends up in the write queue once the hole in front of it closes.
+        """
+        if self.sink is None:
+            return 0
+        queued = self.sink.queued_bytes
+        window = min(self.sink.free(), self.reorder.limit, self.budget.share() - queued)
+        # a 4 byte field in binary ACKs
+        return max(0, min(window, 0xFFFFFFFF))
+
+    def _deliver(self, data: bytes):
+        self.sink.write(data)
+        self.metrics["bytes_delivered_total"].inc(len(data))
+        if self.rx_digest is not None:
+            # hashed on its way to the sink, no second pass over the output
+            self.rx_digest.update(data)
 
-        elif p_type == PacketType.FIN.value:
-            print("[Collector] FIN received.")
-            self._transmit(conn, FinPacket(PacketType.FINACK))
-            buff = ""
-            while True:
+    def _start_next_transfer(self):
+        """keep_alive links: the last transfer ended with FIN / FIN/ACK, a new SYN starts over on the same link."""
+        log.info("[Collector] Next transfer on the link from %s", self.origin)
+        self.metrics["keep_alive_transfers_total"].inc()
+        self.reorder = ReorderBuffer(self.reorder.limit)
+        self.next_needed = 0
+        self.negotiated = None
+        self.wire_format = WireFormat.JSON
+        self.codec = None
+        self.rx_digest = None
+        self.sizer = None
+        self.unacked_segments = 0
+        self.ack_deadline = None
+        self.window_update_due = False
+        self.advertised_window = None
+        self.state = SessionState.HANDSHAKE
+
+    def _on_batch_file(self, name: str, size: int):
+        log.info("[Collector] Batch file %s complete (%d bytes)", name, size)
+        self.metrics["batch_files_total"].inc()
+
+    def _save_checkpoint(self):
+        self.sink.flush()
+        self.checkpoint.advance(self.sink.position())
+        self.checkpoint.save()
+
+    def _send_ack(self, new_block_size: int = None):
+        """ACKs everything received so far, which also covers any delayed ACK that was still pending."""
+        # -1 until segment 0 arrives, so a lost first segment is never reported as received
+        ack = self._ack
+        ack.ack = self.next_needed - 1
+        ack.new_block_size = new_block_size
+        ack.sack_blocks = self._sack_blocks() if self.negotiated["sack"] else None
+        ack.window = self._receive_window() if self.negotiated["flow_control"] else None
+        self.advertised_window = ack.window
+        self._transmit(ack)
+        self.metrics["acks_sent_total"].inc()
+        self.unacked_segments = 0
+        self.ack_deadline = None
+
+    def _route_logic(self, pkt) -> bool:
+        """Hands a decoded packet to the handler for its flag. False ends the session."""
+        handler = self._handlers.get(pkt.flag)
+        return handler(pkt) if handler is not None else True
+
+    def _on_syn(self, client_syn: HandshakePacket) -> bool:
+        log.info("[Collector] SYN received.")
+        if self.state == SessionState.CLOSING and self.negotiated and self.negotiated["keep_alive"]:
+            self._start_next_transfer()
+
+        if self.server_cfg:
+            s_win = int(self.server_cfg.get_window_size())
+            s_msg = int(self.server_cfg.get_message_size())
+            s_timeout = int(self.server_cfg.get_timeout())
+            s_dyn = self.server_cfg.get_is_dynamic()
+            s_format = self.server_cfg.get_wire_format()
+            s_sack = self.server_cfg.get_sack()
+            s_ack_interval = self.server_cfg.get_ack_interval()
+            s_ack_delay = self.server_cfg.get_ack_delay()
+            s_compression = self.server_cfg.get_compression()
+            s_integrity = self.server_cfg.get_integrity()
+            s_flow_control = self.server_cfg.get_flow_control()
+        else:
+            s_win, s_msg, s_timeout, s_dyn = client_syn.window, client_syn.maximum_message_size, client_syn.timeout, client_syn.dynamic
+            s_format, s_sack = client_syn.wire_format, client_syn.sack
+            s_ack_interval, s_ack_delay = client_syn.ack_interval, client_syn.ack_delay
+            s_compression = client_syn.compression
+            s_integrity = client_syn.integrity
+            s_flow_control = client_syn.flow_control
+
+        self.negotiated = {
+            "window_size": min(client_syn.window, s_win),
+            "maximum_msg_size": min(client_syn.maximum_message_size, s_msg),
+            "timeout": min(client_syn.timeout, s_timeout),
+            "dynamic_size": client_syn.dynamic and s_dyn,
+            "wire_format": negotiate_format(client_syn.wire_format, s_format).value,
+            "sack": client_syn.sack and s_sack,
+            "ack_interval": min(client_syn.ack_interval, s_ack_interval),
+            "ack_delay": min(client_syn.ack_delay, s_ack_delay),
+            "compression": negotiate_compression(client_syn.compression, s_compression),
+            "integrity": client_syn.integrity and s_integrity,
+            "keep_alive": client_syn.keep_alive,
+            "flow_control": client_syn.flow_control and s_flow_control,
+        }
+        self.codec = make_codec(self.negotiated["compression"])
+        self.rx_digest = hashlib.sha256() if self.negotiated["integrity"] else None
+        if self.negotiated["dynamic_size"]:
+            sizing, min_size = ("adaptive", 512) if not self.server_cfg else \
+                (self.server_cfg.get_dynamic_sizing(), self.server_cfg.get_min_msg_size())
+            self.sizer = make_sizer(sizing, self.negotiated["maximum_msg_size"], min_size)
+        log.info("[Collector] Negotiated Config: %s", self.negotiated)
+        resume_offset = 0
+        if self.sink is None:
+            fallback_name = f"transfer_{self.origin[1]}.bin"
+            if client_syn.content_hash is not None and client_syn.transfer_id is None and self.output_dir:
+                resume_offset = self._open_resumable(client_syn, fallback_name)
+                if resume_offset:
+                    log.info("[Collector] Resuming %s at byte %d", self.checkpoint.transfer_id, resume_offset)
+            elif client_syn.batch:
+                log.info("[Collector] Receiving a batch of %d files", client_syn.batch)
+                self.sink = self._start_writer(BatchSink(self.output_dir, self._on_batch_file))
+            elif client_syn.transfer_id is not None:
+                total, offset = client_syn.total_size, client_syn.range_offset
+                if total is None or total < 0 or not 0 <= offset <= total:
+                    log.warning("[Collector] Rejecting stream with range %s of %s bytes", offset, total)
+                    return False
                 try:
-                    d = conn.recv(1024).decode('utf-8')
-                    if not d: break
-                    buff += d
-                    if "ACK" in buff or str(PacketType.ACK.value) in buff: break
-                except:
-                    break
-            print("[Collector] Final ACK received.")
+                    ranged = self.transfers.open_range(str(client_syn.transfer_id), client_syn.file_name,
+                                                       fallback_name, total, offset)
+                except (ValueError, OSError) as e:
+                    log.warning("[Collector] Rejecting stream of transfer %s: %s", client_syn.transfer_id, e)
+                    return False
+                self.sink = self._start_writer(ranged)
+            else:
+                self.sink = self._start_writer(open_sink(self.output_dir, client_syn.file_name, fallback_name))
+        reply = HandshakePacket(PacketType.SYNACK, s_win, s_msg, s_timeout, s_dyn, s_format, sack=s_sack,
+                                ack_interval=s_ack_interval, ack_delay=s_ack_delay, resume_offset=resume_offset,
+                                compression=s_compression, integrity=s_integrity,
+                                batch=client_syn.batch if isinstance(self.sink.sink, BatchSink) else 0,
+                                keep_alive=self.negotiated["keep_alive"], flow_control=s_flow_control)
+        self._transmit(reply)
+        # the SYN/ACK itself is JSON, everything after it uses the agreed format
+        self.wire_format = WireFormat(self.negotiated["wire_format"])
+        return True
+
+    def _on_ack(self, ack_pkt) -> bool:
+        if self.state == SessionState.HANDSHAKE:
+            log.info("[Collector] Handshake ACK received.")
+            self.state = SessionState.ESTABLISHED
+            return True
+        if self.state == SessionState.CLOSING:
+            log.info("[Collector] Final ACK received.")
             return False
+        return True
+
+    def _on_push(self, data_pkt: DataPacket) -> bool:
+        if self.sink is None:
+            return True
+        if not data_pkt.payload:
+            # zero window probe: nothing to store, the ACK carries the current window
+            self.metrics["window_probes_total"].inc()
+            self._send_ack()
+            return True
+        seq = data_pkt.sequence
+        log.debug("[Collector] Got PUSH %d", seq)
+        self.metrics["segments_received_total"].inc()
+        if self.rx_digest is not None and (data_pkt.crc is None or zlib.crc32(data_pkt.payload) != data_pkt.crc):
+            # not ACKed, the sender's normal loss recovery sends it again
+            log.warning("[Collector] Checksum mismatch on PUSH %d, dropped", seq)
+            self.metrics["checksum_failures_total"].inc()
+            return True
+        if data_pkt.compressed:
+            try:
+                if self.codec is None:
+                    raise ValueError("no compression was negotiated")
+                # a segment never decompresses to more than the negotiated maximum message size
+                data_pkt.payload = self.codec.decompress(data_pkt.payload, self.negotiated["maximum_msg_size"])
+            except ValueError as e:
+                log.warning("[Collector] Dropping PUSH %d: %s", seq, e)
+                return True
+
+        payload = data_pkt.payload
+        # judged by bytes, not sequence numbers: in order when it reaches the first byte still missing
+        in_order = data_pkt.offset <= self.reorder.next_offset < data_pkt.offset + len(payload)
+        # a gap right in front of it, past everything held so far: a new loss event. Later ones behind the same
+        # hole and retransmissions filling one aren't
+        new_hole = data_pkt.offset > self.reorder.end_offset()
+        filled_gap = False
+        if in_order:
+            # flush this segment and whatever was waiting behind it
+            self._deliver(self.reorder.take_in_order(data_pkt.offset, payload))
+            self.next_needed = max(self.next_needed, seq + 1)
+            ready = self.reorder.pop_ready()
+            filled_gap = bool(ready)
+            for data, held_seq in ready:
+                self._deliver(data)
+                self.next_needed = max(self.next_needed, held_seq + 1)
+        elif data_pkt.offset > self.reorder.next_offset:
+            self.metrics["out_of_order_segments_total"].inc()
+            if not self.reorder.insert(data_pkt.offset, payload, seq):
+                # out of room: left out of the SACK blocks, so it gets sent again once the hole is filled
+                log.debug("[Collector] Reorder buffer full, PUSH %d refused", seq)
+                self.metrics["reorder_refused_total"].inc()
+        else:
+            self.metrics["duplicate_segments_total"].inc()
+
+        # --- DYNAMIC MESSAGE SIZE LOGIC ---
+        update_msg_size = None
+        if self.sizer is not None and (in_order or new_hole):
+            update_msg_size = self.sizer.on_segment(seq, len(payload), in_order)
+            if update_msg_size is not None:
+                log.debug("[Collector] Dynamic Config: Requesting new Msg Size -> %d", update_msg_size)
+                self.metrics["resize_requests_total"].inc()
+
+        if (not in_order or filled_gap or self.reorder or update_msg_size is not None
+                or self.negotiated_ack_interval() <= 1):
+            # out of order, duplicate or a retransmission that closed a hole: the sender's loss recovery
+            # depends on hearing about it right away. A resize request can't wait either
+            self._send_ack(update_msg_size)
+        else:
+            # in order: held back and sent once per read / ack_interval segments / ack_delay (see _process_packets)
+            self.unacked_segments += 1
+        return True
+
+    def _on_fin(self, fin_pkt: FinPacket) -> bool:
+        log.info("[Collector] FIN received.")
+        if self.unacked_segments:
+            self._send_ack()
+        # FIN/ACK tells the sender its data is in the output, so the writer has to catch up first. Waiting for it
+        # here would hold up every other link, its wake-up gets the answer sent instead (see _after_write)
+        self.fin_pending = fin_pkt
+        if self.wake is None or self.fin_ready():
+            self.answer_fin()
+        return True
+
+    def fin_ready(self) -> bool:
+        """A pending FIN can be answered: nothing of the transfer is left in the write queue, or the writer failed."""
+        return self.fin_pending is not None and (self.sink is None or self.sink.queued_bytes == 0
+                                                 or self.sink.error is not None)
+
+    def answer_fin(self):
+        """Sends the FIN/ACK for the pending FIN. Raises what the writer ran into instead, the output is incomplete."""
+        fin_pkt, self.fin_pending = self.fin_pending, None
+        if self.sink is not None:
+            # at most the writer's last on_written (a checkpoint save) still running
+            self.sink.drain()
+        if self.checkpoint is not None:
+            # everything arrived, nothing left to resume
+            self.checkpoint.remove()
+            self.checkpoint = None
+        digest = None
+        if self.rx_digest is not None:
+            digest = self.rx_digest.hexdigest()
+            if fin_pkt.digest == digest:
+                log.info("[Collector] Transfer digest verified (sha256 %s)", digest)
+            else:
+                log.error("[Collector] Transfer digest MISMATCH: sender %s, received %s", fin_pkt.digest, digest)
+        if self.negotiated and self.negotiated["keep_alive"]:
+            # the link outlives this transfer, its output is complete once the sender hears FIN/ACK
+            self._close_sink()
+        self._transmit(FinPacket(PacketType.FINACK, digest))
+        # the session ends once the client's last ACK arrives
+        self.state = SessionState.CLOSING
+
+class DataCollector:
+    def __init__(self, bind_ip: str, bind_port: int, config_loc: str = "config.txt", backlog: int = 64,
+                 output_dir: str = None, overrides: dict = None, environ=None):
+        self.config_loc = config_loc
+        # kept for reloads: a changed config file is read again with the same overrides on top (see _check_config)
+        self.overrides = overrides
+        self.environ = environ
+        self.server_cfg = ConnectionConfig(config_loc, overrides, environ)
+        self._config_stamp = self._stat_config()
+        self._config_check_at = time.monotonic() + CONFIG_CHECK_INTERVAL
+        set_level(self.server_cfg.get_log_level())
+        self.srv_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.srv_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.srv_sock.bind((bind_ip, bind_port))
+        self.backlog = backlog
+        self.output_dir = output_dir
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.selector = selectors.DefaultSelector()
+        # output writer threads poke this pair to get a window update sent from the select loop
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.sessions = {}
+        # sessions whose link isn't read until their write queue drained
+        self._paused = set()
+        self.transfers = TransferRegistry(output_dir, self.server_cfg.get_max_transfer_size())
+        self.budget = ReceiveBudget(self.server_cfg.get_receive_memory_limit())
+        self.metrics = collector_metrics(self.sessions, self.budget)
+        # optional periodic dump / HTTP endpoint of self.metrics, see Utils/metrics.py
+        self.metrics_reporter = None
+        self.running = False
 
+    def start_service(self):
+        self.srv_sock.listen(self.backlog)
+        self.srv_sock.setblocking(False)
+        self.selector.register(self.srv_sock, selectors.EVENT_READ, None)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._wake_r)
+        self._start_metrics()
+        self.running = True
+        log.info("[Collector] Listening on port %d...", self.srv_sock.getsockname()[1])
+        try:
+            while self.running:
+                # short wake-ups so stop() is noticed even when every link is idle,
+                # shorter still when a delayed ACK is about to fall due
+                for key, _ in self.selector.select(timeout=self._select_timeout()):
+                    if key.data is None:
+                        self._accept_link()
+                    elif key.data is self._wake_r:
+                        self._on_wake()
+                    else:
+                        self._service_link(key.data)
+                self._flush_delayed_acks()
+                # a writer that failed never wakes the loop, its pending FIN is found here
+                self._answer_fins()
+                self._check_config(time.monotonic())
+                if self._paused:
+                    # the writer wakes the loop for these too, this only covers a wake-up that came too early
+                    self._resume_links()
+        finally:
+            self._shutdown()
+
+    def _start_metrics(self):
+        self.metrics_reporter = reporter_from_config(self.server_cfg, lambda: [self.metrics])
+        if self.metrics_reporter is not None and self.metrics_reporter.port is not None:
+            log.info("[Collector] Metrics on http://127.0.0.1:%d/metrics", self.metrics_reporter.port)
+
+    def _stat_config(self):
+        try:
+            stat = os.stat(self.config_loc)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_config(self, now: float):
+        if now < self._config_check_at:
+            return
+        self._config_check_at = now + CONFIG_CHECK_INTERVAL
+        stamp = self._stat_config()
+        if stamp is not None and stamp != self._config_stamp:
+            self._config_stamp = stamp
+            self.reload_config()
+
+    def reload_config(self) -> bool:
+        """
+        Reads the config file again and applies it without a restart: handshakes from now on negotiate with the
+        new settings, sessions accepted from now on size their buffers by them, the memory limit, log level and
+        metrics output change right away. Transfers in progress keep what they negotiated. A file that doesn't
+        parse is logged and the settings in use stay.
+        """
+        try:
+            server_cfg = ConnectionConfig(self.config_loc, self.overrides, self.environ)
+        except (ConfigError, OSError) as e:
+            log.error("[Collector] Keeping the current settings, %s doesn't load: %s", self.config_loc, e)
+            return False
+        previous, self.server_cfg = self.server_cfg, server_cfg
+        for session in self.sessions.values():
+            session.server_cfg = server_cfg
+        self.budget.limit = server_cfg.get_receive_memory_limit()
+        self.transfers.max_size = server_cfg.get_max_transfer_size()
+        set_level(server_cfg.get_log_level())
+        metrics_settings = (ConnectionConfig.get_metrics_file, ConnectionConfig.get_metrics_port,
+                            ConnectionConfig.get_metrics_format, ConnectionConfig.get_metrics_interval)
+        if any(get(previous) != get(server_cfg) for get in metrics_settings):
+            if self.metrics_reporter is not None:
+                self.metrics_reporter.stop()
+            self._start_metrics()
+        self.metrics["config_reloads_total"].inc()
+        log.info("[Collector] Reloaded %s", self.config_loc)
         return True
 
+    def _select_timeout(self) -> float:
+        deadlines = [s.ack_deadline for s in self.sessions.values() if s.ack_deadline is not None]
+        if not deadlines:
+            return 0.5
+        return min(0.5, max(0.0, min(deadlines) - time.monotonic()))
+
+    def _flush_delayed_acks(self):
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            try:
+                session.flush_due_ack(now)
+            except socket.error:
+                self._drop_session(session)
+
+    def _answer_fins(self):
+        for session in list(self.sessions.values()):
+            if not session.fin_ready():
+                continue
+            try:
+                session.answer_fin()
+            except OSError as e:
+                log.error("[Collector] Dropping %s, no FIN/ACK: %s", session.origin, e)
+                self._drop_session(session)
+
+    def wake(self):
+        """Any thread: makes the select loop look for paused links to resume, due window updates and FIN/ACKs."""
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # full (a wake-up is pending anyway) or already closed
+            pass
+
+    def _on_wake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        self._resume_links()
+        for session in list(self.sessions.values()):
+            if not session.window_update_due:
+                continue
+            try:
+                session.send_window_update()
+            except socket.error:
+                self._drop_session(session)
+        self._answer_fins()
+
+    def _resume_links(self):
+        for session in list(self._paused):
+            if session.caught_up():
+                log.debug("[Collector] Reading %s again", session.origin)
+                self._paused.discard(session)
+                session.reading_paused = False
+                self.selector.register(session.conn, selectors.EVENT_READ, session)
+
+    def stop(self):
+        self.running = False
+
+    def _accept_link(self):
+        try:
+            client_conn, origin = self.srv_sock.accept()
+        except BlockingIOError:
+            return
+        log.info("[Collector] Accepted link from %s", origin)
+        # reads only happen once the selector reports data, so the link itself can stay blocking for sendall()
+        client_conn.setblocking(True)
+        client_conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = CollectorSession(client_conn, origin, self.server_cfg, self.output_dir, self.transfers, self.metrics,
+                                   self.wake, self.budget)
+        self.metrics["sessions_total"].inc()
+        self.sessions[client_conn.fileno()] = session
+        self.selector.register(client_conn, selectors.EVENT_READ, session)
+
+    def _service_link(self, session: CollectorSession):
+        try:
+            still_open = session.receive()
+        except socket.error:
+            still_open = False
+        except Exception as e:
+            # whatever one peer sends only ends its own session, never the loop the others run on
+            log.error("[Collector] Dropping %s, its data couldn't be handled: %r", session.origin, e)
+            still_open = False
+        if not still_open:
+            self._drop_session(session)
+        elif session.over_limit():
+            # TCP's own flow control holds the sender back until the writer caught up (see _on_wake)
+            log.debug("[Collector] %s overran its write queue, not reading it for now", session.origin)
+            self.metrics["paused_reads_total"].inc()
+            session.reading_paused = True
+            self._paused.add(session)
+            self.selector.unregister(session.conn)
+
+    def _drop_session(self, session: CollectorSession):
+        if session.reading_paused:
+            self._paused.discard(session)
+        else:
+            self.selector.unregister(session.conn)
+        self.sessions.pop(session.conn.fileno(), None)
+        session.close()
+
+    def _shutdown(self):
+        for session in list(self.sessions.values()):
+            self._drop_session(session)
+        self.selector.unregister(self.srv_sock)
+        self.srv_sock.close()
+        self.selector.unregister(self._wake_r)
+        self._wake_r.close()
+        self._wake_w.close()
+        if self.metrics_reporter is not None:
+            self.metrics_reporter.stop()
+            self.metrics_reporter = None
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-host", type=str, default="127.0.0.1")
     parser.add_argument("-port", type=int, default=5555)
+    parser.add_argument("-output_dir", type=str, default=None,
+                        help="stream each transfer into a file here instead of printing it at the end")
+    parser.add_argument("-config", type=str, default="config.txt",
+                        help="config file, read again whenever it changes")
+    parser.add_argument("-set", action="append", default=[], metavar="KEY=VALUE",
+                        help="overrides one config setting (repeatable), as do RJTP_<KEY> environment variables")
+    parser.add_argument("-log_level", type=str, default=None,
+                        help="debug logs every segment and ACK, info only the connection events (default: the config's)")
     args = parser.parse_args()
-    srv = DataCollector(args.host, args.port)
-    srv.start_service()
\ No newline at end of file
+    try:
+        overrides = parse_overrides(args.set)
+        if args.log_level is not None:
+            overrides["log_level"] = args.log_level
+        srv = DataCollector(args.host, args.port, args.config, output_dir=args.output_dir, overrides=overrides)
+    except (ConfigError, OSError) as e:
+        parser.error(str(e))
+    srv.start_service()